@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts'
+
+    def ready(self):
+        from apps import renditions, storage
+        from .models import User
+
+        renditions.register(User, 'avatar', 'avatar_renditions')
+        storage.track(User, 'avatar')
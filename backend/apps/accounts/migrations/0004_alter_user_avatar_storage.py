@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:00
+
+import apps.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_avatar_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=apps.storage.get_media_storage, upload_to='avatars/'),
+        ),
+    ]
@@ -3,12 +3,25 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from apps.storage import get_media_storage
+
 
 class User(AbstractUser):
     """Кастомная модель пользователя"""
     email = models.EmailField(unique=True)
     username = models.CharField(max_length=30, blank=True, null=False, unique=False)
-    avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    avatar = models.ImageField(
+        upload_to='avatars/',
+        storage=get_media_storage,
+        blank=True,
+        null=True
+    )
+    avatar_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Resized copies of avatar (maintained by apps.renditions)'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -3,6 +3,7 @@
 from backend.apps.validators import validate_image_file
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from apps.renditions import RenditionsField
 from django.contrib.auth.password_validation import validate_password
 from .models import User
 
@@ -78,11 +79,12 @@ class UserProfileSerializer(serializers.ModelSerializer):
     """Сериализатор для профиля пользователя""" 
     posts_count = serializers.SerializerMethodField()
     comments_count = serializers.SerializerMethodField()
+    avatar_srcset = RenditionsField(source='avatar_renditions')
 
     class Meta:
         model = User
         fields = (
-            'id', 'username', 'email', 'avatar', 'created_at', 'updated_at',
+            'id', 'username', 'email', 'avatar', 'avatar_srcset', 'created_at', 'updated_at',
             'posts_count', 'comments_count'
         )
         read_only_fields = ('id', 'created_at', 'updated_at', 'email')
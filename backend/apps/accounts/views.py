@@ -6,6 +6,8 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth import login
 
+from apps.observability.tracing import TracedViewMixin
+
 from .models import User
 
 from .serializers import (
@@ -17,7 +19,7 @@ from .serializers import (
 )
 
 
-class RegisterView(generics.CreateAPIView):
+class RegisterView(TracedViewMixin, generics.CreateAPIView):
     """Регистрация нового пользователя"""
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
@@ -39,7 +41,7 @@ class RegisterView(generics.CreateAPIView):
     
     
 
-class LoginView(generics.GenericAPIView):
+class LoginView(TracedViewMixin, generics.GenericAPIView):
     """Вход пользователя"""
     serializer_class = UserLoginSerializer
     permission_classes = [permissions.AllowAny]
@@ -61,7 +63,7 @@ class LoginView(generics.GenericAPIView):
     
     
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(TracedViewMixin, generics.RetrieveUpdateAPIView):
     """Просмотр и обновление профиля"""
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -75,7 +77,7 @@ class ProfileView(generics.RetrieveUpdateAPIView):
         return UserProfileSerializer
     
 
-class ChangePasswordView(generics.UpdateAPIView):
+class ChangePasswordView(TracedViewMixin, generics.UpdateAPIView):
     """Смена пароля"""
     serializer_class = ChangePasswordSerializer
     permission_classes = [permissions.IsAuthenticated]
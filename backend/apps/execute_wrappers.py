@@ -0,0 +1,50 @@
+# backend/apps/execute_wrappers.py
+
+"""
+Execute wrappers that follow a request instead of a connection.
+
+connection.execute_wrapper() only sees one connection of the current
+thread, but under ASGI a request runs its queries in other threads
+(sync_to_async, the thread pool of apps.main.async_views), each with
+connections of its own. context_wrapper() puts the wrapper in a context
+variable instead, which sync_to_async carries into those threads, and
+dispatch(), installed on every connection when it is created (see
+apps.observability.apps), calls the wrappers of the current context.
+
+Threads started with threading.Thread begin with an empty context, so
+their queries are not seen (as with connection.execute_wrapper()).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+_wrappers = ContextVar('execute_wrappers', default=())
+
+
+@contextmanager
+def context_wrapper(wrapper):
+    """Like connection.execute_wrapper(), for every query of this context"""
+    token = _wrappers.set(_wrappers.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _wrappers.reset(token)
+
+
+def dispatch(execute, sql, params, many, context):
+    """connection.execute_wrappers entry calling the context's wrappers"""
+    wrappers = _wrappers.get()
+    # First registered is outermost, as with connection.execute_wrapper()
+    for wrapper in reversed(wrappers):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    """connection_created receiver: add dispatch() once per connection"""
+    if dispatch not in connection.execute_wrappers:
+        # At the front: a connection.execute_wrapper() block that is open
+        # while the connection is created pops the last entry on exit,
+        # which must be its own wrapper, not dispatch()
+        connection.execute_wrappers.insert(0, dispatch)
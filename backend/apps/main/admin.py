@@ -6,6 +6,10 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import Category, Organizer, Activity, ActivityAddress, Comment
+from . import clusters
+from .cache import bump_generation
+from .counters import affected_parents, rebuild_comment_counts, rebuild_counters
+from .view_counter import discard_views
 
 
 # ============================================================================
@@ -237,19 +241,33 @@ class ActivityAdmin(admin.ModelAdmin):
     @admin.action(description='Publish selected activities')
     def publish_activities(self, request, queryset):
         """Bulk publish activities"""
+        # queryset.update() bypasses signals, so counters are rebuilt here
+        category_ids, organizer_ids = affected_parents(queryset)
+        points = clusters.points_for(queryset.exclude(status='published'))
         updated = queryset.update(status='published')
+        bump_generation()
+        rebuild_counters(category_ids, organizer_ids)
+        clusters.apply_points(points, 1)
         self.message_user(request, f'{updated} activities published.')
     
     @admin.action(description='Unpublish selected activities')
     def unpublish_activities(self, request, queryset):
         """Bulk unpublish activities"""
+        category_ids, organizer_ids = affected_parents(queryset)
+        points = clusters.points_for(queryset.filter(status='published'))
         updated = queryset.update(status='draft')
+        bump_generation()
+        rebuild_counters(category_ids, organizer_ids)
+        clusters.apply_points(points, -1)
         self.message_user(request, f'{updated} activities unpublished.')
     
     @admin.action(description='Reset views count')
     def reset_views(self, request, queryset):
         """Reset views count to 0"""
+        # Drop buffered views too, otherwise the next flush brings them back
+        discard_views(queryset.values_list('pk', flat=True))
         updated = queryset.update(views_count=0)
+        bump_generation()
         self.message_user(request, f'Views reset for {updated} activities.')
 
 
@@ -336,13 +354,20 @@ class CommentAdmin(admin.ModelAdmin):
     @admin.action(description='Activate selected comments')
     def activate_comments(self, request, queryset):
         """Bulk activate comments"""
+        # queryset.update() bypasses signals, so counts are rebuilt here
+        activity_ids = set(queryset.values_list('activity_id', flat=True))
         updated = queryset.update(is_active=True)
+        rebuild_comment_counts(activity_ids)
+        bump_generation()
         self.message_user(request, f'{updated} comments activated.')
     
     @admin.action(description='Deactivate selected comments')
     def deactivate_comments(self, request, queryset):
         """Bulk deactivate comments"""
+        activity_ids = set(queryset.values_list('activity_id', flat=True))
         updated = queryset.update(is_active=False)
+        rebuild_comment_counts(activity_ids)
+        bump_generation()
         self.message_user(request, f'{updated} comments deactivated.')
 
 
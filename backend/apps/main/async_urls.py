@@ -0,0 +1,53 @@
+# apps/main/async_urls.py
+
+"""
+apps.main.urls with the hot read endpoints as async views (ASGI only,
+see config.asgi_urls). Same routes, names and view classes; the other
+endpoints keep their sync views.
+"""
+
+from django.urls import URLPattern, URLResolver
+
+from . import urls
+from .async_views import async_read_view
+
+app_name = urls.app_name
+
+# URL name: extra initkwargs of the async view
+ASYNC_ROUTES = {
+    'category-list': {},
+    'organizer-list': {},
+    'activity-list': {},
+    'activity-detail': {'defer_view_count': True},
+    'activity-comments': {},
+    'activity-comments-list': {},
+    'activity-comments-detail': {},
+}
+
+
+def asyncify(patterns):
+    """Copy of a URL pattern list with ASYNC_ROUTES served by async views"""
+    converted = []
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            converted.append(URLResolver(
+                entry.pattern,
+                asyncify(entry.url_patterns),
+                entry.default_kwargs,
+                entry.app_name,
+                entry.namespace,
+            ))
+        elif entry.name in ASYNC_ROUTES:
+            view = entry.callback
+            converted.append(URLPattern(
+                entry.pattern,
+                async_read_view(view.cls, view.actions, **view.initkwargs, **ASYNC_ROUTES[entry.name]),
+                entry.default_args,
+                entry.name,
+            ))
+        else:
+            converted.append(entry)
+    return converted
+
+
+urlpatterns = asyncify(urls.urlpatterns)
@@ -0,0 +1,94 @@
+# apps/main/async_views.py
+
+"""
+Async views for the hot read endpoints (ASGI deployment).
+
+DRF views are synchronous, and Django's async ORM is itself a
+sync_to_async() call per query, so an async read still needs a thread for
+its SQL. async_read_view() therefore makes a single hop per request: the
+anonymous response cache is looked up on the event loop (async cache
+API), and only on a miss does the DRF view run, whole, in a bounded
+thread pool (ASYNC_VIEWS['THREADS']). The pool size also bounds the
+database connections the views hold open, one per thread.
+
+Unsafe methods keep Django's default handling of sync views.
+The activity detail view counts the view in the background
+(view_counter.defer_view) instead of before responding.
+
+Served by config.asgi through config.asgi_urls; WSGI is unchanged.
+"""
+
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.template.response import SimpleTemplateResponse
+from rest_framework.permissions import SAFE_METHODS
+
+from apps.observability.profiling import profile_thread
+
+from .cache import AnonymousResponseCacheMixin
+
+DEFAULTS = {
+    # Threads running the sync views (and database connections held)
+    'THREADS': 8,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ASYNC_VIEWS', {})}
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_config()['THREADS'],
+                    thread_name_prefix='async-views'
+                )
+    return _executor
+
+
+def _run_view(view, request, args, kwargs):
+    """Run a sync view in a pool thread, rendered before returning"""
+    # The request_started/finished signals run in other threads:
+    # manage this thread's connections here
+    close_old_connections()
+    try:
+        with profile_thread():
+            response = view(request, *args, **kwargs)
+            if isinstance(response, SimpleTemplateResponse):
+                response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(viewset, actions, **initkwargs):
+    """
+    viewset.as_view(actions, **initkwargs) as an async view: safe methods
+    served from the response cache or the thread pool.
+    """
+    view = viewset.as_view(actions, **initkwargs)
+    cached = issubclass(viewset, AnonymousResponseCacheMixin)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await sync_to_async(view)(request, *args, **kwargs)
+        if cached:
+            response = await viewset(**initkwargs).aget_cached_response(request)
+            if response is not None:
+                return response
+        run_view = sync_to_async(_run_view, thread_sensitive=False, executor=get_executor())
+        return await run_view(view, request, args, kwargs)
+
+    # cls, actions, initkwargs and csrf_exempt, as on the sync view
+    return functools.wraps(view)(async_view)
@@ -0,0 +1,20 @@
+# apps/main/benchmarks/__init__.py
+
+"""
+Reproducible performance benchmarks.
+
+dataset.generate() fills an empty database with seeded synthetic data
+(users, organizers, categories, activities with addresses, comments)
+through bulk inserts; scenarios.run() times API scenarios through the
+full Django stack and returns a JSON-serializable report.
+
+    manage.py seed_benchmark_data --activities 1000000 --seed 1
+    manage.py run_benchmarks --output results.json
+    manage.py run_benchmarks --compare results.json
+    manage.py run_concurrency_benchmark --concurrency 1,8,32 --db-latency 2
+
+concurrency.ConcurrencyBenchmark sends concurrent reads to the WSGI and
+ASGI deployments and compares their throughput.
+
+Both run against the configured database (SpatiaLite or MySQL).
+"""
@@ -0,0 +1,319 @@
+# apps/main/benchmarks/concurrency.py
+
+"""
+Concurrent throughput of the WSGI and ASGI deployments.
+
+The same seeded list of anonymous read requests is sent, in-process, to
+Django's WSGIHandler (config.wsgi) and to config.asgi.application, with
+a fixed number of requests in flight (the concurrency level). The WSGI
+side is served by `wsgi_threads` threads: 1 is one sync worker (gunicorn
+-w 1), more is a threaded worker. The ASGI side runs on one event loop,
+with the async read views and their thread pool (ASYNC_VIEWS['THREADS']).
+
+Latency is measured from the moment a request is issued, so it includes
+the time spent waiting for a free WSGI thread.
+
+A local database answers in microseconds, which hides what async views
+are for (waiting on the network); db_latency adds a sleep of that many
+milliseconds to every SQL statement to stand in for a remote MySQL.
+SQLite needs a file database: each thread opens its own connection.
+"""
+
+import asyncio
+import contextvars
+import io
+import sys
+import time
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils import timezone
+
+from apps.execute_wrappers import context_wrapper
+from apps.main.async_views import get_config as get_async_config
+from apps.main.cache import bump_generation
+
+from .scenarios import SCENARIOS, BenchmarkState, dataset_counts, environment, percentile
+
+REPORT_VERSION = 1
+HOST = 'localhost'
+
+DEFAULT_SCENARIOS = (
+    'activities.list',
+    'activities.detail',
+    'activities.comments',
+    'categories.list',
+    'organizers.list',
+)
+
+
+def read_scenarios(names=None):
+    """Anonymous GET scenarios, by exact name"""
+    names = names or DEFAULT_SCENARIOS
+    found = {
+        scenario.name: scenario for scenario in SCENARIOS
+        if scenario.method == 'get' and not scenario.authenticated
+    }
+    unknown = [name for name in names if name not in found]
+    if unknown:
+        raise LookupError(
+            f'Unknown or non-read scenario(s): {", ".join(unknown)}; '
+            f'available: {", ".join(found)}'
+        )
+    return [found[name] for name in names]
+
+
+def sql_latency(seconds):
+    """Execute wrapper sleeping before every statement"""
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+    return wrapper
+
+
+# ============================================================================
+# SERVERS
+# ============================================================================
+
+def _wsgi_environ(path):
+    path, _, query = path.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+class WSGIServer:
+    """Requests to WSGIHandler from a fixed number of threads"""
+    name = 'wsgi'
+
+    def __init__(self, threads):
+        self.threads = threads
+        self.handler = WSGIHandler()
+
+    def get(self, path):
+        status = []
+        response = self.handler(_wsgi_environ(path), lambda line, headers: status.append(line))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return int(status[0].split(' ', 1)[0])
+
+    def run(self, paths, concurrency, before_request):
+        """[(seconds, status)] of every request, `concurrency` in flight"""
+        results = []
+        pending = {}
+        remaining = iter(paths)
+        with ThreadPoolExecutor(self.threads, thread_name_prefix='bench-wsgi') as pool:
+            def submit():
+                path = next(remaining, None)
+                if path is None:
+                    return
+                before_request()
+                # Each request with a copy of this context (SQL latency wrapper)
+                future = pool.submit(contextvars.copy_context().run, self.get, path)
+                pending[future] = time.perf_counter()
+
+            for _ in range(concurrency):
+                submit()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    elapsed = time.perf_counter() - pending.pop(future)
+                    results.append((elapsed, self._status(future)))
+                    submit()
+        return results
+
+    def _status(self, future):
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+
+class ASGIServer:
+    """Requests to config.asgi.application from asyncio tasks"""
+    name = 'asgi'
+
+    def __init__(self):
+        from config.asgi import application
+        self.application = application
+
+    async def get(self, path):
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', HOST.encode())],
+            'client': ('127.0.0.1', 50000),
+            'server': (HOST, 80),
+        }
+        disconnected = asyncio.Event()
+        body_sent = False
+        status = None
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            disconnected.set()
+        return status
+
+    def run(self, paths, concurrency, before_request):
+        return asyncio.run(self._run(paths, concurrency, before_request))
+
+    async def _run(self, paths, concurrency, before_request):
+        results = []
+        remaining = iter(paths)
+        # May use the database: not on the event loop
+        before_request = sync_to_async(before_request)
+
+        async def client():
+            for path in remaining:
+                await before_request()
+                start = time.perf_counter()
+                try:
+                    status = await self.get(path)
+                except Exception:
+                    status = None
+                results.append((time.perf_counter() - start, status))
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return results
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def summarize(results, seconds):
+    timings = sorted(elapsed * 1000 for elapsed, _ in results)
+    statuses = {}
+    for _, status in results:
+        key = str(status) if status is not None else 'exception'
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        'requests': len(results),
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(len(results) / seconds, 1) if seconds else None,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(timings[-1], 3),
+        'errors': sum(
+            count for status, count in statuses.items()
+            if status == 'exception' or int(status) >= 500
+        ),
+        'statuses': statuses,
+    }
+
+
+class ConcurrencyBenchmark:
+
+    def __init__(self, requests=400, levels=(1, 8, 32), wsgi_threads=1, db_latency=0,
+                 warm_cache=False, seed=1, log=None):
+        self.requests = requests
+        self.levels = levels
+        self.wsgi_threads = wsgi_threads
+        self.db_latency = db_latency
+        self.warm_cache = warm_cache
+        self.seed = seed
+        self.log = log or (lambda message: None)
+
+    def paths(self, scenarios):
+        """Seeded request paths, the scenarios in turn"""
+        state = BenchmarkState(self.seed)
+        return [
+            scenarios[index % len(scenarios)].build(state)[0]
+            for index in range(self.requests)
+        ]
+
+    def before_request(self):
+        if not self.warm_cache:
+            bump_generation()
+
+    def measure(self, server, paths, concurrency):
+        start = time.perf_counter()
+        results = server.run(paths, concurrency, self.before_request)
+        return summarize(results, time.perf_counter() - start)
+
+    def run(self, scenario_names=None):
+        """
+        Run every concurrency level against both deployments.
+
+        Returns:
+            dict: JSON-serializable report
+        """
+        scenarios = read_scenarios(scenario_names)
+        paths = self.paths(scenarios)
+        servers = [WSGIServer(self.wsgi_threads), ASGIServer()]
+        report = {
+            'version': REPORT_VERSION,
+            'started_at': timezone.now().isoformat(),
+            'environment': environment(),
+            'dataset': dataset_counts(),
+            'options': {
+                'requests': self.requests,
+                'concurrency': list(self.levels),
+                'wsgi_threads': self.wsgi_threads,
+                'asgi_threads': get_async_config()['THREADS'],
+                'db_latency_ms': self.db_latency,
+                'warm_cache': self.warm_cache,
+                'seed': self.seed,
+                'scenarios': [scenario.name for scenario in scenarios],
+            },
+            'levels': {},
+        }
+
+        with context_wrapper(sql_latency(self.db_latency / 1000)) if self.db_latency else nullcontext():
+            # Warm up: imports, URL resolvers, connections, pool threads
+            for server in servers:
+                server.run(paths[:len(scenarios) * 2], max(self.levels), self.before_request)
+
+            for concurrency in self.levels:
+                result = {}
+                for server in servers:
+                    self.log(f'{server.name} concurrency={concurrency}')
+                    result[server.name] = self.measure(server, paths, concurrency)
+                wsgi_rps = result['wsgi']['requests_per_second']
+                asgi_rps = result['asgi']['requests_per_second']
+                result['asgi_speedup'] = round(asgi_rps / wsgi_rps, 2) if wsgi_rps and asgi_rps else None
+                report['levels'][str(concurrency)] = result
+        return report
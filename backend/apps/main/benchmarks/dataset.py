@@ -0,0 +1,259 @@
+# apps/main/benchmarks/dataset.py
+
+"""
+Seeded synthetic dataset for benchmarks.
+
+Rows get explicit primary keys and slugs, so nothing has to be read back
+after bulk_create (MySQL does not return keys) and the same seed always
+produces the same data. bulk_create bypasses the model signals: the search
+index is written per batch, counters and map clusters are rebuilt at the
+end.
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.main import clusters, search
+from apps.main.cache import bump_generation
+from apps.main.counters import rebuild_comment_counts, rebuild_counters
+from apps.main.models import Activity, ActivityAddress, Category, Comment, Organizer
+
+# Shared by every generated user (hashed once)
+PASSWORD = 'benchmark-password'
+EMAIL_DOMAIN = 'benchmark.example.com'
+SLUG_PREFIX = 'bench'
+
+CATEGORIES = [
+    'Music', 'Theatre', 'Cinema', 'Exhibitions', 'Sports', 'Workshops',
+    'Markets', 'Food', 'Kids', 'Nature', 'Talks', 'Festivals',
+]
+
+WORDS = [
+    'jazz', 'rock', 'classical', 'folk', 'electronic', 'piano', 'guitar',
+    'choir', 'opera', 'ballet', 'comedy', 'puppet', 'film', 'documentary',
+    'painting', 'photography', 'sculpture', 'design', 'market', 'vintage',
+    'craft', 'beer', 'wine', 'chocolate', 'waffle', 'cooking', 'bakery',
+    'running', 'cycling', 'football', 'yoga', 'climbing', 'hiking', 'garden',
+    'forest', 'river', 'castle', 'museum', 'library', 'science', 'history',
+    'poetry', 'story', 'family', 'children', 'night', 'summer', 'winter',
+    'spring', 'autumn', 'festival', 'concert', 'tour', 'lecture', 'workshop',
+]
+
+# (name, longitude, latitude) centres the locations are scattered around
+CITIES = [
+    ('Brussels', 4.3517, 50.8503),
+    ('Antwerp', 4.4025, 51.2194),
+    ('Ghent', 3.7174, 51.0543),
+    ('Liège', 5.5797, 50.6326),
+    ('Bruges', 3.2247, 51.2093),
+    ('Namur', 4.8719, 50.4674),
+    ('Leuven', 4.7005, 50.8798),
+    ('Mons', 3.9523, 50.4542),
+]
+
+
+@dataclass
+class DatasetSize:
+    activities: int = 10000
+    users: int = 0
+    organizers: int = 0
+    comments_per_activity: float = 5.0
+    # Share of activities with an address / with coordinates / published
+    address_ratio: float = 0.8
+    located_ratio: float = 0.9
+    published_ratio: float = 0.9
+
+    def __post_init__(self):
+        # Scale with the number of activities unless given
+        self.users = self.users or max(self.activities // 20, 10)
+        self.organizers = self.organizers or max(self.activities // 100, 5)
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def is_seeded():
+    return Activity.objects.filter(slug__startswith=f'{SLUG_PREFIX}-').exists()
+
+
+# ============================================================================
+# GENERATION
+# ============================================================================
+
+class DatasetGenerator:
+    """Bulk-inserts a DatasetSize worth of rows, in batches"""
+
+    def __init__(self, size, seed=1, batch_size=1000, log=None):
+        self.size = size
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.rng = random.Random(seed)
+        self.today = timezone.localdate()
+
+    def run(self):
+        """
+        Returns:
+            dict: Rows created per model
+        """
+        created = {}
+        with transaction.atomic():
+            created['users'] = self.create_users()
+            created['categories'] = self.create_categories()
+            created['organizers'] = self.create_organizers()
+        created['activities'], created['addresses'], created['comments'] = self.create_activities()
+
+        self.log('Rebuilding counters and map clusters')
+        with transaction.atomic():
+            rebuild_counters()
+            rebuild_comment_counts()
+            clusters.rebuild_clusters()
+            bump_generation()
+        return created
+
+    def create_users(self):
+        User = get_user_model()
+        password = make_password(PASSWORD)
+        first = _next_pk(User)
+        self.user_ids = range(first, first + self.size.users)
+        User.objects.bulk_create(
+            (
+                User(
+                    pk=pk,
+                    email=f'user{n}@{EMAIL_DOMAIN}',
+                    username=f'user{n}',
+                    password=password,
+                )
+                for n, pk in enumerate(self.user_ids)
+            ),
+            batch_size=self.batch_size
+        )
+        return len(self.user_ids)
+
+    def create_categories(self):
+        first = _next_pk(Category)
+        self.category_ids = range(first, first + len(CATEGORIES))
+        Category.objects.bulk_create([
+            Category(pk=pk, name=f'{name} ({SLUG_PREFIX})', slug=f'{SLUG_PREFIX}-{name.lower()}')
+            for pk, name in zip(self.category_ids, CATEGORIES)
+        ])
+        return len(self.category_ids)
+
+    def create_organizers(self):
+        first = _next_pk(Organizer)
+        self.organizer_ids = range(first, first + self.size.organizers)
+        Organizer.objects.bulk_create(
+            (
+                Organizer(
+                    pk=pk,
+                    name=f'Organizer {n} ({SLUG_PREFIX})',
+                    slug=f'{SLUG_PREFIX}-organizer-{n}',
+                    email=f'organizer{n}@{EMAIL_DOMAIN}',
+                    phone=f'+32 2 {n:07d}'[:20],
+                    website=f'https://organizer{n}.{EMAIL_DOMAIN}/',
+                )
+                for n, pk in enumerate(self.organizer_ids)
+            ),
+            batch_size=self.batch_size
+        )
+        return len(self.organizer_ids)
+
+    def create_activities(self):
+        first_activity = _next_pk(Activity)
+        next_comment = _next_pk(Comment)
+        totals = [0, 0, 0]
+
+        for start in range(0, self.size.activities, self.batch_size):
+            count = min(self.batch_size, self.size.activities - start)
+            activities, addresses, comments = [], [], []
+            for n in range(start, start + count):
+                activity = self.build_activity(n, first_activity + n)
+                activities.append(activity)
+                if self.rng.random() < self.size.address_ratio:
+                    addresses.append(self.build_address(activity))
+                for _ in range(self.comment_count()):
+                    comments.append(self.build_comment(next_comment, activity))
+                    next_comment += 1
+
+            with transaction.atomic():
+                Activity.objects.bulk_create(activities)
+                ActivityAddress.objects.bulk_create(addresses)
+                Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+                search.index_activities(activities)
+
+            for index, value in enumerate((len(activities), len(addresses), len(comments))):
+                totals[index] += value
+            self.log(f'{totals[0]}/{self.size.activities} activities')
+        return tuple(totals)
+
+    def comment_count(self):
+        # Skewed: most activities have a few comments, some have many
+        mean = self.size.comments_per_activity
+        return int(self.rng.expovariate(1 / mean)) if mean > 0 else 0
+
+    def build_activity(self, n, pk):
+        rng = self.rng
+        city = rng.choice(CITIES)[0]
+        name = f'{_text(rng, 2).title()} {city}'
+        return Activity(
+            pk=pk,
+            name=name,
+            slug=f'{SLUG_PREFIX}-{n}',
+            date=self.today + timedelta(days=rng.randint(-180, 365)),
+            time=time(rng.randint(8, 22), rng.choice((0, 15, 30, 45))),
+            summary=_text(rng, 8).capitalize(),
+            description=_text(rng, 60).capitalize(),
+            price=None if rng.random() < 0.3 else Decimal(rng.randint(100, 5000)) / 100,
+            organizer_id=rng.choice(self.organizer_ids),
+            category_id=rng.choice(self.category_ids) if rng.random() < 0.95 else None,
+            author_id=rng.choice(self.user_ids),
+            status='published' if rng.random() < self.size.published_ratio else 'draft',
+            views_count=int(rng.paretovariate(1.5)) - 1,
+        )
+
+    def build_address(self, activity):
+        rng = self.rng
+        city, lng, lat = rng.choice(CITIES)
+        location = None
+        if rng.random() < self.size.located_ratio:
+            location = Point(
+                round(lng + rng.gauss(0, 0.05), 6),
+                round(lat + rng.gauss(0, 0.03), 6),
+                srid=4326
+            )
+        return ActivityAddress(
+            activity_id=activity.pk,
+            place_name=f'{rng.choice(WORDS).title()} Hall',
+            address=f'{rng.choice(WORDS).title()}straat {rng.randint(1, 250)}',
+            city=city,
+            postcode=str(rng.randint(1000, 9999)),
+            location=location,
+        )
+
+    def build_comment(self, pk, activity):
+        return Comment(
+            pk=pk,
+            activity_id=activity.pk,
+            author_id=self.rng.choice(self.user_ids),
+            text=_text(self.rng, self.rng.randint(3, 30)).capitalize(),
+            is_active=self.rng.random() < 0.97,
+        )
+
+
+def generate(size, seed=1, batch_size=1000, log=None):
+    """Create a seeded dataset (see DatasetGenerator.run)"""
+    return DatasetGenerator(size, seed=seed, batch_size=batch_size, log=log).run()
@@ -0,0 +1,316 @@
+# apps/main/benchmarks/scenarios.py
+
+"""
+Timed API scenarios.
+
+Requests go through the whole Django stack in-process (middleware, DRF,
+serializers, database) with the test client, so no server is needed and
+network noise is left out. Each scenario runs `warmup` untimed and
+`iterations` timed requests; the report holds latency percentiles, the
+median query count and the status codes seen.
+
+Anonymous reads would mostly hit the response cache after the first
+request, so the cache is invalidated before every request unless
+warm_cache is set.
+"""
+
+import math
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, reset_queries
+from django.db.models import Max, Min
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.main.cache import bump_generation
+from apps.main.models import Activity, Category, Comment, Organizer
+from apps.query_budget import count_queries
+
+from .dataset import CITIES, EMAIL_DOMAIN, PASSWORD, WORDS
+
+REPORT_VERSION = 1
+API = '/api/v1'
+
+# Published activities the detail/comment scenarios pick from
+SAMPLE_SIZE = 200
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # state -> (path, data); called before every request
+    build: Callable
+    authenticated: bool = False
+    # state, response -> None; called after every request
+    after: Callable = None
+
+
+class BenchmarkState:
+    """Seeded choices shared by the scenarios"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.today = timezone.localdate()
+
+        User = get_user_model()
+        self.user = User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').order_by('pk').first()
+        if self.user is None:
+            raise LookupError('No benchmark data: run seed_benchmark_data first.')
+        self.refresh_token = str(RefreshToken.for_user(self.user))
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+
+        self.category_ids = list(Category.objects.values_list('pk', flat=True))
+        self.organizer_ids = list(
+            Organizer.objects.order_by('-activities_count').values_list('pk', flat=True)[:100]
+        )
+        self.slugs = self.sample_slugs()
+
+    def sample_slugs(self):
+        """Random published activity slugs without reading every row"""
+        bounds = Activity.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            raise LookupError('No activities: run seed_benchmark_data first.')
+        candidates = {
+            self.rng.randint(bounds['low'], bounds['high'])
+            for _ in range(SAMPLE_SIZE * 2)
+        }
+        slugs = list(Activity.objects.filter(
+            pk__in=candidates, status='published'
+        ).order_by('pk').values_list('slug', flat=True)[:SAMPLE_SIZE])
+        if not slugs:
+            raise LookupError('No published activities to benchmark.')
+        return slugs
+
+    def slug(self):
+        return self.rng.choice(self.slugs)
+
+    def words(self, count):
+        return ' '.join(self.rng.sample(WORDS, count))
+
+
+# ============================================================================
+# SCENARIOS
+# ============================================================================
+
+def _list(query=''):
+    return lambda state: (f'{API}/activities/{query}', None)
+
+
+def _near(state):
+    _, lng, lat = state.rng.choice(CITIES)
+    return f'{API}/activities/?near={lng},{lat}&radius_km=5', None
+
+
+def _date_range(state):
+    start = state.today + timedelta(days=state.rng.randint(0, 60))
+    end = start + timedelta(days=14)
+    return f'{API}/activities/?date_from={start}&date_to={end}', None
+
+
+def _rotate_refresh(state, response):
+    # ROTATE_REFRESH_TOKENS blacklists the token just used
+    if response.status_code == 200 and 'refresh' in response.data:
+        state.refresh_token = response.data['refresh']
+
+
+SCENARIOS = [
+    Scenario('activities.list', 'get', _list()),
+    Scenario('activities.list.category', 'get',
+             lambda s: (f'{API}/activities/?category={s.rng.choice(s.category_ids)}', None)),
+    Scenario('activities.list.organizer', 'get',
+             lambda s: (f'{API}/activities/?organizer={s.rng.choice(s.organizer_ids)}', None)),
+    Scenario('activities.list.status', 'get', _list('?status=published')),
+    Scenario('activities.list.date_range', 'get', _date_range),
+    Scenario('activities.list.upcoming', 'get', _list('?filter=upcoming')),
+    Scenario('activities.list.past', 'get', _list('?filter=past')),
+    Scenario('activities.list.free', 'get', _list('?price=free')),
+    Scenario('activities.list.paid', 'get', _list('?price=paid')),
+    Scenario('activities.list.ordering', 'get', _list('?ordering=-views_count')),
+    Scenario('activities.list.near', 'get', _near),
+    Scenario('activities.list.deep_page', 'get', _list('?page=50')),
+    Scenario('activities.list.cursor', 'get', _list('?pagination=cursor')),
+    Scenario('activities.search', 'get',
+             lambda s: (f'{API}/activities/?search={s.words(s.rng.randint(1, 2))}', None)),
+    Scenario('activities.detail', 'get',
+             lambda s: (f'{API}/activities/{s.slug()}/', None)),
+    Scenario('activities.comments', 'get',
+             lambda s: (f'{API}/activities/{s.slug()}/comments/', None)),
+    Scenario('categories.list', 'get', lambda s: (f'{API}/categories/', None)),
+    Scenario('organizers.list', 'get', lambda s: (f'{API}/organizers/', None)),
+    Scenario('comments.create', 'post',
+             lambda s: (f'{API}/activities/{s.slug()}/add_comment/', {'text': s.words(6)}),
+             authenticated=True),
+    Scenario('auth.login', 'post',
+             lambda s: (f'{API}/auth/login/', {'email': s.user.email, 'password': PASSWORD})),
+    Scenario('auth.token_refresh', 'post',
+             lambda s: (f'{API}/auth/token/refresh/', {'refresh': s.refresh_token}),
+             after=_rotate_refresh),
+]
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of a sorted list"""
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def summarize(timings, queries):
+    timings = sorted(timings)
+    queries = sorted(queries)
+    return {
+        'iterations': len(timings),
+        'min_ms': round(timings[0], 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': percentile(queries, 50),
+    }
+
+
+class BenchmarkRunner:
+
+    def __init__(self, iterations=50, warmup=5, seed=1, warm_cache=False, log=None):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.seed = seed
+        self.warm_cache = warm_cache
+        self.log = log or (lambda message: None)
+
+    def request(self, client, state, scenario):
+        path, data = scenario.build(state)
+        extra = {}
+        if scenario.authenticated:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {state.access_token}'
+        if not self.warm_cache:
+            bump_generation()
+        reset_queries()
+
+        with count_queries() as counter:
+            start = time.perf_counter()
+            if scenario.method == 'get':
+                response = client.get(path, **extra)
+            else:
+                response = getattr(client, scenario.method)(path, data, format='json', **extra)
+            elapsed = (time.perf_counter() - start) * 1000
+
+        if scenario.after is not None:
+            scenario.after(state, response)
+        return path, elapsed, counter.count, response.status_code
+
+    def run_scenario(self, state, scenario):
+        # Fresh client: no session cookie carried over from auth.login
+        client = APIClient(SERVER_NAME='localhost')
+        for _ in range(self.warmup):
+            self.request(client, state, scenario)
+
+        timings, queries, statuses = [], [], {}
+        for _ in range(self.iterations):
+            path, elapsed, query_count, status_code = self.request(client, state, scenario)
+            timings.append(elapsed)
+            queries.append(query_count)
+            statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+
+        # Path of the last request, without the query string
+        result = {'method': scenario.method.upper(), 'path': path.split('?', 1)[0]}
+        result.update(summarize(timings, queries))
+        result['statuses'] = statuses
+        return result
+
+    def run(self, only=None):
+        """
+        Run the scenarios: all, or those named in `only` and their
+        sub-scenarios ('activities.list' includes 'activities.list.near').
+
+        Returns:
+            dict: JSON-serializable report
+        """
+        state = BenchmarkState(self.seed)
+        report = {
+            'version': REPORT_VERSION,
+            'started_at': timezone.now().isoformat(),
+            'environment': environment(),
+            'dataset': dataset_counts(),
+            'options': {
+                'iterations': self.iterations,
+                'warmup': self.warmup,
+                'seed': self.seed,
+                'warm_cache': self.warm_cache,
+            },
+            'scenarios': {},
+        }
+        for scenario in SCENARIOS:
+            if only and not any(
+                scenario.name == name or scenario.name.startswith(f'{name}.')
+                for name in only
+            ):
+                continue
+            self.log(scenario.name)
+            report['scenarios'][scenario.name] = self.run_scenario(state, scenario)
+        return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    return {
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'database': connection.vendor,
+        'database_engine': connection.settings_dict['ENGINE'],
+        'debug': settings.DEBUG,
+    }
+
+
+def dataset_counts():
+    return {
+        'activities': Activity.objects.count(),
+        'comments': Comment.objects.count(),
+        'organizers': Organizer.objects.count(),
+        'users': get_user_model().objects.count(),
+    }
+
+
+def compare(baseline, current, metric='p50_ms'):
+    """
+    Per-scenario change of a metric between two reports.
+
+    Returns:
+        list: (scenario, baseline value, current value, change in %)
+    """
+    rows = []
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name, {}).get(metric)
+        after = result[metric]
+        change = None if not before else round((after - before) / before * 100, 1)
+        rows.append((name, before, after, change))
+    return rows
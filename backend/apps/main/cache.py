@@ -0,0 +1,200 @@
+# apps/main/cache.py
+
+"""
+Versioned response cache for anonymous read requests.
+
+Cache keys embed a global generation counter. Any write to the catalogue
+(model signals, admin bulk actions, rebuild commands) bumps the generation,
+so every previously cached response becomes unreachable at once and simply
+expires. The counter lives in the same cache and may be evicted (the file
+cache culls entries past MAX_ENTRIES); it is then reseeded from the clock
+in nanoseconds rather than 1, so it never comes back to a generation
+whose responses are still stored. The cache alias is settings.API_CACHE_ALIAS, which every worker
+must share (a file cache by default, Redis across hosts): with per-process
+memory a write would only invalidate the cache of the worker handling it.
+"""
+
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+from rest_framework.permissions import SAFE_METHODS
+
+
+GENERATION_KEY = 'api:generation'
+INVALIDATED_AT_KEY = 'api:generation:at'
+CACHED_HEADERS = ('Content-Type', 'Vary', 'Allow', 'ETag', 'Last-Modified')
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+# ============================================================================
+# GENERATION COUNTER
+# ============================================================================
+
+def new_generation():
+    """Seed for a missing counter, above any generation handed out before"""
+    return time.time_ns()
+
+
+def get_generation():
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        seed = new_generation()
+        cache.add(GENERATION_KEY, seed, timeout=None)
+        generation = cache.get(GENERATION_KEY, seed)
+    return generation
+
+
+async def aget_generation():
+    """get_generation() through the async cache API"""
+    cache = get_cache()
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        seed = new_generation()
+        await cache.aadd(GENERATION_KEY, seed, timeout=None)
+        generation = await cache.aget(GENERATION_KEY, seed)
+    return generation
+
+
+def get_invalidated_at():
+    """Unix time of the last bump (None if unknown)"""
+    return get_cache().get(INVALIDATED_AT_KEY)
+
+
+def _bump():
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # Key missing (evicted or never set): a fresh seed is already new,
+        # unless another process seeded it first
+        if not cache.add(GENERATION_KEY, new_generation(), timeout=None):
+            cache.incr(GENERATION_KEY)
+    cache.set(INVALIDATED_AT_KEY, time.time(), timeout=None)
+
+
+def bump_generation():
+    """
+    Invalidate all cached responses.
+    Deferred until the current transaction commits, so a concurrent reader
+    cannot cache pre-commit data under the new generation.
+    """
+    transaction.on_commit(_bump)
+
+
+# ============================================================================
+# VIEWSET MIXIN
+# ============================================================================
+
+def response_cache_key(generation, digest):
+    return f'api:response:{generation}:{digest}'
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Cache rendered GET/HEAD responses for unauthenticated requests.
+
+    Keyed on path, normalized query string, Accept header and generation.
+    Views may set `self.response_cache_meta` (a dict stored with the entry)
+    and override `on_response_cache_hit` to run side effects on hits.
+    """
+    response_cache_timeout = None  # None = the cache alias' TIMEOUT
+
+    def get_response_cache_digest(self, request):
+        """Hash of what the response depends on (None: not cacheable)"""
+        if request.method not in SAFE_METHODS or request.method == 'OPTIONS':
+            return None
+        # JWT is the only authentication class: no header means anonymous
+        if request.META.get('HTTP_AUTHORIZATION'):
+            return None
+
+        query = urlencode(sorted(request.GET.lists()), doseq=True)
+        raw = '\n'.join([
+            request.path,
+            query,
+            request.META.get('HTTP_ACCEPT', ''),
+        ])
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def get_response_cache_key(self, request):
+        digest = self.get_response_cache_digest(request)
+        if digest is None:
+            return None
+        return response_cache_key(get_generation(), digest)
+
+    def on_response_cache_hit(self, request, meta):
+        """Hook for side effects that must happen even on cache hits"""
+
+    def _response_from_cache(self, request, entry):
+        response = HttpResponse(
+            entry['content'],
+            status=entry['status'],
+            headers=entry['headers']
+        )
+        response['X-Cache'] = 'HIT'
+        # Honour If-None-Match/If-Modified-Since against the cached validators
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+            response=response
+        ) or response
+
+    def _store_response(self, key, response):
+        entry = {
+            'content': response.content,
+            'status': response.status_code,
+            'headers': {
+                header: response[header]
+                for header in CACHED_HEADERS
+                if response.has_header(header)
+            },
+            'meta': getattr(self, 'response_cache_meta', None),
+        }
+        timeout = self.response_cache_timeout
+        if timeout is None:
+            get_cache().set(key, entry)
+        else:
+            get_cache().set(key, entry, timeout)
+
+    async def aget_cached_response(self, request):
+        """dispatch()'s cache lookup through the async cache API (async views)"""
+        digest = self.get_response_cache_digest(request)
+        if digest is None:
+            return None
+        entry = await get_cache().aget(response_cache_key(await aget_generation(), digest))
+        if entry is None:
+            return None
+        self.on_response_cache_hit(request, entry.get('meta'))
+        return self._response_from_cache(request, entry)
+
+    def dispatch(self, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        if key is not None:
+            entry = get_cache().get(key)
+            if entry is not None:
+                self.on_response_cache_hit(request, entry.get('meta'))
+                return self._response_from_cache(request, entry)
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        if key is not None and response.status_code == 200 and not response.streaming:
+            patch_vary_headers(response, ['Authorization'])
+            response['X-Cache'] = 'MISS'
+            if hasattr(response, 'add_post_render_callback'):
+                response.add_post_render_callback(
+                    lambda rendered: self._store_response(key, rendered)
+                )
+            else:
+                self._store_response(key, response)
+        return response
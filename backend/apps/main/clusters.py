@@ -0,0 +1,289 @@
+# apps/main/clusters.py
+
+"""
+Server-side map clustering.
+
+Published activities with a location are aggregated into MapClusterCell
+rows for every zoom level: the world is split into web-mercator tiles
+(2^zoom x 2^zoom) and every tile into CELLS_PER_TILE x CELLS_PER_TILE cells.
+Each cell stores a count and coordinate sums, so the centroid is one
+division away and a bbox query is a range scan on (zoom, x, y).
+
+Cells are updated incrementally from ActivityAddress/Activity signals and
+bulk admin actions; rebuild_clusters() recomputes everything.
+"""
+
+import math
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, When
+
+from .models import Activity, ActivityAddress, MapClusterCell
+
+
+MIN_ZOOM = 0
+MAX_ZOOM = getattr(settings, 'MAP_CLUSTER_MAX_ZOOM', 16)
+CELLS_PER_TILE = getattr(settings, 'MAP_CLUSTER_CELLS_PER_TILE', 4)
+# Most grid cells one query may cover (a full-HD viewport is ~640)
+MAX_CELLS = getattr(settings, 'MAP_CLUSTER_MAX_CELLS', 4096)
+# Cells changed per statement by incremental updates
+DELTA_BATCH_SIZE = 256
+
+# Web-mercator latitude limit
+MAX_LATITUDE = 85.05112878
+
+
+# ============================================================================
+# GRID MATH
+# ============================================================================
+
+def grid_size(zoom):
+    """Number of cells along one axis at a zoom level"""
+    return (2 ** zoom) * CELLS_PER_TILE
+
+
+def cell_for(lng, lat, zoom):
+    """Grid cell (x, y) containing a point"""
+    size = grid_size(zoom)
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    lat_rad = math.radians(lat)
+
+    x = (lng + 180.0) / 360.0 * size
+    y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * size
+    return (
+        min(max(int(x), 0), size - 1),
+        min(max(int(y), 0), size - 1),
+    )
+
+
+def cell_range(bbox, zoom):
+    """Inclusive (x_min, y_min, x_max, y_max) cell range covering a bbox"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    x_min, y_max = cell_for(min_lng, min_lat, zoom)
+    x_max, y_min = cell_for(max_lng, max_lat, zoom)
+    return x_min, y_min, x_max, y_max
+
+
+def clamp_zoom(zoom):
+    return max(MIN_ZOOM, min(int(zoom), MAX_ZOOM))
+
+
+def fit_zoom(bbox, zoom):
+    """
+    Clamped zoom, lowered until the bbox covers at most MAX_CELLS cells
+    (a large bbox at a high zoom would return every cell of a region)
+    """
+    zoom = clamp_zoom(zoom)
+    while zoom > MIN_ZOOM:
+        x_min, y_min, x_max, y_max = cell_range(bbox, zoom)
+        if (x_max - x_min + 1) * (y_max - y_min + 1) <= MAX_CELLS:
+            break
+        zoom -= 1
+    return zoom
+
+
+# ============================================================================
+# POINT COLLECTION
+# ============================================================================
+
+def point_of(location):
+    """(lng, lat) tuple of a GEOS point or None"""
+    if location is None:
+        return None
+    return (location.x, location.y)
+
+
+def points_for(activities):
+    """(lng, lat) of every located address of an activity queryset"""
+    return [
+        point_of(location)
+        for location in ActivityAddress.objects.filter(
+            activity__in=activities.order_by().values('pk'),
+            location__isnull=False
+        ).values_list('location', flat=True)
+    ]
+
+
+# ============================================================================
+# INCREMENTAL UPDATES
+# ============================================================================
+
+def _deltas(points, sign, deltas=None):
+    """Aggregate point changes per (zoom, x, y)"""
+    if deltas is None:
+        deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for lng, lat in points:
+        for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+            delta = deltas[(zoom, *cell_for(lng, lat, zoom))]
+            delta[0] += sign
+            delta[1] += sign * lng
+            delta[2] += sign * lat
+    return deltas
+
+
+def _cells(keys):
+    """Q matching the cells of (zoom, x, y) keys"""
+    return reduce(or_, (Q(zoom=zoom, x=x, y=y) for zoom, x, y in keys))
+
+
+def _apply_batch(deltas):
+    """
+    Apply {(zoom, x, y): [count, lng_sum, lat_sum]} in three statements:
+    look up the existing cells, insert the missing ones, update the rest
+    with one CASE per column.
+    """
+    existing = set(
+        MapClusterCell.objects.filter(_cells(deltas)).values_list('zoom', 'x', 'y')
+    )
+
+    missing = [key for key in deltas if key not in existing and deltas[key][0] > 0]
+    if missing:
+        try:
+            with transaction.atomic():
+                MapClusterCell.objects.bulk_create([
+                    MapClusterCell(
+                        zoom=zoom, x=x, y=y,
+                        count=deltas[(zoom, x, y)][0],
+                        lng_sum=deltas[(zoom, x, y)][1],
+                        lat_sum=deltas[(zoom, x, y)][2]
+                    )
+                    for zoom, x, y in missing
+                ])
+        except IntegrityError:
+            # Some were created concurrently - start over on top of them
+            _apply_batch(deltas)
+            return
+
+    existing = [key for key in deltas if key in existing]
+    if not existing:
+        return
+
+    def column(name, index):
+        whens = []
+        for zoom, x, y in existing:
+            delta = deltas[(zoom, x, y)]
+            # Never take a cell below zero
+            guard = {'count__gte': -delta[0]} if delta[0] < 0 else {}
+            whens.append(When(
+                zoom=zoom, x=x, y=y, **guard,
+                then=F(name) + delta[index]
+            ))
+        return Case(
+            *whens, default=F(name),
+            output_field=MapClusterCell._meta.get_field(name)
+        )
+
+    MapClusterCell.objects.filter(_cells(existing)).update(
+        count=column('count', 0),
+        lng_sum=column('lng_sum', 1),
+        lat_sum=column('lat_sum', 2)
+    )
+
+
+def _apply_deltas(deltas):
+    changed = [(key, delta) for key, delta in deltas.items() if any(delta)]
+    for start in range(0, len(changed), DELTA_BATCH_SIZE):
+        _apply_batch(dict(changed[start:start + DELTA_BATCH_SIZE]))
+
+
+def apply_points(points, sign):
+    """
+    Add (sign=1) or remove (sign=-1) points from every zoom level.
+
+    Args:
+        points: Iterable of (lng, lat) tuples (None entries are ignored)
+        sign: 1 or -1
+    """
+    points = [point for point in points if point is not None]
+    if points:
+        _apply_deltas(_deltas(points, sign))
+
+
+def move_point(before, after):
+    """Move one point; either side may be None"""
+    if before == after:
+        return
+    deltas = _deltas([point for point in [before] if point is not None], -1)
+    _apply_deltas(_deltas([point for point in [after] if point is not None], 1, deltas))
+
+
+# ============================================================================
+# FULL REBUILD
+# ============================================================================
+
+def rebuild_clusters(batch_size=2000):
+    """
+    Recompute every cell from published, located addresses.
+
+    Returns:
+        int: Number of cells written
+    """
+    located = ActivityAddress.objects.filter(
+        activity__status='published',
+        location__isnull=False
+    ).values_list('location', flat=True)
+
+    deltas = _deltas(
+        (point_of(location) for location in located.iterator(chunk_size=batch_size)),
+        1
+    )
+
+    MapClusterCell.objects.all().delete()
+    MapClusterCell.objects.bulk_create(
+        (
+            MapClusterCell(
+                zoom=zoom, x=x, y=y,
+                count=count, lng_sum=lng_sum, lat_sum=lat_sum
+            )
+            for (zoom, x, y), (count, lng_sum, lat_sum) in deltas.items()
+        ),
+        batch_size=batch_size
+    )
+    return len(deltas)
+
+
+# ============================================================================
+# QUERYING
+# ============================================================================
+
+def get_clusters(bbox, zoom):
+    """
+    Clusters intersecting a bbox at a zoom level.
+
+    Args:
+        bbox: (min_lng, min_lat, max_lng, max_lat)
+        zoom: Map zoom level (see fit_zoom)
+
+    Returns:
+        list: {'count', 'coordinates': [lng, lat], 'cell': [x, y]} dicts
+    """
+    zoom = fit_zoom(bbox, zoom)
+    x_min, y_min, x_max, y_max = cell_range(bbox, zoom)
+
+    cells = MapClusterCell.objects.filter(
+        zoom=zoom,
+        x__range=(x_min, x_max),
+        y__range=(y_min, y_max),
+        count__gt=0
+    ).order_by()
+
+    return [
+        {
+            'count': cell.count,
+            'coordinates': cell.centroid,
+            'cell': [cell.x, cell.y],
+        }
+        for cell in cells
+    ]
+
+
+def is_published(activity_id):
+    """Whether an activity is published (used by address signals)"""
+    return Activity.objects.filter(
+        pk=activity_id,
+        status='published'
+    ).exists()
@@ -0,0 +1,271 @@
+# apps/main/compiled.py
+
+"""
+Compiled read path for list serializers.
+
+DRF serializes every field of every item through get_attribute() and
+to_representation() method dispatch. For a many=True read,
+CompiledListSerializer builds one plan per response instead: a tuple of
+(name, getter, converter) steps taken from the child's bound fields, with
+plain attribute getters and builtin converters for the simple field types
+and the bound DRF methods for everything else. The output is the same
+dict DRF would produce, so the rendered JSON is byte-identical.
+
+Opt in with Meta.list_serializer_class = CompiledListSerializer. Children
+that override to_representation() keep the regular DRF path.
+"""
+
+import inspect
+import types
+from collections.abc import Mapping
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import SkipField
+from rest_framework.settings import api_settings
+
+from apps.observability.timing import TimedSerializerMixin, timed
+from apps.observability.tracing import current_trace, span
+
+# Field types whose to_representation() is a plain builtin conversion
+SIMPLE_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.SlugField: str,
+    serializers.EmailField: str,
+    serializers.URLField: str,
+    serializers.IntegerField: int,
+    serializers.BooleanField: bool,
+}
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _identity(value):
+    return value
+
+
+def _datetime_converter(field):
+    """DateTimeField.to_representation with the timezone looked up once"""
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.utcoffset() is None:
+            # Naive values: let DRF make them aware (and validate them)
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _choice_converter(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        if value == '':
+            return value
+        return choices.get(str(value), value)
+    return convert
+
+
+def _file_converter(field, model):
+    """
+    FileField/ImageField URLs of a FileSystemStorage: the absolute
+    media prefix is built once instead of urljoin() + build_absolute_uri()
+    per item.
+    """
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+    try:
+        storage = model._meta.get_field(field.source_attrs[0]).storage
+    except (AttributeError, FieldDoesNotExist):
+        return field.to_representation
+    if (
+        not use_url
+        or len(field.source_attrs) != 1
+        or type(storage).url is not FileSystemStorage.url
+        or storage.base_url is None
+    ):
+        return field.to_representation
+
+    request = field.context.get('request', None)
+    prefix = storage.base_url
+    if request is not None:
+        prefix = request.build_absolute_uri(prefix)
+
+    def convert(value):
+        if not value:
+            return None
+        url = filepath_to_uri(value.name).lstrip('/')
+        if '/.' in f'/{url}':
+            # Dot segments: urljoin() would normalize them
+            return field.to_representation(value)
+        return prefix + url
+    return convert
+
+
+def _converter(field, model=None):
+    """Function equivalent to field.to_representation for non-None values"""
+    field_type = type(field)
+    if field_type in SIMPLE_CONVERTERS:
+        return SIMPLE_CONVERTERS[field_type]
+
+    if field_type in (serializers.DateField, serializers.TimeField):
+        default = (
+            api_settings.DATE_FORMAT if field_type is serializers.DateField
+            else api_settings.TIME_FORMAT
+        )
+        output_format = getattr(field, 'format', default)
+        if isinstance(output_format, str) and output_format.lower() == ISO_8601:
+            return _isoformat
+
+    if field_type is serializers.DateTimeField:
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if isinstance(output_format, str) and output_format.lower() == ISO_8601:
+            return _datetime_converter(field)
+
+    if field_type is serializers.ChoiceField:
+        return _choice_converter(field)
+
+    if field_type in (serializers.FileField, serializers.ImageField) and model is not None:
+        return _file_converter(field, model)
+
+    if field_type is serializers.SerializerMethodField:
+        # Skip the per-item method lookup
+        return getattr(field.parent, field.method_name)
+
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        # _getter() already resolved the primary key
+        return _identity
+
+    if is_compilable(field):
+        return _traced(field, compile_serializer(field))
+    return field.to_representation
+
+
+def _getter(field, model):
+    """Function equivalent to field.get_attribute (None for missing relations)"""
+    if field.source == '*':
+        return field.get_attribute
+
+    attrs = field.source_attrs
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if len(attrs) == 1 and model is not None and field.use_pk_only_optimization():
+            try:
+                # Local foreign key column: no related object is loaded
+                return attrgetter(model._meta.get_field(attrs[0]).attname)
+            except FieldDoesNotExist:
+                pass
+        return _pk_only(field)
+
+    if len(attrs) != 1:
+        return field.get_attribute
+    attr = attrs[0]
+
+    if model is None:
+        # Plain serializer: the instance type is only known per item
+        def get(instance):
+            if isinstance(instance, Mapping):
+                return field.get_attribute(instance)
+            try:
+                value = getattr(instance, attr)
+            except ObjectDoesNotExist:
+                return None
+            return value() if isinstance(value, types.MethodType) else value
+        return get
+
+    # DRF calls methods named by the source; keep its path for those
+    if inspect.isfunction(getattr(model, attr, None)):
+        return field.get_attribute
+
+    def get(instance):
+        try:
+            return getattr(instance, attr)
+        except ObjectDoesNotExist:
+            return None
+    return get
+
+
+def _pk_only(field):
+    def get(instance):
+        attribute = field.get_attribute(instance)
+        return getattr(attribute, 'pk', attribute)
+    return get
+
+
+def _traced(serializer, represent):
+    """Nested serializer as a span per item, when the request is traced"""
+    if current_trace() is None:
+        return represent
+    name = f'serialize {type(serializer).__name__}'
+
+    def traced(instance):
+        with span(name, **{'serializer.field': serializer.field_name}):
+            return represent(instance)
+    return traced
+
+
+def is_compilable(serializer):
+    """Plain (non-list) serializers that use Serializer.to_representation"""
+    if not isinstance(serializer, serializers.Serializer):
+        return False
+    for klass in type(serializer).__mro__:
+        # TimedSerializerMixin only adds a tracing span around it
+        if klass is not TimedSerializerMixin and 'to_representation' in vars(klass):
+            return klass is serializers.Serializer
+    return False
+
+
+def compile_serializer(serializer):
+    """
+    Build instance -> dict for a bound serializer (the current selection
+    of fields and context is captured).
+    """
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    steps = tuple(
+        (field.field_name, _getter(field, model), _converter(field, model))
+        for field in serializer._readable_fields
+    )
+
+    def represent(instance):
+        ret = {}
+        for name, get, convert in steps:
+            try:
+                value = get(instance)
+            except SkipField:
+                continue
+            ret[name] = None if value is None else convert(value)
+        return ret
+    return represent
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """ListSerializer whose items go through a compiled plan"""
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+    def to_representation(self, data):
+        if self.field_name and current_trace() is not None:
+            # Nested list of a traced request
+            name = f'serialize {type(self.child).__name__}[]'
+            with span(name, **{'serializer.field': self.field_name}):
+                return self.represent_items(data)
+        return self.represent_items(data)
+
+    def represent_items(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        if not is_compilable(self.child):
+            return [self.child.to_representation(item) for item in iterable]
+        represent = compile_serializer(self.child)
+        return [represent(item) for item in iterable]
@@ -0,0 +1,100 @@
+# apps/main/conditional.py
+
+"""
+Conditional GET (ETag / Last-Modified) for read endpoints.
+
+Validators are computed from cheap aggregates (latest updated_at, row
+counts) plus the response cache generation, never from the serialized
+body, so a matching If-None-Match / If-Modified-Since is answered with
+304 Not Modified before any serializer runs.
+"""
+
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_generation, get_invalidated_at
+
+
+def make_etag(*parts):
+    """Strong, quoted ETag from an ordered set of fingerprint parts"""
+    raw = '\n'.join(repr(part) for part in parts)
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def latest_timestamp(*values):
+    """
+    Newest of datetimes / unix timestamps (None entries ignored),
+    as an integer unix timestamp for Last-Modified.
+    """
+    timestamps = []
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, datetime):
+            if timezone.is_naive(value):
+                value = value.replace(tzinfo=dt_timezone.utc)
+            value = value.timestamp()
+        timestamps.append(value)
+    # Round up: Last-Modified has one-second resolution
+    return int(-(-max(timestamps) // 1)) if timestamps else None
+
+
+class ConditionalGetMixin:
+    """
+    Viewset helpers for ETag / Last-Modified handling.
+
+    Views compute `(etag, last_modified)` themselves and call
+    `not_modified_response()` before serializing, then
+    `set_validators()` on the full response.
+    """
+
+    def get_validator_parts(self, request):
+        """Request state every representation depends on"""
+        user = request.user
+        return [
+            get_generation(),
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            bool(user and user.is_staff),
+            getattr(user, 'pk', None),
+            timezone.localdate().isoformat(),
+        ]
+
+    def build_validators(self, request, parts, modified):
+        """
+        Args:
+            parts: View specific fingerprint values
+            modified: Datetimes the representation depends on
+
+        Returns:
+            tuple: (etag, last_modified unix timestamp or None)
+        """
+        etag = make_etag(*self.get_validator_parts(request), *parts)
+        last_modified = latest_timestamp(get_invalidated_at(), *modified)
+        return etag, last_modified
+
+    def not_modified_response(self, request, validators):
+        """304 response if the client's copy is current, else None"""
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        etag, last_modified = validators
+        response = get_conditional_response(
+            request._request if hasattr(request, '_request') else request,
+            etag=etag,
+            last_modified=last_modified
+        )
+        if response is not None:
+            self.set_validators(response, validators)
+        return response
+
+    def set_validators(self, response, validators):
+        etag, last_modified = validators
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Authorization'])
+        return response
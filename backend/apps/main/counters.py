@@ -0,0 +1,194 @@
+# apps/main/counters.py
+
+"""
+Denormalized counters.
+
+Category.activities_count and Organizer.activities_count hold the number of
+published activities, Activity.comments_count the number of active
+comments. Single-object changes are applied as +1/-1 deltas from signal
+handlers (see signals.py); bulk changes that bypass signals
+(queryset.update, bulk_create) call rebuild_counters() or
+rebuild_comment_counts() for the affected rows.
+"""
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Activity, Category, Comment, Organizer
+
+
+COUNTED_FIELDS = ('status', 'category_id', 'organizer_id')
+
+
+# ============================================================================
+# STATE HELPERS
+# ============================================================================
+
+def counted_state(values):
+    """
+    Return (category_id, organizer_id) if the activity counts towards the
+    counters, otherwise None.
+    """
+    if values is None or values.get('status') != 'published':
+        return None
+    return values.get('category_id'), values.get('organizer_id')
+
+
+def current_state(activity):
+    """Counted state of an in-memory activity"""
+    return counted_state({
+        field: getattr(activity, field) for field in COUNTED_FIELDS
+    })
+
+
+def stored_state(activity):
+    """
+    Counted state of an activity as it is stored in the database.
+    Uses values remembered by Activity.from_db when possible.
+    """
+    if activity._state.adding or activity.pk is None:
+        return None
+
+    loaded = getattr(activity, '_loaded_values', None)
+    if loaded is not None and all(field in loaded for field in COUNTED_FIELDS):
+        return counted_state(loaded)
+
+    return counted_state(
+        Activity.objects.filter(pk=activity.pk).values(*COUNTED_FIELDS).first()
+    )
+
+
+# ============================================================================
+# INCREMENTAL UPDATES
+# ============================================================================
+
+def _adjust(model, pk, delta, field='activities_count'):
+    """Atomically add delta to a single counter, never going below zero"""
+    if pk is None:
+        return
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def apply_change(before, after):
+    """Apply the difference between two counted states"""
+    if before == after:
+        return
+    if before is not None:
+        category_id, organizer_id = before
+        _adjust(Category, category_id, -1)
+        _adjust(Organizer, organizer_id, -1)
+    if after is not None:
+        category_id, organizer_id = after
+        _adjust(Category, category_id, 1)
+        _adjust(Organizer, organizer_id, 1)
+
+
+# ============================================================================
+# FULL REBUILD
+# ============================================================================
+
+def _published_count(field):
+    """Correlated subquery counting published activities per parent row"""
+    published = Activity.objects.filter(
+        status='published',
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(published, output_field=IntegerField()), 0)
+
+
+def rebuild_counters(category_ids=None, organizer_ids=None):
+    """
+    Recompute counters from scratch.
+
+    Args:
+        category_ids: Categories to rebuild (None = all)
+        organizer_ids: Organizers to rebuild (None = all)
+
+    Returns:
+        tuple: (categories updated, organizers updated)
+    """
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=[pk for pk in category_ids if pk])
+
+    organizers = Organizer.objects.all()
+    if organizer_ids is not None:
+        organizers = organizers.filter(pk__in=[pk for pk in organizer_ids if pk])
+
+    return (
+        categories.update(activities_count=_published_count('category')),
+        organizers.update(activities_count=_published_count('organizer')),
+    )
+
+
+def affected_parents(queryset):
+    """
+    Collect (category_ids, organizer_ids) touched by an activity queryset.
+    Evaluate it before queryset.update() changes what the filter matches.
+    """
+    pairs = list(
+        queryset.order_by().values_list('category_id', 'organizer_id').distinct()
+    )
+    return (
+        {category_id for category_id, _ in pairs},
+        {organizer_id for _, organizer_id in pairs},
+    )
+
+
+# ============================================================================
+# COMMENT COUNTERS
+# ============================================================================
+
+def comment_state(values):
+    """Activity id if the comment counts (is active), otherwise None"""
+    if values is None or not values.get('is_active'):
+        return None
+    return values.get('activity_id')
+
+
+def stored_comment_state(comment):
+    """Counted state of a comment as it is stored in the database"""
+    if comment._state.adding or comment.pk is None:
+        return None
+
+    loaded = getattr(comment, '_loaded_values', None)
+    if loaded is not None and 'is_active' in loaded and 'activity_id' in loaded:
+        return comment_state(loaded)
+
+    return comment_state(
+        Comment.objects.filter(pk=comment.pk).values('is_active', 'activity_id').first()
+    )
+
+
+def apply_comment_change(before, after):
+    """Move Activity.comments_count between two comment states"""
+    if before == after:
+        return
+    _adjust(Activity, before, -1, field='comments_count')
+    _adjust(Activity, after, 1, field='comments_count')
+
+
+def rebuild_comment_counts(activity_ids=None):
+    """
+    Recompute Activity.comments_count.
+
+    Args:
+        activity_ids: Activities to rebuild (None = all)
+
+    Returns:
+        int: Activities updated
+    """
+    active = Comment.objects.filter(
+        is_active=True,
+        activity=OuterRef('pk')
+    ).order_by().values('activity').annotate(total=Count('pk')).values('total')
+
+    activities = Activity.objects.all()
+    if activity_ids is not None:
+        activities = activities.filter(pk__in=list(activity_ids))
+    return activities.update(
+        comments_count=Coalesce(Subquery(active, output_field=IntegerField()), 0)
+    )
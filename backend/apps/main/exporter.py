@@ -0,0 +1,224 @@
+# apps/main/exporter.py
+
+"""
+Streaming activity export as NDJSON, CSV or iCalendar.
+
+Rows are read in primary key order, one keyset query per `chunk_size`
+rows (pk > last pk seen), and encoded one at a time, so memory use does
+not grow with the catalogue. queryset.iterator() would not bound it on
+MySQL, whose default client cursor buffers the whole result. Columns match what
+apps.main.importer accepts, so an export can be re-imported elsewhere.
+
+Under ASGI, StreamingHttpResponse reads a sync iterator whole into a list
+before sending it: aexport_lines() is the async iterator to stream there.
+"""
+
+import csv
+import io
+from datetime import timezone as dt_timezone
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Activity
+
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ics': ('text/calendar; charset=utf-8', 'ics'),
+}
+CHUNK_SIZE = 1000
+
+COLUMNS = (
+    'name', 'slug', 'date', 'time', 'summary', 'description',
+    'price', 'website', 'status', 'organizer', 'category',
+    'place_name', 'address', 'city', 'postcode', 'country',
+    'longitude', 'latitude',
+    'views_count', 'created_at', 'updated_at',
+)
+
+
+def base_queryset():
+    """Activities with the relations every exported row needs"""
+    return Activity.objects.select_related('organizer', 'category', 'address')
+
+
+# ============================================================================
+# ROWS
+# ============================================================================
+
+def activity_row(activity):
+    """Flat export row of an activity"""
+    address = getattr(activity, 'address', None)
+    return {
+        'name': activity.name,
+        'slug': activity.slug,
+        'date': activity.date,
+        'time': activity.time,
+        'summary': activity.summary,
+        'description': activity.description,
+        'price': activity.price,
+        'website': activity.website,
+        'status': activity.status,
+        'organizer': activity.organizer.slug,
+        'category': activity.category.slug if activity.category else None,
+        'place_name': address.place_name if address else None,
+        'address': address.address if address else None,
+        'city': address.city if address else None,
+        'postcode': address.postcode if address else None,
+        'country': address.country if address else None,
+        'longitude': address.longitude if address else None,
+        'latitude': address.latitude if address else None,
+        'views_count': activity.views_count,
+        'created_at': activity.created_at,
+        'updated_at': activity.updated_at,
+    }
+
+
+def iter_activities(queryset, chunk_size=CHUNK_SIZE):
+    """Activities of a queryset in pk order, `chunk_size` rows per query"""
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        batch = list(batch[:chunk_size])
+        yield from batch
+        if len(batch) < chunk_size:
+            return
+        last = batch[-1].pk
+
+
+# ============================================================================
+# ENCODERS
+# ============================================================================
+
+def ndjson_lines(queryset, chunk_size=CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for activity in iter_activities(queryset, chunk_size):
+        yield encoder.encode(activity_row(activity)) + '\n'
+
+
+def csv_lines(queryset, chunk_size=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    yield flush()
+    for activity in iter_activities(queryset, chunk_size):
+        row = activity_row(activity)
+        writer.writerow({
+            key: '' if value is None else (
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+            for key, value in row.items()
+        })
+        yield flush()
+
+
+def _ics_escape(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _ics_fold(line):
+    """Fold a content line at 75 octets (RFC 5545 3.1)"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Do not split a UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _ics_utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ics_event(activity, host):
+    row = activity_row(activity)
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{activity.slug}@{host}',
+        f'DTSTAMP:{_ics_utc(activity.updated_at)}',
+        f'DTSTART;TZID={settings.TIME_ZONE}:'
+        f'{activity.date.strftime("%Y%m%d")}T{activity.time.strftime("%H%M%S")}',
+        f'SUMMARY:{_ics_escape(activity.name)}',
+        f'DESCRIPTION:{_ics_escape(activity.description)}',
+        f'X-WHATSNEW-SUMMARY:{_ics_escape(activity.summary)}',
+        f'X-WHATSNEW-ORGANIZER:{_ics_escape(row["organizer"])}',
+        'STATUS:' + ('CONFIRMED' if activity.status == 'published' else 'TENTATIVE'),
+    ]
+    if activity.category:
+        lines.append(f'CATEGORIES:{_ics_escape(activity.category.name)}')
+    if activity.website:
+        lines.append(f'URL:{activity.website}')
+    if activity.price is not None:
+        lines.append(f'X-WHATSNEW-PRICE:{activity.price}')
+    address = getattr(activity, 'address', None)
+    if address:
+        location = ', '.join(part for part in (
+            address.place_name, address.address, address.city, address.postcode
+        ) if part)
+        lines.append(f'LOCATION:{_ics_escape(location)}')
+        if address.location:
+            lines.append(f'GEO:{address.latitude};{address.longitude}')
+    lines.append('END:VEVENT')
+    return ''.join(_ics_fold(line) for line in lines)
+
+
+def ics_lines(queryset, chunk_size=CHUNK_SIZE, host='whatsnew'):
+    yield _ics_fold('BEGIN:VCALENDAR')
+    yield _ics_fold('VERSION:2.0')
+    yield _ics_fold('PRODID:-//WhatsNew//Activities//EN')
+    for activity in iter_activities(queryset, chunk_size):
+        yield ics_event(activity, host)
+    yield _ics_fold('END:VCALENDAR')
+
+
+ENCODERS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+    'ics': ics_lines,
+}
+
+
+def export_lines(queryset, export_format, chunk_size=CHUNK_SIZE, **kwargs):
+    """Iterator of encoded text chunks for a format of FORMATS"""
+    return ENCODERS[export_format](queryset, chunk_size=chunk_size, **kwargs)
+
+
+async def aexport_lines(queryset, export_format, chunk_size=CHUNK_SIZE, **kwargs):
+    """
+    export_lines() as an async iterator. Each step takes up to
+    `chunk_size` chunks (one keyset batch) in a sync_to_async() call.
+    """
+    lines = export_lines(queryset, export_format, chunk_size, **kwargs)
+    take = sync_to_async(lambda: list(islice(lines, chunk_size)))
+    try:
+        while chunks := await take():
+            for chunk in chunks:
+                yield chunk
+    finally:
+        await sync_to_async(lines.close)()
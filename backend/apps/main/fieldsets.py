@@ -0,0 +1,173 @@
+# apps/main/fieldsets.py
+
+"""
+Sparse fieldsets and expansion control for read requests.
+
+    ?fields=id,name,date,poster     only these fields
+    ?fields=id,organizer.name       nested fields with dotted paths
+    ?expand=category                expand only these relations; the other
+                                    Meta.expandable_fields render as ids
+
+Without ?expand= every relation is expanded (the original payload).
+Serializers opt in with DynamicFieldsMixin; views build their queryset
+with select_related()/prefetch_related() from query_plan(), so relations
+that are not serialized are not joined either.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+# Selection not given explicitly: read it from the request / parent
+_INHERIT = object()
+
+
+def parse_paths(value):
+    """'a,b.c' -> {'a', 'b.c'}; None when the parameter is absent"""
+    if value is None:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+def top_level(paths):
+    return {path.split('.', 1)[0] for path in paths}
+
+
+def nested_fields(paths, name):
+    """Field paths below `name` (None: all of its fields)"""
+    if paths is None or name in paths:
+        return None
+    prefix = f'{name}.'
+    return {path[len(prefix):] for path in paths if path.startswith(prefix)} or None
+
+
+def nested_expand(paths, name):
+    """Expand paths below `name` (None: expand everything)"""
+    if paths is None:
+        return None
+    prefix = f'{name}.'
+    return {path[len(prefix):] for path in paths if path.startswith(prefix)}
+
+
+# ============================================================================
+# SERIALIZER MIXIN
+# ============================================================================
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin applying ?fields= and ?expand= on safe requests.
+
+    Meta.expandable_fields: forward relations that render as their
+    primary key unless expanded.
+    Meta.field_sources: model fields read by computed fields, e.g.
+    {'has_address': ['address']} (used by query_plan()).
+    """
+
+    def __init__(self, *args, fields=_INHERIT, expand=_INHERIT, **kwargs):
+        self._selected_fields = fields
+        self._selected_expand = expand
+        super().__init__(*args, **kwargs)
+
+    def get_selection(self):
+        """(fields, expand) path sets; None means unrestricted"""
+        if self._selected_fields is not _INHERIT or self._selected_expand is not _INHERIT:
+            return (
+                None if self._selected_fields is _INHERIT else self._selected_fields,
+                None if self._selected_expand is _INHERIT else self._selected_expand,
+            )
+
+        node, name = self, self.field_name
+        if isinstance(self.parent, serializers.ListSerializer):
+            node, name = self.parent, self.parent.field_name
+        parent = node.parent
+
+        if parent is None:
+            request = self.context.get('request')
+            if request is None or request.method not in SAFE_METHODS:
+                return None, None
+            params = request.query_params
+            return parse_paths(params.get(FIELDS_PARAM)), parse_paths(params.get(EXPAND_PARAM))
+
+        if isinstance(parent, DynamicFieldsMixin):
+            fields, expand = parent.get_selection()
+            return nested_fields(fields, name), nested_expand(expand, name)
+        return None, None
+
+    def nested_selection(self, name):
+        """Keyword arguments selecting a nested serializer built by hand"""
+        fields, expand = self.get_selection()
+        return {
+            'fields': nested_fields(fields, name),
+            'expand': nested_expand(expand, name),
+        }
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected, expand = self.get_selection()
+
+        if selected is not None:
+            wanted = top_level(selected)
+            fields = {name: field for name, field in fields.items() if name in wanted}
+
+        if expand is not None:
+            expanded = top_level(expand)
+            meta = getattr(self, 'Meta', None)
+            for name in getattr(meta, 'expandable_fields', ()):
+                if name in fields and name not in expanded:
+                    source = fields[name].source
+                    kwargs = {'source': source} if source and source != name else {}
+                    fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, **kwargs)
+        return fields
+
+
+# ============================================================================
+# QUERY PLAN
+# ============================================================================
+
+def _unwrap(field):
+    return field.child if isinstance(field, serializers.ListSerializer) else field
+
+
+def query_plan(serializer, model):
+    """
+    Relations the serializer's (selected) fields read.
+
+    Returns:
+        tuple: (select_related paths, prefetch_related names)
+    """
+    meta = getattr(_unwrap(serializer), 'Meta', None)
+    field_sources = getattr(meta, 'field_sources', {})
+    select, prefetch = set(), set()
+
+    for name, field in _unwrap(serializer).fields.items():
+        if field.write_only:
+            continue
+        sources = field_sources.get(name)
+        if sources is None:
+            sources = [] if field.source == '*' else [field.source.split('.', 1)[0]]
+
+        for source in sources:
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if not model_field.is_relation:
+                continue
+            if model_field.one_to_many or model_field.many_to_many:
+                prefetch.add(source)
+            elif not (
+                isinstance(field, serializers.PrimaryKeyRelatedField)
+                and model_field.concrete
+            ):
+                # Collapsed forward relations only need the local *_id column
+                select.add(source)
+    return select, prefetch
+
+
+def select_related(queryset, paths):
+    """queryset.select_related(*paths), but no join at all for no paths"""
+    # select_related() without arguments would follow every foreign key
+    return queryset.select_related(*sorted(paths)) if paths else queryset
@@ -0,0 +1,166 @@
+# apps/main/filters.py
+
+import math
+
+from django.contrib.gis.db.models.functions import Distance, GeoFunc
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from . import search
+from .models import ActivityAddress
+
+KM_PER_DEGREE = 111.32
+
+
+class MetresField(FloatField):
+    """Float metres from the database, read back as a Distance"""
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else D(m=value)
+
+
+class DistanceSphere(GeoFunc):
+    """
+    Great-circle distance in metres (MySQL's ST_Distance_Sphere).
+
+    MySQL rejects Distance objects on geodetic distance lookups, so the
+    radius is compared against this expression in plain metres instead.
+    """
+    function = 'ST_Distance_Sphere'
+    geom_param_pos = (0, 1)
+    output_field = MetresField()
+
+
+class ActivitySearchFilter(filters.SearchFilter):
+    """
+    `?search=` backed by the activity inverted index (see search.py).
+
+    Results are ordered by relevance unless `?ordering=` is given.
+    Place after OrderingFilter in filter_backends.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        queryset = search.search(queryset, ' '.join(search_terms))
+
+        if 'search_rank' not in queryset.query.annotations:
+            return queryset
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.order_by('-search_rank', *ordering)
+
+
+class NearbyFilter(filters.BaseFilterBackend):
+    """
+    `?near=lng,lat&radius_km=` - activities whose address lies within the
+    radius, annotated with `distance` and ordered nearest first unless
+    `?ordering=` is given.
+
+    A bounding-box prefilter runs before the exact distance check. On
+    SpatiaLite it goes through the SpatialIndex virtual table, so the
+    R-tree narrows the candidates. MySQL only indexes NOT NULL geometry
+    columns and `location` is nullable, so there the MBR test is a cheap
+    per-row check rather than an index lookup.
+    Place last in filter_backends.
+    """
+    near_param = 'near'
+    radius_param = 'radius_km'
+    default_radius_km = 10
+    max_radius_km = 500
+
+    def get_center(self, request):
+        raw = request.query_params.get(self.near_param)
+        if not raw:
+            return None
+        try:
+            longitude, latitude = (float(part) for part in raw.split(','))
+        except ValueError:
+            raise ValidationError({
+                self.near_param: 'Expected "longitude,latitude".'
+            })
+        if not (-180 <= longitude <= 180) or not (-90 <= latitude <= 90):
+            raise ValidationError({
+                self.near_param: 'Coordinates out of range.'
+            })
+        return Point(longitude, latitude, srid=4326)
+
+    def get_radius(self, request):
+        raw = request.query_params.get(self.radius_param)
+        if raw in (None, ''):
+            return self.default_radius_km
+        try:
+            radius = float(raw)
+        except ValueError:
+            raise ValidationError({self.radius_param: 'Must be a number.'})
+        if not (0 < radius <= self.max_radius_km):
+            raise ValidationError({
+                self.radius_param: f'Must be between 0 and {self.max_radius_km}.'
+            })
+        return radius
+
+    @staticmethod
+    def bounding_box(center, radius_km):
+        """Lon/lat box enclosing the circle (ignores the antimeridian)"""
+        lat_delta = radius_km / KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(center.y)), 1e-6)
+        lng_delta = min(radius_km / (KM_PER_DEGREE * cos_lat), 180)
+        return (
+            max(center.x - lng_delta, -180),
+            max(center.y - lat_delta, -90),
+            min(center.x + lng_delta, 180),
+            min(center.y + lat_delta, 90),
+        )
+
+    @staticmethod
+    def spatial_index_rows(bbox):
+        """SpatiaLite subquery: address rowids whose MBR meets the box"""
+        meta = ActivityAddress._meta
+        return RawSQL(
+            'SELECT ROWID FROM SpatialIndex WHERE f_table_name = %s '
+            'AND f_geometry_column = %s AND search_frame = BuildMbr(%s, %s, %s, %s, 4326)',
+            (meta.db_table, meta.get_field('location').column, *bbox),
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        center = self.get_center(request)
+        if center is None:
+            return queryset
+        radius = self.get_radius(request)
+        bbox = self.bounding_box(center, radius)
+        vendor = connections[queryset.db].vendor
+
+        if vendor == 'mysql':
+            mbr = Polygon.from_bbox(bbox)
+            mbr.srid = 4326
+            queryset = queryset.filter(
+                address__location__contained=mbr,
+            ).annotate(
+                distance=DistanceSphere('address__location', center)
+            ).filter(distance__lte=radius * 1000)
+        else:
+            if vendor == 'sqlite':
+                queryset = queryset.filter(
+                    address__pk__in=self.spatial_index_rows(bbox)
+                )
+            queryset = queryset.filter(
+                address__location__distance_lte=(center, D(km=radius)),
+            ).annotate(
+                distance=Distance('address__location', center)
+            )
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.order_by('distance', *ordering)
@@ -0,0 +1,542 @@
+# apps/main/importer.py
+
+"""
+Bulk activity import from CSV, JSON (array or NDJSON) and iCalendar.
+
+Files are parsed incrementally and processed in batches: each batch is
+validated with ActivityImportSerializer (no queries per row), organizer and
+category references are resolved with one query each, then activities and
+addresses are written with bulk_create. bulk_create bypasses Activity.save
+and the model signals, so the serializer enforces the model's clean()
+rules and the importer updates counters, search index, map clusters and
+the response cache itself once per batch.
+
+Memory stays bounded by the batch size and the capped error report. The
+API endpoint imports synchronously, so its uploads are limited in size and
+rows (ACTIVITY_IMPORT); the management command has no limits.
+"""
+
+import codecs
+import csv
+import io
+import json
+import re
+import zoneinfo
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import clusters, search
+from .cache import bump_generation
+from .counters import rebuild_counters
+from .models import Activity, ActivityAddress, Category, Organizer
+from .serializers import ActivityImportSerializer
+from .slugs import bulk_create_with_slugs
+
+
+FORMATS = ('csv', 'json', 'ics')
+BATCH_SIZE = 500
+MAX_ERRORS = 1000
+
+ADDRESS_FIELDS = (
+    'place_name', 'address', 'city', 'postcode', 'country',
+    'longitude', 'latitude',
+)
+
+
+DEFAULTS = {
+    # Limits of the synchronous API import
+    'MAX_ROWS': 5000,
+    'MAX_UPLOAD_SIZE': 5 * 1024 * 1024,   # bytes
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ACTIVITY_IMPORT', {})}
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be parsed at all (as opposed to invalid rows)"""
+
+
+class ImportLimitError(ImportFormatError):
+    """The file has more rows than the importer accepts"""
+
+
+def reference_condition(reference):
+    """Q matching a reference by slug, or by pk if it is a number"""
+    condition = Q(slug=reference)
+    if reference.isdigit():
+        condition |= Q(pk=int(reference))
+    return condition
+
+
+# ============================================================================
+# PARSERS
+# ============================================================================
+
+def text_stream(fileobj):
+    """Text view of a binary or text file object (BOM-tolerant UTF-8)"""
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return codecs.getreader('utf-8-sig')(fileobj)
+
+
+def detect_format(filename):
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('ndjson', 'jsonl'):
+        return 'json'
+    if extension in ('ical', 'ifb', 'icalendar'):
+        return 'ics'
+    return extension if extension in FORMATS else None
+
+
+def iter_csv(stream):
+    """Rows of a CSV file with a header line"""
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames:
+        raise ImportFormatError('CSV file has no header row.')
+    for row in reader:
+        yield {key.strip(): value for key, value in row.items() if key}
+
+
+def _iter_json_array(stream, chunk_size):
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ImportFormatError('Expected a JSON array.')
+    position = 1
+    eof = False
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            if eof:
+                raise ImportFormatError(f'Invalid JSON: {error.msg}.')
+            # Item spans the buffer boundary: read more
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def _iter_ndjson(stream):
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ImportFormatError(f'Invalid JSON on line {number}: {error.msg}.')
+
+
+class PrefixedStream(io.TextIOBase):
+    """Text stream that re-emits an already consumed prefix"""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size=-1):
+        prefix, self._prefix = self._prefix, ''
+        if size is None or size < 0:
+            return prefix + self._stream.read()
+        return prefix + self._stream.read(max(size - len(prefix), 0))
+
+    def readline(self, size=-1):
+        prefix, self._prefix = self._prefix, ''
+        if '\n' in prefix:
+            line, _, rest = prefix.partition('\n')
+            self._prefix = rest
+            return line + '\n'
+        return prefix + self._stream.readline()
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+
+def iter_json(stream, chunk_size=64 * 1024):
+    """Items of a JSON array (read incrementally) or of an NDJSON file"""
+    while True:
+        char = stream.read(1)
+        if not char or not char.isspace():
+            break
+    if not char:
+        return
+    rest = PrefixedStream(char, stream)
+    if char == '[':
+        yield from _iter_json_array(rest, chunk_size)
+    else:
+        yield from _iter_ndjson(rest)
+
+
+ICS_ESCAPES = re.compile(r'\\([\\;,nN])')
+
+
+def _ics_text(value):
+    return ICS_ESCAPES.sub(
+        lambda match: '\n' if match.group(1) in 'nN' else match.group(1),
+        value
+    )
+
+
+def _ics_datetime(params, value):
+    """(date, time) of a DTSTART value in the site time zone"""
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        # All-day event
+        return datetime.strptime(value[:8], '%Y%m%d').date().isoformat(), '00:00:00'
+
+    moment = datetime.strptime(value.rstrip('Z')[:15], '%Y%m%dT%H%M%S')
+    if value.endswith('Z'):
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    elif params.get('TZID'):
+        try:
+            moment = moment.replace(tzinfo=zoneinfo.ZoneInfo(params['TZID']))
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            pass
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    return moment.date().isoformat(), moment.time().isoformat()
+
+
+def _ics_event(properties):
+    """Map VEVENT properties to an import row"""
+    row = {}
+    for name, params, value in properties:
+        if name == 'SUMMARY':
+            row['name'] = _ics_text(value)
+        elif name == 'DESCRIPTION':
+            description = _ics_text(value)
+            row['description'] = description
+            row.setdefault('summary', description[:300])
+        elif name == 'DTSTART':
+            try:
+                row['date'], time = _ics_datetime(params, value)
+            except ValueError:
+                row['date'] = value
+                time = None
+            if time:
+                row['time'] = time
+        elif name == 'URL':
+            row['website'] = value
+        elif name == 'LOCATION':
+            row['address'] = _ics_text(value)
+        elif name == 'GEO':
+            latitude, _, longitude = value.partition(';')
+            row['latitude'], row['longitude'] = latitude, longitude
+        elif name == 'CATEGORIES':
+            row['category'] = _ics_text(value).split(',')[0]
+        elif name == 'X-WHATSNEW-ORGANIZER':
+            row['organizer'] = _ics_text(value)
+        elif name == 'X-WHATSNEW-PRICE':
+            row['price'] = value
+        elif name == 'X-WHATSNEW-SUMMARY':
+            row['summary'] = _ics_text(value)
+    return row
+
+
+def _ics_lines(stream):
+    """Unfolded content lines"""
+    current = None
+    for line in stream:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def iter_ics(stream):
+    """One row per VEVENT of an iCalendar file"""
+    properties = None
+    for line in _ics_lines(stream):
+        head, _, value = line.partition(':')
+        name, *raw_params = head.split(';')
+        name = name.upper()
+
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            properties = []
+        elif name == 'END' and value.upper() == 'VEVENT':
+            if properties is not None:
+                yield _ics_event(properties)
+            properties = None
+        elif properties is not None:
+            params = dict(
+                param.split('=', 1) for param in raw_params if '=' in param
+            )
+            properties.append((name, {k.upper(): v for k, v in params.items()}, value))
+
+
+PARSERS = {
+    'csv': iter_csv,
+    'json': iter_json,
+    'ics': iter_ics,
+}
+
+
+# ============================================================================
+# ROW NORMALIZATION
+# ============================================================================
+
+def normalize_row(raw):
+    """Drop blank values and nest flat address columns"""
+    if not isinstance(raw, dict):
+        return None
+    row = {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in raw.items()
+    }
+    row = {key: value for key, value in row.items() if value not in ('', None)}
+
+    address = row.pop('address', None)
+    if not isinstance(address, dict):
+        address = {'address': address} if address is not None else {}
+    for field in ADDRESS_FIELDS:
+        if field in row:
+            address[field] = row.pop(field)
+    if address:
+        row['address'] = address
+    return row
+
+
+# ============================================================================
+# IMPORTER
+# ============================================================================
+
+class ActivityImporter:
+    """
+    Stream rows into activities.
+
+    Args:
+        author: User set as author of every imported activity
+        organizer: Default organizer (instance) for rows without one
+        batch_size: Rows validated and written together
+        max_errors: Row errors kept in the report (the rest are counted)
+        max_rows: Rows read before giving up with ImportLimitError
+            (None: no limit); the batches before it are kept
+    """
+
+    def __init__(self, author, organizer=None, batch_size=BATCH_SIZE, max_errors=MAX_ERRORS,
+                 max_rows=None):
+        self.author = author
+        self.default_organizer = organizer
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.max_rows = max_rows
+        self.row_serializer = ActivityImportSerializer()
+        self._organizers = {}
+        self._categories = {}
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    # ------------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------------
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    @property
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    # ------------------------------------------------------------------------
+    # Reference resolution (one query per batch and model)
+    # ------------------------------------------------------------------------
+
+    def _resolve(self, model, cache, references, by_name=False):
+        missing = {ref for ref in references if ref not in cache}
+        if not missing:
+            return
+        ids = [int(ref) for ref in missing if ref.isdigit()]
+        condition = Q(pk__in=ids) | Q(slug__in=missing)
+        if by_name:
+            condition |= Q(name__in=missing)
+
+        for pk, slug, name in model.objects.filter(condition).values_list('pk', 'slug', 'name'):
+            for ref in (str(pk), slug, name if by_name else None):
+                if ref in missing:
+                    cache[ref] = pk
+        for ref in missing:
+            cache.setdefault(ref, None)
+
+    # ------------------------------------------------------------------------
+    # Batches
+    # ------------------------------------------------------------------------
+
+    def _validate(self, batch):
+        """Validated rows of a batch as (row number, data) pairs"""
+        valid = []
+        for row_number, raw in batch:
+            row = normalize_row(raw)
+            if row is None:
+                self.add_error(row_number, {'non_field_errors': ['Expected an object.']})
+                continue
+            try:
+                valid.append((row_number, self.row_serializer.run_validation(row)))
+            except serializers.ValidationError as error:
+                self.add_error(row_number, error.detail)
+
+        self._resolve(Organizer, self._organizers, {
+            data['organizer'] for _, data in valid if data.get('organizer')
+        })
+        self._resolve(Category, self._categories, {
+            data['category'] for _, data in valid if data.get('category')
+        }, by_name=True)
+        return valid
+
+    def _build(self, row_number, data):
+        """Unsaved (activity, address) pair or None after reporting errors"""
+        errors = {}
+        address_data = data.pop('address', None)
+
+        reference = data.pop('organizer', None)
+        if reference:
+            organizer_id = self._organizers.get(reference)
+            if organizer_id is None:
+                errors['organizer'] = [f'Unknown organizer "{reference}".']
+        elif self.default_organizer is not None:
+            organizer_id = self.default_organizer.pk
+        else:
+            errors['organizer'] = ['This field is required.']
+
+        reference = data.pop('category', None)
+        category_id = None
+        if reference:
+            category_id = self._categories.get(reference)
+            if category_id is None:
+                errors['category'] = [f'Unknown category "{reference}".']
+
+        if errors:
+            self.add_error(row_number, errors)
+            return None
+
+        activity = Activity(
+            author=self.author,
+            organizer_id=organizer_id,
+            category_id=category_id,
+            **data
+        )
+        address = None
+        if address_data:
+            longitude = address_data.pop('longitude', None)
+            latitude = address_data.pop('latitude', None)
+            address = ActivityAddress(**address_data)
+            if longitude is not None and latitude is not None:
+                address.location = Point(longitude, latitude, srid=4326)
+        return activity, address
+
+    def _write(self, pairs):
+        """bulk_create a batch and update derived data"""
+        activities = [activity for activity, _ in pairs]
+        bulk_create_with_slugs(Activity, activities, batch_size=self.batch_size)
+
+        # Not every backend returns primary keys from bulk_create
+        if any(activity.pk is None for activity in activities):
+            pks = dict(Activity.objects.filter(
+                slug__in=[activity.slug for activity in activities]
+            ).values_list('slug', 'pk'))
+            for activity in activities:
+                activity.pk = pks[activity.slug]
+
+        addresses = []
+        for activity, address in pairs:
+            if address is not None:
+                address.activity_id = activity.pk
+                addresses.append(address)
+        ActivityAddress.objects.bulk_create(addresses, batch_size=self.batch_size)
+
+        search.index_activities(activities)
+        published = {activity.pk for activity in activities if activity.status == 'published'}
+        if published:
+            rebuild_counters(
+                category_ids={a.category_id for a in activities if a.category_id},
+                organizer_ids={a.organizer_id for a in activities}
+            )
+            clusters.apply_points(
+                [clusters.point_of(a.location) for a in addresses if a.activity_id in published],
+                1
+            )
+        bump_generation()
+
+    def process_batch(self, batch):
+        pairs = []
+        row_numbers = []
+        for row_number, data in self._validate(batch):
+            pair = self._build(row_number, data)
+            if pair is not None:
+                pairs.append(pair)
+                row_numbers.append(row_number)
+        if not pairs:
+            return
+
+        try:
+            with transaction.atomic():
+                self._write(pairs)
+        except DatabaseError as error:
+            for row_number in row_numbers:
+                self.add_error(row_number, {'non_field_errors': [f'Database error: {error}']})
+            return
+        self.created += len(pairs)
+
+    def run(self, rows):
+        """
+        Import an iterable of raw row dicts.
+
+        Returns:
+            dict: {'created', 'failed', 'errors', 'errors_truncated'}
+        """
+        batch = []
+        for row_number, raw in enumerate(rows, start=1):
+            if self.max_rows is not None and row_number > self.max_rows:
+                raise ImportLimitError(f'Too many rows (at most {self.max_rows}).')
+            batch.append((row_number, raw))
+            if len(batch) >= self.batch_size:
+                self.process_batch(batch)
+                batch = []
+        if batch:
+            self.process_batch(batch)
+        return self.report
+
+    def import_file(self, fileobj, file_format):
+        """
+        Parse and import a file; raises ImportFormatError if unreadable,
+        ImportLimitError past max_rows.
+        """
+        if file_format not in PARSERS:
+            raise ImportFormatError(
+                f'Unsupported format "{file_format}" (expected one of {", ".join(FORMATS)}).'
+            )
+        try:
+            return self.run(PARSERS[file_format](text_stream(fileobj)))
+        except (UnicodeDecodeError, csv.Error) as error:
+            raise ImportFormatError(str(error))
@@ -0,0 +1,136 @@
+# apps/main/management/commands/benchmark_serializers.py
+
+import gc
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.main.models import Activity, Category, Comment, Organizer
+from apps.main.serializers import (
+    ActivityListSerializer,
+    CategorySerializer,
+    CommentSerializer,
+    OrganizerPublicSerializer,
+)
+
+
+def build_activities(count):
+    """Unsaved activities with their relations cached (no queries)"""
+    categories = [
+        Category(pk=pk, name=f'Category {pk}', slug=f'category-{pk}', activities_count=pk * 3)
+        for pk in range(1, 6)
+    ]
+    organizers = [
+        Organizer(
+            pk=pk, name=f'Organizer {pk}', slug=f'organizer-{pk}',
+            website='https://example.com', activities_count=pk
+        )
+        for pk in range(1, 21)
+    ]
+    today = timezone.localdate()
+    activities = []
+    for pk in range(1, count + 1):
+        activity = Activity(
+            pk=pk,
+            name=f'Activity {pk}',
+            slug=f'activity-{pk}',
+            date=today + timedelta(days=pk % 60),
+            time=timezone.now().time().replace(microsecond=0),
+            summary='A short summary of the activity',
+            poster=f'activities/posters/{pk}.jpg' if pk % 2 else '',
+            price=Decimal('12.50') if pk % 3 else None,
+            organizer=organizers[pk % len(organizers)],
+            category=categories[pk % len(categories)] if pk % 7 else None,
+            status='published',
+            views_count=pk * 11,
+        )
+        # No address: has_address must not query
+        Activity.address.related.set_cached_value(activity, None)
+        activities.append(activity)
+    return activities, organizers, categories
+
+
+def build_comments(count):
+    author = get_user_model()(pk=1, username='author', email='author@example.com')
+    now = timezone.now()
+    return [
+        Comment(
+            pk=pk, activity_id=1, author=author, text=f'Comment number {pk}',
+            is_active=True, created_at=now, updated_at=now
+        )
+        for pk in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF and compiled list serialization (per-item CPU time)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=2000,
+            help='Objects serialized per run (default: 2000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per serializer, the best one counts (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        items, repeat = options['items'], options['repeat']
+        request = Request(APIRequestFactory().get('/api/v1/activities/'))
+        context = {'request': request}
+
+        activities, organizers, categories = build_activities(items)
+        cases = [
+            ('ActivityListSerializer', ActivityListSerializer, activities),
+            ('CommentSerializer', CommentSerializer, build_comments(items)),
+            ('OrganizerPublicSerializer', OrganizerPublicSerializer, organizers * (items // len(organizers))),
+            ('CategorySerializer', CategorySerializer, categories * (items // len(categories))),
+        ]
+
+        renderer = JSONRenderer()
+        for label, serializer_class, objects in cases:
+            compiled = serializer_class(objects, many=True, context=context)
+            child = compiled.child
+
+            def drf():
+                return [child.to_representation(obj) for obj in objects]
+
+            def fast():
+                return compiled.to_representation(objects)
+
+            if renderer.render(drf()) != renderer.render(fast()):
+                self.stderr.write(self.style.ERROR(f'{label}: output differs'))
+                continue
+
+            drf_time = self._best(drf, repeat)
+            fast_time = self._best(fast, repeat)
+            self.stdout.write(
+                f'{label:<28} DRF {drf_time / len(objects) * 1e6:8.2f} us/item   '
+                f'compiled {fast_time / len(objects) * 1e6:8.2f} us/item   '
+                f'{drf_time / fast_time:5.1f}x'
+            )
+
+    def _best(self, func, repeat):
+        best = None
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                start = time.process_time()
+                func()
+                elapsed = time.process_time() - start
+                best = elapsed if best is None else min(best, elapsed)
+        finally:
+            gc.enable()
+        return best
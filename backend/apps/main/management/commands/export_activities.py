@@ -0,0 +1,58 @@
+# apps/main/management/commands/export_activities.py
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.main.exporter import CHUNK_SIZE, FORMATS, base_queryset, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream activities to NDJSON, CSV or iCalendar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--export-format',
+            choices=FORMATS,
+            default='ndjson',
+            help='Output format (default: ndjson)'
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write (default: stdout)'
+        )
+        parser.add_argument(
+            '--status',
+            choices=['published', 'draft', 'all'],
+            default='published',
+            help='Activities to export (default: published)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'Rows fetched per database round trip (default: {CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        queryset = base_queryset()
+        if options['status'] != 'all':
+            queryset = queryset.filter(status=options['status'])
+
+        lines = export_lines(
+            queryset,
+            options['export_format'],
+            chunk_size=options['chunk_size']
+        )
+
+        output = options['output']
+        stream = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+        try:
+            for chunk in lines:
+                stream.write(chunk)
+        finally:
+            if output:
+                stream.close()
+
+        if output:
+            self.stdout.write(self.style.SUCCESS(f'Activities exported to {output}.'))
@@ -0,0 +1,13 @@
+# apps/main/management/commands/flush_view_counts.py
+
+from django.core.management.base import BaseCommand
+
+from apps.main.view_counter import flush_views
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered activity views into views_count'
+
+    def handle(self, *args, **options):
+        flushed = flush_views(force=True)
+        self.stdout.write(self.style.SUCCESS(f'{flushed} views flushed.'))
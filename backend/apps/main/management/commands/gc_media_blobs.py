@@ -0,0 +1,66 @@
+# apps/main/management/commands/gc_media_blobs.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps import renditions, storage
+from apps.main.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = 'Delete unreferenced content-addressed media blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=24,
+            help='Keep unreferenced blobs linked more recently than this (uploads in flight)'
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recompute reference counts from the models first'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List blobs that would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            changed = storage.recount()
+            self.stdout.write(f'{changed} reference counts corrected.')
+
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        garbage = MediaBlob.objects.filter(refcount=0, linked_at__lt=cutoff)
+        media = storage.get_media_storage()
+
+        deleted = freed = 0
+        for blob in garbage.iterator():
+            if options['dry_run']:
+                self.stdout.write(f'{blob.name} ({blob.size} bytes)')
+            else:
+                with transaction.atomic():
+                    # Re-check under the row lock uploads take (apps.storage):
+                    # the blob may have been stored or referenced meanwhile
+                    locked = garbage.select_for_update().filter(pk=blob.pk).first()
+                    if locked is None:
+                        continue
+                    locked.delete()
+                    media.delete(blob.name)
+                renditions.release_renditions({
+                    'source': blob.name,
+                    'formats': renditions.rendition_names(blob.name),
+                })
+            deleted += 1
+            freed += blob.size
+
+        verb = 'would be deleted' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} blobs {verb} ({freed / (1024 * 1024):.1f} MB).'
+        ))
@@ -0,0 +1,56 @@
+# apps/main/management/commands/generate_renditions.py
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps import renditions
+from apps.main.models import Activity, Category
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or outdated image renditions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate renditions even if they are up to date (rewritten in place)'
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            (Activity, 'poster', 'poster_renditions'),
+            (Category, 'image', 'image_renditions'),
+            (get_user_model(), 'avatar', 'avatar_renditions'),
+        ]
+
+        processed = 0
+        # Sources rewritten by --force: rows sharing them reuse the new files
+        regenerated = set()
+        for model, image_field, renditions_field in targets:
+            rows = model._default_manager.exclude(
+                **{image_field: ''}
+            ).exclude(
+                **{f'{image_field}__isnull': True}
+            ).values_list('pk', image_field, renditions_field)
+
+            for pk, source, current in rows.iterator():
+                # Files are never deleted here: other rows may share the
+                # source (content-addressed uploads). Stale files go with
+                # the blob once unreferenced (gc_media_blobs).
+                if not options['force'] and (current or {}).get('source') == source:
+                    continue
+                try:
+                    renditions.process(
+                        model, pk, image_field, renditions_field,
+                        force=options['force'],
+                        reuse=not options['force'] or source in regenerated
+                    )
+                except Exception as error:
+                    self.stderr.write(f'{model._meta.label} #{pk}: {error}')
+                    continue
+                if options['force']:
+                    regenerated.add(source)
+                processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{processed} images processed.'))
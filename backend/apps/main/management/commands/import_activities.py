@@ -0,0 +1,78 @@
+# apps/main/management/commands/import_activities.py
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from apps.main.importer import (
+    BATCH_SIZE, FORMATS, ActivityImporter, ImportFormatError, detect_format,
+    reference_condition
+)
+from apps.main.models import Organizer
+
+
+class Command(BaseCommand):
+    help = 'Bulk import activities from a CSV, JSON/NDJSON or iCalendar file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--author',
+            required=True,
+            help='Email or username of the user set as author'
+        )
+        parser.add_argument(
+            '--organizer',
+            help='Default organizer (id or slug) for rows without one'
+        )
+        parser.add_argument(
+            '--file-format',
+            choices=FORMATS,
+            help='File format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Rows validated and written per batch (default: {BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        author = User.objects.filter(
+            Q(email=options['author']) | Q(username=options['author'])
+        ).first()
+        if author is None:
+            raise CommandError(f'Unknown user "{options["author"]}".')
+
+        organizer = None
+        if options['organizer']:
+            reference = options['organizer']
+            organizer = Organizer.objects.filter(reference_condition(reference)).first()
+            if organizer is None:
+                raise CommandError(f'Unknown organizer "{reference}".')
+
+        file_format = options['file_format'] or detect_format(options['path'])
+        importer = ActivityImporter(
+            author,
+            organizer=organizer,
+            batch_size=options['batch_size']
+        )
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = importer.import_file(fileobj, file_format)
+        except OSError as error:
+            raise CommandError(str(error))
+        except ImportFormatError as error:
+            raise CommandError(f'{error} ({importer.created} activities imported before the error)')
+
+        for error in report['errors']:
+            self.stderr.write(f'row {error["row"]}: {json.dumps(error["errors"])}')
+        if report['errors_truncated']:
+            self.stderr.write(f'... {report["failed"] - len(report["errors"])} more failed rows')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{report["created"]} activities imported, {report["failed"]} rows failed.'
+        ))
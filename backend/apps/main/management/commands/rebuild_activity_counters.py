@@ -0,0 +1,22 @@
+# apps/main/management/commands/rebuild_activity_counters.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.main.cache import bump_generation
+from apps.main.counters import rebuild_comment_counts, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild published activity counters and activity comment counts'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            categories, organizers = rebuild_counters()
+            activities = rebuild_comment_counts()
+            bump_generation()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Counters rebuilt for {categories} categories, '
+            f'{organizers} organizers and {activities} activities.'
+        ))
@@ -0,0 +1,20 @@
+# apps/main/management/commands/rebuild_map_clusters.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.main.cache import bump_generation
+from apps.main.clusters import rebuild_clusters, MAX_ZOOM
+
+
+class Command(BaseCommand):
+    help = 'Rebuild precomputed map cluster grids for all zoom levels'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            cells = rebuild_clusters()
+            bump_generation()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{cells} cluster cells written for zoom levels 0-{MAX_ZOOM}.'
+        ))
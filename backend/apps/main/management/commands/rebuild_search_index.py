@@ -0,0 +1,28 @@
+# apps/main/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.main.cache import bump_generation
+from apps.main.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the activity search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Activities indexed per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed, written = rebuild_index(batch_size=options['batch_size'])
+            bump_generation()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{indexed} activities indexed ({written} terms).'
+        ))
@@ -0,0 +1,94 @@
+# apps/main/management/commands/run_benchmarks.py
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.main.benchmarks.scenarios import SCENARIOS, BenchmarkRunner, compare
+
+
+class Command(BaseCommand):
+    help = 'Time API scenarios against the seeded benchmark data and report JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Timed requests per scenario (default: 50)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Untimed requests per scenario first (default: 5)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Seed for the scenario parameters (default: 1)'
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Only run this scenario and its sub-scenarios (repeatable), '
+                 f'e.g. activities.list; available: {", ".join(s.name for s in SCENARIOS)}'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Keep the anonymous response cache between requests'
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write the JSON report to (default: stdout)'
+        )
+        parser.add_argument(
+            '--compare',
+            metavar='BASELINE',
+            help='Report of an earlier run to compare median latencies with'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError('--iterations must be positive and --warmup not negative.')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}')
+
+        runner = BenchmarkRunner(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            seed=options['seed'],
+            warm_cache=options['warm_cache'],
+            log=self.stderr.write
+        )
+        try:
+            report = runner.run(only=options['scenario'])
+        except LookupError as exc:
+            raise CommandError(str(exc))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                output_file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}.'))
+        elif baseline is None:
+            sys.stdout.write(output + '\n')
+
+        if baseline is not None:
+            self.print_comparison(compare(baseline, report))
+
+    def print_comparison(self, rows):
+        self.stdout.write(f'{"scenario":<32} {"before":>10} {"after":>10} {"change":>8}')
+        for name, before, after, change in rows:
+            before = '-' if before is None else f'{before:.2f}'
+            change = '-' if change is None else f'{change:+.1f}%'
+            self.stdout.write(f'{name:<32} {before:>10} {after:>10.2f} {change:>8}')
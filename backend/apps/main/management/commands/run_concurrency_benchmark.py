@@ -0,0 +1,103 @@
+# apps/main/management/commands/run_concurrency_benchmark.py
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.main.benchmarks.concurrency import DEFAULT_SCENARIOS, ConcurrencyBenchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent read throughput of the WSGI and ASGI deployments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            default='1,8,32',
+            help='Comma-separated requests in flight (default: 1,8,32)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=400,
+            help='Requests per deployment and concurrency level (default: 400)'
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help=f'Read scenario to send (repeatable; default: {", ".join(DEFAULT_SCENARIOS)})'
+        )
+        parser.add_argument(
+            '--wsgi-threads',
+            type=int,
+            default=1,
+            help='Threads serving WSGI (default: 1, a sync worker)'
+        )
+        parser.add_argument(
+            '--db-latency',
+            type=float,
+            default=0,
+            help='Milliseconds added to every SQL statement, as a remote database would (default: 0)'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Keep the anonymous response cache between requests'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Seed for the request parameters (default: 1)'
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write the JSON report to (default: stdout)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be comma-separated integers.')
+        if (
+            min(levels) < 1 or options['requests'] < 1
+            or options['wsgi_threads'] < 1 or options['db_latency'] < 0
+        ):
+            raise CommandError(
+                '--concurrency, --requests and --wsgi-threads must be positive, '
+                '--db-latency not negative.'
+            )
+
+        benchmark = ConcurrencyBenchmark(
+            requests=options['requests'],
+            levels=levels,
+            wsgi_threads=options['wsgi_threads'],
+            db_latency=options['db_latency'],
+            warm_cache=options['warm_cache'],
+            seed=options['seed'],
+            log=self.stderr.write
+        )
+        try:
+            report = benchmark.run(options['scenario'])
+        except LookupError as exc:
+            raise CommandError(str(exc))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                output_file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}.'))
+        else:
+            sys.stdout.write(output + '\n')
+        self.print_summary(report)
+
+    def print_summary(self, report):
+        self.stderr.write(f'{"concurrency":>11} {"wsgi rps":>10} {"asgi rps":>10} {"speedup":>8}')
+        for level, result in report['levels'].items():
+            speedup = '-' if result['asgi_speedup'] is None else f'{result["asgi_speedup"]:.2f}x'
+            self.stderr.write(
+                f'{level:>11} {result["wsgi"]["requests_per_second"]:>10} '
+                f'{result["asgi"]["requests_per_second"]:>10} {speedup:>8}'
+            )
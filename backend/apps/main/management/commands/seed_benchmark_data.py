@@ -0,0 +1,73 @@
+# apps/main/management/commands/seed_benchmark_data.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.main.benchmarks.dataset import DatasetSize, generate, is_seeded
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a seeded synthetic dataset for run_benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--activities',
+            type=int,
+            default=10000,
+            help='Activities to create (default: 10000)'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=0,
+            help='Users to create (default: activities / 20)'
+        )
+        parser.add_argument(
+            '--organizers',
+            type=int,
+            default=0,
+            help='Organizers to create (default: activities / 100)'
+        )
+        parser.add_argument(
+            '--comments-per-activity',
+            type=float,
+            default=5.0,
+            help='Mean comments per activity (default: 5)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed; the same seed gives the same data (default: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk insert (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        if options['activities'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--activities and --batch-size must be positive.')
+        if is_seeded():
+            raise CommandError(
+                'Benchmark data is already present. Seed an empty database '
+                '(e.g. after `manage.py flush`) so runs stay comparable.'
+            )
+
+        size = DatasetSize(
+            activities=options['activities'],
+            users=options['users'],
+            organizers=options['organizers'],
+            comments_per_activity=options['comments_per_activity'],
+        )
+        created = generate(
+            size,
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stderr.write
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}' for name, count in created.items()) + '.'
+        ))
@@ -5,19 +5,36 @@ from django.contrib.gis.geos import Point
 
 from django.db import models
 from django.conf import settings
-from django.utils.text import slugify
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import F
-from unidecode import unidecode
+
+from apps.storage import get_media_storage
+
+from .slugs import save_with_slug
  
 
 class Category(models.Model):
     """Category for activities"""
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
-    image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    image = models.ImageField(
+        upload_to='categories/',
+        storage=get_media_storage,
+        blank=True,
+        null=True
+    )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Resized copies of image (maintained by apps.renditions)'
+    )
+    activities_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Published activities (maintained by apps.main.counters)'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -31,15 +48,8 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(unidecode(self.name))
-            slug = base_slug
-            counter = 1
-            
-            while Category.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            self.slug = slug
+            save_with_slug(self, super().save, *args, **kwargs)
+            return
         super().save(*args, **kwargs)
 
 
@@ -54,6 +64,13 @@ class Organizer(models.Model):
     phone = models.CharField(max_length=20)
     website = models.URLField(max_length=200, blank=True)
     
+    # Denormalized counters
+    activities_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Published activities (maintained by apps.main.counters)'
+    )
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -73,15 +90,8 @@ class Organizer(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(unidecode(self.name))
-            slug = base_slug
-            counter = 1
-            
-            while Organizer.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            self.slug = slug
+            save_with_slug(self, super().save, *args, **kwargs)
+            return
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
@@ -104,9 +114,16 @@ class Activity(models.Model):
     description = models.TextField()
     poster = models.ImageField(
         upload_to='activities/posters/',
+        storage=get_media_storage,
         blank=True,
         null=True
     )
+    poster_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Resized copies of poster (maintained by apps.renditions)'
+    )
     price = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -144,6 +161,11 @@ class Activity(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     views_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Active comments (maintained by apps.main.counters)'
+    )
 
     class Meta:
         db_table = 'activities'
@@ -160,7 +182,14 @@ class Activity(models.Model):
 
     def __str__(self):
         return self.name
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember loaded values so signal handlers can diff on save"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def clean(self):
         """Validation"""
         super().clean()
@@ -184,22 +213,18 @@ class Activity(models.Model):
         if not kwargs.pop('skip_validation', False):
             self.full_clean()
         
-        # Generate slug if not exists
+        # Generate slug if not exists (slugs are globally unique)
         if not self.slug:
-            base_slug = slugify(unidecode(self.name))
-            slug = base_slug
-            counter = 1
-            
-            while Activity.objects.filter(
-                slug=slug, 
-                organizer=self.organizer
-            ).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            self.slug = slug
-        
-        super().save(*args, **kwargs)
+            save_with_slug(self, super().save, *args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+
+        # Saved values become the baseline for the next diff
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
 
     def get_absolute_url(self):
         return reverse('activity-detail', kwargs={'slug': self.slug})
@@ -214,11 +239,36 @@ class Activity(models.Model):
         """Check if activity is upcoming"""
         return self.date >= timezone.now().date()
 
-    def increment_views(self):
-        Activity.objects.filter(pk=self.pk).update(views_count=F('views_count') + 1)
-        self.refresh_from_db(fields=['views_count'])
 
 
+class ActivitySearchTerm(models.Model):
+    """
+    Inverted index entry for activity search.
+    One row per (term, activity) with a relevance weight.
+    Maintained by apps.main.search.
+    """
+    term = models.CharField(max_length=64)
+    activity = models.ForeignKey(
+        Activity,
+        on_delete=models.CASCADE,
+        related_name='search_terms'
+    )
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'activity_search_terms'
+        verbose_name = 'Activity Search Term'
+        verbose_name_plural = 'Activity Search Terms'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'activity'],
+                name='unique_search_term_per_activity'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.activity_id} ({self.weight})"
+
 
 class ActivityAddress(gis_models.Model):
     """
@@ -270,6 +320,13 @@ class ActivityAddress(gis_models.Model):
         ] if p]
         return ', '.join(parts) if parts else 'No address'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember loaded values so signal handlers can diff on save"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
     def clean(self):
         """Validation: must have address or coordinates"""
         super().clean()
@@ -284,6 +341,13 @@ class ActivityAddress(gis_models.Model):
         if not kwargs.pop('skip_validation', False):
             self.full_clean()
         super().save(*args, **kwargs)
+        
+        # Saved values become the baseline for the next diff
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
     
     @property
     def latitude(self):
@@ -350,3 +414,69 @@ class Comment(models.Model):
     
     def __str__(self):
         return f"Comment by {self.author.username} on {self.activity.name}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember loaded values so signal handlers can diff on save"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class MapClusterCell(models.Model):
+    """
+    Precomputed map cluster: published activities with a location,
+    aggregated per zoom level and grid cell.
+    Maintained by apps.main.clusters.
+    """
+    zoom = models.PositiveSmallIntegerField()
+    x = models.IntegerField()
+    y = models.IntegerField()
+    count = models.PositiveIntegerField(default=0)
+    lng_sum = models.FloatField(default=0)
+    lat_sum = models.FloatField(default=0)
+
+    class Meta:
+        db_table = 'map_cluster_cells'
+        verbose_name = 'Map Cluster Cell'
+        verbose_name_plural = 'Map Cluster Cells'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['zoom', 'x', 'y'],
+                name='unique_cluster_cell'
+            ),
+        ]
+
+    def __str__(self):
+        return f"z{self.zoom}/{self.x}/{self.y}: {self.count}"
+
+    @property
+    def centroid(self):
+        """Mean [lng, lat] of the points in this cell"""
+        if not self.count:
+            return None
+        return [self.lng_sum / self.count, self.lat_sum / self.count]
+
+
+class MediaBlob(models.Model):
+    """
+    Content-addressed upload (see apps.storage).
+    refcount = model fields currently pointing at the file.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last upload stored as (or reference made to) this blob: GC grace period
+    linked_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'media_blobs'
+        verbose_name = 'Media Blob'
+        verbose_name_plural = 'Media Blobs'
+        indexes = [
+            models.Index(fields=['refcount', 'linked_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
@@ -0,0 +1,300 @@
+# apps/main/pagination.py
+
+"""
+Keyset (cursor) pagination.
+
+Unlike PageNumberPagination there is no COUNT(*) and no growing OFFSET:
+the cursor carries the ordering values of the last row of the page and the
+next page starts with a WHERE condition on those values, which the
+composite (-date, -created_at) index on activities can serve directly.
+An `id` tie-breaker makes the ordering total, so rows sharing the same
+date/created_at are never skipped or repeated.
+"""
+
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on a composite ordering key with an id tie-breaker"""
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at',)
+    tie_breaker = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # ------------------------------------------------------------------------
+    # Ordering
+    # ------------------------------------------------------------------------
+
+    def get_ordering(self, request, queryset, view):
+        """Ordering terms, always ending with the tie-breaker"""
+        ordering = [
+            term for term in self.get_base_ordering(request, queryset, view)
+            if term.lstrip('-') not in ('pk', self.tie_breaker)
+        ]
+        descending = ordering[0].startswith('-') if ordering else True
+        ordering.append(('-' if descending else '') + self.tie_breaker)
+        return ordering
+
+    def get_base_ordering(self, request, queryset, view):
+        return list(self.ordering)
+
+    def _get_field(self, model, field_name):
+        """Model field behind an ordering term (None for annotations)"""
+        try:
+            return model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return None
+
+    def _order_by(self, keys, reverse):
+        """NULLs sort first ascending and last descending, on every backend"""
+        expressions = []
+        for name, descending, _ in keys:
+            if descending != reverse:
+                expressions.append(F(name).desc(nulls_last=True))
+            else:
+                expressions.append(F(name).asc(nulls_first=True))
+        return expressions
+
+    # ------------------------------------------------------------------------
+    # Keyset condition
+    # ------------------------------------------------------------------------
+
+    def _after(self, name, descending, nullable, value):
+        """Rows strictly after `value` in the (possibly reversed) order"""
+        if descending:
+            # ... > values > NULL
+            if value is None:
+                return None
+            condition = Q(**{f'{name}__lt': value})
+            if nullable:
+                condition |= Q(**{f'{name}__isnull': True})
+            return condition
+        # NULL < values < ...
+        if value is None:
+            return Q(**{f'{name}__isnull': False})
+        return Q(**{f'{name}__gt': value})
+
+    def _equal(self, name, value):
+        if value is None:
+            return Q(**{f'{name}__isnull': True})
+        return Q(**{name: value})
+
+    def _keyset_filter(self, keys, position, reverse):
+        """
+        Lexicographic "row comes after position" condition:
+        (k1 > p1) OR (k1 = p1 AND k2 > p2) OR ...
+        """
+        condition = Q(pk__in=[])
+        prefix = Q()
+        for (name, descending, nullable), value in zip(keys, position):
+            after = self._after(name, descending != reverse, nullable, value)
+            if after is not None:
+                condition |= prefix & after
+            prefix &= self._equal(name, value)
+        return condition
+
+    # ------------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _encode_value(value):
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps(
+            {'p': [self._encode_value(value) for value in position], 'r': reverse},
+            separators=(',', ':')
+        )
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, fields):
+        """
+        Position and direction of the ?cursor= token, each value converted
+        with its ordering field (a forged value is a 404, not a 500)
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                field.to_python(value) if field is not None and value is not None else value
+                for field, value in zip(fields, position)
+            ]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def _position(self, instance, keys):
+        return [getattr(instance, name) for name, _, _ in keys]
+
+    # ------------------------------------------------------------------------
+    # Pagination API
+    # ------------------------------------------------------------------------
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        model = queryset.model
+        terms = self.get_ordering(request, queryset, view)
+        fields = [self._get_field(model, term.lstrip('-')) for term in terms]
+        self.keys = [
+            (term.lstrip('-'), term.startswith('-'), field is not None and field.null)
+            for term, field in zip(terms, fields)
+        ]
+
+        position, reverse = self.decode_cursor(request, fields)
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(self.keys, position, reverse))
+
+        rows = list(
+            queryset.order_by(*self._order_by(self.keys, reverse))[:self.page_size + 1]
+        )
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1], self.keys), False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self._position(self.page[0], self.keys), True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ActivityCursorPagination(KeysetPagination):
+    """
+    Keyset pagination for activity lists.
+    Follows ?ordering= (validated by OrderingFilter) or the view's default
+    (-date, -created_at), with an id tie-breaker.
+
+    Relevance (?search=) and distance (?near=) orders are computed per
+    request and cannot be keyed on: with either in effect and no
+    ?ordering=, cursor pagination is refused with a 400.
+    """
+    ordering = ('-date', '-created_at')
+    # Annotations ActivitySearchFilter and NearbyFilter order by
+    ranked_annotations = ('search_rank', 'distance')
+
+    def get_base_ordering(self, request, queryset, view):
+        ranked = [
+            term for term in queryset.query.order_by
+            if isinstance(term, str) and term.lstrip('-') in self.ranked_annotations
+        ]
+        if ranked:
+            raise ValidationError({
+                'pagination': 'Cursor pagination cannot follow relevance or distance '
+                              'order: add ?ordering= or use page numbers.'
+            })
+        if view is not None and getattr(view, 'ordering_fields', None):
+            ordering = OrderingFilter().get_ordering(request, queryset, view)
+            if ordering:
+                return [term for term in ordering if isinstance(term, str)]
+        return list(self.ordering)
+
+
+class CommentCursorPagination(KeysetPagination):
+    """Keyset pagination for comment lists, newest first"""
+    ordering = ('-created_at',)
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in keyset pagination for a viewset whose default stays
+    page-number based (e.g. for the admin UI).
+    Enabled by ?pagination=cursor or by passing a ?cursor= token.
+    """
+    cursor_pagination_class = None
+
+    def wants_cursor_pagination(self):
+        params = self.request.query_params
+        return params.get('pagination') == 'cursor' or 'cursor' in params
+
+    def use_cursor_pagination(self):
+        return (
+            self.cursor_pagination_class is not None
+            and self.action == 'list'
+            and self.wants_cursor_pagination()
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,192 @@
+# apps/main/search.py
+
+"""
+In-house inverted index for activity search.
+
+Each activity is tokenized into ActivitySearchTerm rows (term, activity,
+weight). A term found in the name weighs more than one found in the summary,
+which weighs more than one found in the description. Queries match every
+search word as a term prefix (AND semantics, like DRF's SearchFilter) and
+rank results by the summed weight of the matched terms.
+"""
+
+import re
+from collections import Counter
+
+from django.db.models import (
+    Case, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+)
+from unidecode import unidecode
+
+from .models import Activity, ActivitySearchTerm
+
+
+FIELD_WEIGHTS = {
+    'name': 8,
+    'summary': 3,
+    'description': 1,
+}
+
+# Repeated words add weight, but only up to this many occurrences per field
+MAX_OCCURRENCES = 3
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = ActivitySearchTerm._meta.get_field('term').max_length
+
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'at', 'be', 'by', 'for', 'in', 'is', 'it',
+    'of', 'on', 'or', 'the', 'to', 'with',
+    'de', 'du', 'des', 'en', 'et', 'la', 'le', 'les', 'un', 'une',
+    'het', 'een', 'van', 'voor',
+])
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+# ============================================================================
+# TOKENIZING
+# ============================================================================
+
+def tokenize(text):
+    """Split text into normalized, ASCII-folded terms"""
+    if not text:
+        return []
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(unidecode(text).lower())
+        if len(token) >= MIN_TERM_LENGTH and token not in STOP_WORDS
+    ]
+
+
+def term_weights(activity):
+    """Map each term of an activity to its relevance weight"""
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        occurrences = Counter(tokenize(getattr(activity, field)))
+        for term, count in occurrences.items():
+            weights[term] += field_weight * min(count, MAX_OCCURRENCES)
+    return weights
+
+
+def text_changed(activity):
+    """Check whether any indexed field differs from the loaded values"""
+    loaded = getattr(activity, '_loaded_values', None)
+    if loaded is None:
+        return True
+    return any(
+        field in activity.__dict__
+        and loaded.get(field) != activity.__dict__[field]
+        for field in FIELD_WEIGHTS
+    )
+
+
+# ============================================================================
+# INDEXING
+# ============================================================================
+
+def index_activities(activities):
+    """
+    (Re)index a batch of saved activities.
+
+    Args:
+        activities: Iterable of Activity instances with text fields loaded
+
+    Returns:
+        int: Number of index rows written
+    """
+    activities = list(activities)
+    if not activities:
+        return 0
+
+    rows = [
+        ActivitySearchTerm(activity_id=activity.pk, term=term, weight=weight)
+        for activity in activities
+        for term, weight in term_weights(activity).items()
+    ]
+
+    ActivitySearchTerm.objects.filter(
+        activity_id__in=[activity.pk for activity in activities]
+    ).delete()
+    ActivitySearchTerm.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def index_activity(activity):
+    """(Re)index a single activity"""
+    return index_activities([activity])
+
+
+def rebuild_index(batch_size=500):
+    """
+    Rebuild the whole index.
+
+    Returns:
+        tuple: (activities indexed, index rows written)
+    """
+    ActivitySearchTerm.objects.all().delete()
+
+    activities = Activity.objects.order_by().only(
+        'pk', *FIELD_WEIGHTS
+    ).iterator(chunk_size=batch_size)
+
+    indexed = written = 0
+    batch = []
+    for activity in activities:
+        batch.append(activity)
+        if len(batch) >= batch_size:
+            written += index_activities(batch)
+            indexed += len(batch)
+            batch = []
+    if batch:
+        written += index_activities(batch)
+        indexed += len(batch)
+
+    return indexed, written
+
+
+# ============================================================================
+# QUERYING
+# ============================================================================
+
+def search(queryset, query):
+    """
+    Filter an activity queryset by a search query.
+
+    Adds a `search_rank` annotation (higher is more relevant).
+    A query without searchable terms (e.g. only stop words) leaves the
+    queryset unfiltered.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset
+
+    matches_any = Q()
+    for term in terms:
+        matches_any |= Q(term__startswith=term)
+
+    # Require every query term to match at least one indexed term
+    matched_flags = {
+        f'matched_{i}': Max(Case(
+            When(term__startswith=term, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        ))
+        for i, term in enumerate(terms)
+    }
+    scores = (
+        ActivitySearchTerm.objects
+        .filter(matches_any)
+        .order_by()
+        .values('activity_id')
+        .annotate(score=Sum('weight'), **matched_flags)
+        .filter(**{flag: 1 for flag in matched_flags})
+    )
+
+    return queryset.filter(
+        pk__in=scores.values('activity_id')
+    ).annotate(
+        search_rank=Subquery(
+            scores.filter(activity_id=OuterRef('pk')).values('score')[:1],
+            output_field=IntegerField()
+        )
+    )
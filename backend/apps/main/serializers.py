@@ -1,9 +1,13 @@
 # apps/main/serializers.py
 
 from backend.apps.validators import validate_image_file
+from apps.observability.timing import TimedSerializerMixin
+from apps.renditions import RenditionsField
 from rest_framework import serializers
 from django.utils import timezone
 from django.db import transaction
+from .compiled import CompiledListSerializer
+from .fieldsets import DynamicFieldsMixin
 from .models import Category, Organizer, Activity, Comment, ActivityAddress
 
 
@@ -11,65 +15,55 @@ from .models import Category, Organizer, Activity, Comment, ActivityAddress
 # USER SERIALIZER (minimal, for nested use)
 # ============================================================================
 
-class UserSerializer(serializers.Serializer):
+class UserSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.Serializer):
     """Read-only user info for nested serialization"""
     id = serializers.IntegerField(read_only=True)
     username = serializers.CharField(read_only=True)
     avatar = serializers.ImageField(read_only=True)
+    avatar_srcset = RenditionsField(source='avatar_renditions')
 
 
 # ============================================================================
 # CATEGORY SERIALIZERS
 # ============================================================================
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Category serializer"""
-    activities_count = serializers.SerializerMethodField()
+    image_srcset = RenditionsField(source='image_renditions')
     
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'image', 'activities_count']
+        fields = ['id', 'name', 'slug', 'image', 'image_srcset', 'activities_count']
         read_only_fields = ['id', 'slug', 'activities_count']
+        list_serializer_class = CompiledListSerializer
         
     def validate_image(self, value):
         """Validate image file"""
         return validate_image_file(value, max_size_mb=1)
-    
-    def get_activities_count(self, obj):
-        """Get count of published activities in this category"""
-        return obj.activities.filter(status='published').count()
 
 
 # ============================================================================
 # ORGANIZER SERIALIZERS
 # ============================================================================
 
-class OrganizerPublicSerializer(serializers.ModelSerializer):
+class OrganizerPublicSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Public organizer serializer without sensitive data"""
-    activities_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Organizer
         fields = ['id', 'name', 'slug', 'website', 'activities_count']
         read_only_fields = ['id', 'slug', 'activities_count']
-    
-    def get_activities_count(self, obj):
-        """Get count of published activities"""
-        return obj.activities.filter(status='published').count()
+        list_serializer_class = CompiledListSerializer
 
 
-class OrganizerSerializer(serializers.ModelSerializer):
+class OrganizerSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Full organizer serializer with contact info"""
-    activities_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Organizer
         fields = ['id', 'name', 'slug', 'email', 'phone', 'website', 'activities_count', 'created_at']
         read_only_fields = ['id', 'slug', 'activities_count', 'created_at']
-    
-    def get_activities_count(self, obj):
-        """Get count of published activities"""
-        return obj.activities.filter(status='published').count()
+        list_serializer_class = CompiledListSerializer
     
     def validate_email(self, value):
         """Check email uniqueness on update"""
@@ -83,7 +77,7 @@ class OrganizerSerializer(serializers.ModelSerializer):
 # ACTIVITY ADDRESS SERIALIZERS
 # ============================================================================
 
-class ActivityAddressSerializer(serializers.ModelSerializer):
+class ActivityAddressSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Address serializer with coordinates"""
     coordinates = serializers.ListField(
         child=serializers.FloatField(),
@@ -170,7 +164,18 @@ class ActivityAddressWriteSerializer(serializers.ModelSerializer):
 # COMMENT SERIALIZERS
 # ============================================================================
 
-class CommentSerializer(serializers.ModelSerializer):
+# Comments embedded in an activity detail
+DETAIL_COMMENTS_LIMIT = 10
+
+
+def recent_comments_queryset():
+    """Active comments with authors, newest first"""
+    return Comment.objects.filter(
+        is_active=True
+    ).select_related('author').order_by('-created_at', '-id')
+
+
+class CommentSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Comment serializer"""
     author = UserSerializer(read_only=True)
     
@@ -178,6 +183,8 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'author', 'text', 'is_active', 'created_at', 'updated_at']
         read_only_fields = ['id', 'author', 'is_active', 'created_at', 'updated_at']
+        expandable_fields = ['author']
+        list_serializer_class = CompiledListSerializer
 
 
 class CommentCreateSerializer(serializers.ModelSerializer):
@@ -204,45 +211,57 @@ class CommentCreateSerializer(serializers.ModelSerializer):
 # ACTIVITY SERIALIZERS
 # ============================================================================
 
-class ActivityListSerializer(serializers.ModelSerializer):
+class ActivityListSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Activity list serializer - minimal fields"""
     organizer = OrganizerPublicSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     is_free = serializers.BooleanField(read_only=True)
     is_upcoming = serializers.BooleanField(read_only=True)
     has_address = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+    poster_srcset = RenditionsField(source='poster_renditions')
     
     class Meta:
         model = Activity
         fields = [
             'id', 'name', 'slug', 'date', 'time',
-            'summary', 'poster', 'price', 'is_free',
+            'summary', 'poster', 'poster_srcset', 'price', 'is_free',
             'organizer', 'category', 'status',
-            'is_upcoming', 'views_count', 'has_address'
+            'is_upcoming', 'views_count', 'has_address',
+            'distance_km'
         ]
         read_only_fields = ['id', 'slug', 'views_count']
+        expandable_fields = ['organizer', 'category']
+        field_sources = {'has_address': ['address']}
+        list_serializer_class = CompiledListSerializer
     
     def get_has_address(self, obj):
         """Check if activity has address"""
         return hasattr(obj, 'address')
+    
+    def get_distance_km(self, obj):
+        """Distance from ?near= point (only set by NearbyFilter)"""
+        distance = getattr(obj, 'distance', None)
+        return round(distance.km, 3) if distance is not None else None
 
 
-class ActivityDetailSerializer(serializers.ModelSerializer):
+class ActivityDetailSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Activity detail serializer - full data"""
     organizer = OrganizerPublicSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     author = UserSerializer(read_only=True)
     address = ActivityAddressSerializer(read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    # Newest DETAIL_COMMENTS_LIMIT comments; the rest via /activities/{slug}/comments/
+    comments = serializers.SerializerMethodField()
+    poster_srcset = RenditionsField(source='poster_renditions')
     is_free = serializers.BooleanField(read_only=True)
     is_upcoming = serializers.BooleanField(read_only=True)
-    comments_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Activity
         fields = [
             'id', 'name', 'slug', 'date', 'time',
-            'summary', 'description', 'poster', 'price', 'website',
+            'summary', 'description', 'poster', 'poster_srcset', 'price', 'website',
             'organizer', 'category', 'author',
             'address', 'comments',
             'status', 'views_count',
@@ -252,12 +271,20 @@ class ActivityDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             'id', 'slug', 'author', 'views_count',
-            'created_at', 'updated_at'
+            'comments_count', 'created_at', 'updated_at'
         ]
+        expandable_fields = ['organizer', 'category', 'author']
+        field_sources = {'comments': ['comments']}
     
-    def get_comments_count(self, obj):
-        """Get active comments count"""
-        return obj.comments.filter(is_active=True).count()
+    def get_comments(self, obj):
+        """Newest active comments (prefetched as recent_comments by the view)"""
+        comments = getattr(obj, 'recent_comments', None)
+        if comments is None:
+            comments = recent_comments_queryset().filter(activity=obj)[:DETAIL_COMMENTS_LIMIT]
+        return CommentSerializer(
+            comments, many=True, context=self.context,
+            **self.nested_selection('comments')
+        ).data
 
 
 class ActivityCreateSerializer(serializers.ModelSerializer):
@@ -336,6 +363,30 @@ class ActivityCreateSerializer(serializers.ModelSerializer):
         return activity
 
 
+class ActivityImportSerializer(serializers.ModelSerializer):
+    """
+    One row of a bulk import (see apps.main.importer).
+    Validates without queries: organizer/category are raw references
+    (id, slug or name) resolved per batch by the importer.
+    """
+    organizer = serializers.CharField(required=False)
+    category = serializers.CharField(required=False, allow_null=True)
+    address = ActivityAddressWriteSerializer(required=False)
+    
+    class Meta:
+        model = Activity
+        fields = [
+            'name', 'date', 'time', 'summary', 'description',
+            'price', 'website', 'status',
+            'organizer', 'category', 'address'
+        ]
+    
+    validate_date = ActivityCreateSerializer.validate_date
+    validate_price = ActivityCreateSerializer.validate_price
+    validate_summary = ActivityCreateSerializer.validate_summary
+    validate_description = ActivityCreateSerializer.validate_description
+
+
 class ActivityUpdateSerializer(serializers.ModelSerializer):
     """Activity update serializer"""
     organizer_id = serializers.PrimaryKeyRelatedField(
@@ -381,7 +432,7 @@ class ActivityUpdateSerializer(serializers.ModelSerializer):
 # MINIMAL SERIALIZERS (for nested use in other apps)
 # ============================================================================
 
-class ActivityMinimalSerializer(serializers.ModelSerializer):
+class ActivityMinimalSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Minimal activity data for nested use"""
     
     class Meta:
@@ -390,7 +441,7 @@ class ActivityMinimalSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class OrganizerMinimalSerializer(serializers.ModelSerializer):
+class OrganizerMinimalSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Minimal organizer data for nested use"""
     
     class Meta:
@@ -0,0 +1,204 @@
+# apps/main/signals.py
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from apps import renditions, storage
+
+from . import clusters, counters, search, tasks
+from .cache import bump_generation
+from .models import Activity, ActivityAddress, Category, Comment, Organizer
+
+
+# ============================================================================
+# PUBLISHED ACTIVITY COUNTERS
+# ============================================================================
+
+@receiver(pre_save, sender=Activity)
+def remember_counted_state(sender, instance, raw=False, **kwargs):
+    """Capture the stored state before it is overwritten"""
+    instance._counted_before = None if raw else counters.stored_state(instance)
+
+
+@receiver(post_save, sender=Activity)
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+    """Move counters when an activity is created, (un)published or moved"""
+    if raw:
+        return
+    counters.apply_change(
+        getattr(instance, '_counted_before', None),
+        counters.current_state(instance)
+    )
+
+
+@receiver(post_delete, sender=Activity)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Decrement counters when a published activity is deleted"""
+    counters.apply_change(counters.current_state(instance), None)
+
+
+# ============================================================================
+# COMMENT COUNTERS
+# ============================================================================
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance, raw=False, **kwargs):
+    """Capture whether the stored comment was counted"""
+    instance._counted_before = None if raw else counters.stored_comment_state(instance)
+
+
+@receiver(post_save, sender=Comment)
+def update_comments_count_on_save(sender, instance, raw=False, **kwargs):
+    """Count new comments, soft deletes and reactivations"""
+    if raw:
+        return
+    counters.apply_comment_change(
+        getattr(instance, '_counted_before', None),
+        counters.comment_state({
+            'is_active': instance.is_active,
+            'activity_id': instance.activity_id,
+        })
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def update_comments_count_on_delete(sender, instance, **kwargs):
+    """Uncount a deleted active comment"""
+    counters.apply_comment_change(
+        counters.comment_state({
+            'is_active': instance.is_active,
+            'activity_id': instance.activity_id,
+        }),
+        None
+    )
+
+
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+
+@receiver(post_save, sender=Activity)
+def update_search_index(sender, instance, created=False, raw=False, **kwargs):
+    """Reindex an activity when its name, summary or description changes"""
+    if raw:
+        return
+    if created or search.text_changed(instance):
+        tasks.index_activity.enqueue(
+            instance.pk,
+            dedupe_key=f'search:{instance.pk}'
+        )
+
+
+# ============================================================================
+# MAP CLUSTERS
+# ============================================================================
+
+def _is_published(address):
+    """Status of the address' activity, without a query when it is cached"""
+    if ActivityAddress.activity.is_cached(address):
+        return address.activity.status == 'published'
+    return clusters.is_published(address.activity_id)
+
+
+@receiver(pre_save, sender=Activity)
+def remember_published_status(sender, instance, raw=False, **kwargs):
+    """Capture whether the stored activity was published"""
+    instance._published_before = False
+    if raw or instance._state.adding or instance.pk is None:
+        return
+
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and 'status' in loaded:
+        instance._published_before = loaded['status'] == 'published'
+    else:
+        instance._published_before = clusters.is_published(instance.pk)
+
+
+@receiver(post_save, sender=Activity)
+def update_clusters_on_publish(sender, instance, raw=False, **kwargs):
+    """Add/remove the activity's point when it is (un)published"""
+    if raw:
+        return
+    was_published = getattr(instance, '_published_before', False)
+    is_published = instance.status == 'published'
+    if was_published != is_published:
+        clusters.apply_points(
+            clusters.points_for(Activity.objects.filter(pk=instance.pk)),
+            1 if is_published else -1
+        )
+
+
+@receiver(pre_save, sender=ActivityAddress)
+def remember_clustered_point(sender, instance, raw=False, **kwargs):
+    """Capture the stored location before it is overwritten"""
+    instance._point_before = None
+    if raw or instance._state.adding:
+        return
+
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and 'location' in loaded:
+        instance._point_before = clusters.point_of(loaded['location'])
+    else:
+        instance._point_before = clusters.point_of(
+            ActivityAddress.objects.filter(pk=instance.pk)
+            .values_list('location', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ActivityAddress)
+def update_clusters_on_address_save(sender, instance, raw=False, **kwargs):
+    """Move the point between cells when an address is created or moved"""
+    if raw:
+        return
+    before = getattr(instance, '_point_before', None)
+    after = clusters.point_of(instance.location)
+    if before != after and _is_published(instance):
+        clusters.move_point(before, after)
+
+
+@receiver(post_delete, sender=ActivityAddress)
+def update_clusters_on_address_delete(sender, instance, **kwargs):
+    """Remove the point when an address (or its activity) is deleted"""
+    point = clusters.point_of(instance.location)
+    if point is not None and _is_published(instance):
+        clusters.apply_points([point], -1)
+
+
+# ============================================================================
+# RESPONSE CACHE INVALIDATION
+# ============================================================================
+
+CACHED_MODELS = (Activity, Category, Organizer, ActivityAddress, Comment)
+
+
+def invalidate_response_cache(sender, raw=False, **kwargs):
+    """Any catalogue write makes cached anonymous responses stale"""
+    if not raw:
+        bump_generation()
+
+
+for model in CACHED_MODELS:
+    post_save.connect(
+        invalidate_response_cache, sender=model,
+        dispatch_uid=f'invalidate_response_cache_save_{model.__name__}'
+    )
+    post_delete.connect(
+        invalidate_response_cache, sender=model,
+        dispatch_uid=f'invalidate_response_cache_delete_{model.__name__}'
+    )
+
+
+# ============================================================================
+# IMAGE RENDITIONS
+# ============================================================================
+
+renditions.register(Activity, 'poster', 'poster_renditions')
+renditions.register(Category, 'image', 'image_renditions')
+
+
+# ============================================================================
+# MEDIA BLOB REFERENCES
+# ============================================================================
+
+storage.track(Activity, 'poster')
+storage.track(Category, 'image')
@@ -0,0 +1,205 @@
+# apps/main/slugs.py
+
+"""
+Unique slug allocation.
+
+The next free slug for a name is found with a single query: among `base`
+and `base-<n>`, the longest (then lexicographically greatest) slug is the
+one with the highest suffix, so ordering by (length, slug) gives it in the
+first row. A suffix is only a counter if the row's own name does not
+produce it ("concert-2024" is the slug of "Concert 2024", not the 2024th
+"concert"); such slugs are skipped when counting up. A concurrent insert
+of the same slug surfaces as an IntegrityError on the unique column, in
+which case allocation is retried.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+from django.utils.text import slugify
+from unidecode import unidecode
+
+
+SLUG_FIELD = 'slug'
+MAX_ATTEMPTS = 5
+
+# Room kept for a "-<n>" suffix
+SUFFIX_RESERVE = 11
+
+
+# ============================================================================
+# ALLOCATION
+# ============================================================================
+
+def slug_base(model, text):
+    """ASCII slug of `text`, short enough to take a numeric suffix"""
+    max_length = model._meta.get_field(SLUG_FIELD).max_length
+    base = slugify(unidecode(text or ''))[:max_length - SUFFIX_RESERVE].strip('-')
+    return base or model._meta.model_name
+
+
+def is_natural(model, slug, text):
+    """Whether `slug` is the unsuffixed slug of `text` ("concert-2024")"""
+    return slug_base(model, text) == slug
+
+
+def last_suffix(model, base, exclude_pk=None, source='name'):
+    """
+    Highest counter suffix in use for a base slug, in one query.
+
+    `base-<n>` is only a counter if its row's own name does not slugify
+    to it: "concert-2024" of "Concert 2024" is not the 2024th "concert".
+    Such natural slugs above the last counter are returned so that
+    next_suffix() skips them.
+
+    Returns:
+        tuple: (last, natural) where last is None if neither `base` nor
+        a counter exists, 0 if only `base` exists, else the highest n
+    """
+    taken = model._default_manager.filter(
+        **{SLUG_FIELD: base}
+    ) | model._default_manager.filter(
+        **{
+            f'{SLUG_FIELD}__startswith': f'{base}-',
+            f'{SLUG_FIELD}__regex': rf'^{base}-[0-9]+$',
+        }
+    )
+    if exclude_pk is not None:
+        taken = taken.exclude(pk=exclude_pk)
+
+    natural = set()
+    rows = taken.order_by(
+        Length(SLUG_FIELD).desc(), f'-{SLUG_FIELD}'
+    ).values_list(SLUG_FIELD, source)
+    # Highest first: usually the first row is the answer
+    for slug, text in rows.iterator():
+        if slug == base:
+            return 0, natural
+        suffix = int(slug[len(base) + 1:])
+        if not is_natural(model, slug, text):
+            return suffix, natural
+        natural.add(suffix)
+    return None, natural
+
+
+def next_suffix(last, natural):
+    """Suffix after `last`, skipping other names' natural slugs"""
+    if last is None:
+        return None
+    suffix = last + 1
+    while suffix in natural:
+        suffix += 1
+    return suffix
+
+
+def with_suffix(base, suffix):
+    if suffix is None:
+        return base
+    return f'{base}-{suffix}'
+
+
+def next_free_slug(model, text, exclude_pk=None, source='name'):
+    """Next unused slug for `text` (single query)"""
+    base = slug_base(model, text)
+    return with_suffix(base, next_suffix(*last_suffix(model, base, exclude_pk, source)))
+
+
+def last_suffixes(model, bases, source='name', chunk_size=100):
+    """
+    last_suffix() for many bases, one query per `chunk_size` bases.
+
+    Returns:
+        dict: base -> (last, natural) (bases not in use are omitted)
+    """
+    result = {}
+    bases = list(dict.fromkeys(bases))
+    for start in range(0, len(bases), chunk_size):
+        chunk = set(bases[start:start + chunk_size])
+        condition = Q()
+        for base in chunk:
+            condition |= Q(**{SLUG_FIELD: base})
+            condition |= Q(**{f'{SLUG_FIELD}__startswith': f'{base}-'})
+
+        taken = model._default_manager.filter(condition).values_list(SLUG_FIELD, source)
+        for slug, text in taken.iterator():
+            if slug in chunk:
+                last, natural = result.setdefault(slug, (None, set()))
+                result[slug] = (max(last or 0, 0), natural)
+            head, _, tail = slug.rpartition('-')
+            if head in chunk and tail.isdigit():
+                last, natural = result.setdefault(head, (None, set()))
+                if is_natural(model, slug, text):
+                    natural.add(int(tail))
+                else:
+                    result[head] = (max(last or 0, int(tail)), natural)
+    return result
+
+
+def allocate_slugs(model, instances, source='name'):
+    """
+    Assign slugs to unsaved instances without one, for bulk creation.
+    One query per 100 distinct bases; duplicates within the batch get
+    consecutive suffixes.
+    """
+    pending = defaultdict(list)
+    for instance in instances:
+        if not getattr(instance, SLUG_FIELD):
+            pending[slug_base(model, getattr(instance, source))].append(instance)
+
+    taken = last_suffixes(model, pending, source)
+    for base, group in pending.items():
+        last, natural = taken.get(base, (None, set()))
+        for instance in group:
+            suffix = next_suffix(last, natural)
+            setattr(instance, SLUG_FIELD, with_suffix(base, suffix))
+            last = suffix or 0
+
+
+# ============================================================================
+# SAVING WITH RETRY
+# ============================================================================
+
+def _slug_taken(model, instances):
+    slugs = [getattr(instance, SLUG_FIELD) for instance in instances]
+    return model._default_manager.filter(**{f'{SLUG_FIELD}__in': slugs}).exists()
+
+
+def save_with_slug(instance, save, *args, source='name', **kwargs):
+    """
+    Allocate a slug and save, retrying if a concurrent insert took it.
+
+    Args:
+        instance: Model instance with an empty slug
+        save: The model's parent save (e.g. super().save)
+        source: Attribute the slug is built from
+    """
+    model = type(instance)
+    for attempt in range(MAX_ATTEMPTS):
+        setattr(instance, SLUG_FIELD, next_free_slug(
+            model, getattr(instance, source), exclude_pk=instance.pk, source=source
+        ))
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            # Only a lost slug race is retried
+            if attempt == MAX_ATTEMPTS - 1 or not _slug_taken(model, [instance]):
+                raise
+
+
+def bulk_create_with_slugs(model, instances, source='name', batch_size=None):
+    """bulk_create with allocated slugs, retried on slug collisions"""
+    instances = list(instances)
+    generated = [instance for instance in instances if not getattr(instance, SLUG_FIELD)]
+    for attempt in range(MAX_ATTEMPTS):
+        allocate_slugs(model, instances, source)
+        try:
+            with transaction.atomic():
+                return model._default_manager.bulk_create(instances, batch_size=batch_size)
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS - 1 or not _slug_taken(model, generated):
+                raise
+            for instance in generated:
+                setattr(instance, SLUG_FIELD, '')
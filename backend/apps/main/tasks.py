@@ -0,0 +1,20 @@
+# apps/main/tasks.py
+
+"""
+Background tasks of the main app (see apps.tasks.queue).
+"""
+
+from apps.tasks.queue import task
+
+from . import search
+from .models import Activity
+
+
+@task(name='search.index_activity')
+def index_activity(activity_id):
+    """Rebuild the search terms of one activity (skipped if it was deleted)"""
+    activity = Activity.objects.only('pk', *search.FIELD_WEIGHTS).filter(
+        pk=activity_id
+    ).first()
+    if activity is not None:
+        search.index_activity(activity)
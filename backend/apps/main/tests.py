@@ -1,3 +1,841 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import shutil
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.test import SimpleTestCase, TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.query_budget import QueryBudgetTestMixin
+from apps.storage import get_media_storage
+
+from . import async_urls, urls
+from .cache import GENERATION_KEY, bump_generation, get_cache, get_generation
+from .clusters import MAX_CELLS, MAX_ZOOM, cell_for, cell_range, fit_zoom, move_point
+from .exporter import _ics_fold, aexport_lines, base_queryset, export_lines, iter_activities
+from .importer import ActivityImporter, ImportLimitError, iter_ics
+from .models import Activity, ActivityAddress, Category, Comment, MapClusterCell, MediaBlob, Organizer
+from .slugs import bulk_create_with_slugs
+
+
+class MainDataMixin:
+    """Users, an organizer and a category shared by the test cases"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(email='author@example.com', username='author', password='pw')
+        cls.other = User.objects.create_user(email='other@example.com', username='other', password='pw')
+        cls.organizer = Organizer.objects.create(name='Org', email='org@example.com', phone='1')
+        cls.category = Category.objects.create(name='Music')
+
+    def setUp(self):
+        super().setUp()
+        # Generation bumps run on commit, which never happens in a TestCase
+        get_cache().clear()
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        """JWT credentials, as real clients send them (None: anonymous)"""
+        if user is None:
+            self.client.credentials()
+            return
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def make_activity(self, name='Jazz night', **fields):
+        values = {
+            'name': name,
+            'date': date.today() + timedelta(days=7),
+            'time': time(20),
+            'summary': 'A summary',
+            'description': 'A description',
+            'organizer': self.organizer,
+            'category': self.category,
+            'author': self.user,
+        }
+        values.update(fields)
+        return Activity.objects.create(**values)
+
+
+# ============================================================================
+# COUNTERS
+# ============================================================================
+
+class CounterSignalTests(MainDataMixin, TestCase):
+
+    def counts(self):
+        self.category.refresh_from_db()
+        self.organizer.refresh_from_db()
+        return self.category.activities_count, self.organizer.activities_count
+
+    def test_only_published_activities_count(self):
+        self.make_activity(status='draft')
+        self.assertEqual(self.counts(), (0, 0))
+        self.make_activity('Published', status='published')
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_publish_and_unpublish(self):
+        activity = self.make_activity(status='draft')
+        activity.status = 'published'
+        activity.save()
+        self.assertEqual(self.counts(), (1, 1))
+        # Saving again without a change must not count twice
+        activity.save()
+        self.assertEqual(self.counts(), (1, 1))
+        activity.status = 'draft'
+        activity.save()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_move_between_categories(self):
+        other = Category.objects.create(name='Theatre')
+        activity = self.make_activity(status='published')
+        activity.category = other
+        activity.save()
+        other.refresh_from_db()
+        self.assertEqual(self.counts(), (0, 1))
+        self.assertEqual(other.activities_count, 1)
+
+    def test_change_on_fresh_instance(self):
+        # No values remembered from loading: the stored state is queried
+        activity = self.make_activity(status='published')
+        stale = Activity(**{
+            field.attname: getattr(activity, field.attname)
+            for field in Activity._meta.concrete_fields
+        })
+        stale._state.adding = False
+        stale.status = 'draft'
+        stale.save()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_delete(self):
+        activity = self.make_activity(status='published')
+        self.make_activity('Draft', status='draft').delete()
+        self.assertEqual(self.counts(), (1, 1))
+        activity.delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_never_negative(self):
+        activity = self.make_activity(status='published')
+        Category.objects.update(activities_count=0)
+        activity.delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_comment_count(self):
+        activity = self.make_activity(status='published')
+        comment = Comment.objects.create(activity=activity, author=self.other, text='Hi')
+        Comment.objects.create(activity=activity, author=self.other, text='Hidden', is_active=False)
+        activity.refresh_from_db()
+        self.assertEqual(activity.comments_count, 1)
+
+        comment.is_active = False
+        comment.save()
+        activity.refresh_from_db()
+        self.assertEqual(activity.comments_count, 0)
+
+        comment.is_active = True
+        comment.save()
+        comment.delete()
+        activity.refresh_from_db()
+        self.assertEqual(activity.comments_count, 0)
+
+
+# ============================================================================
+# SLUGS
+# ============================================================================
+
+class SlugTests(MainDataMixin, TestCase):
+
+    def test_duplicates_get_counters(self):
+        slugs = [self.make_activity('Theatre').slug for _ in range(3)]
+        self.assertEqual(slugs, ['theatre', 'theatre-1', 'theatre-2'])
+        # Ordered by length: theatre-10 is above theatre-9
+        Activity.objects.filter(slug='theatre-2').update(slug='theatre-10')
+        self.assertEqual(self.make_activity('Theatre').slug, 'theatre-11')
+
+    def test_numbers_in_names_are_not_counters(self):
+        self.assertEqual(self.make_activity('Concert 2024').slug, 'concert-2024')
+        self.assertEqual(self.make_activity('Concert').slug, 'concert')
+        self.assertEqual(self.make_activity('Concert').slug, 'concert-1')
+
+    def test_counters_skip_natural_slugs(self):
+        self.make_activity('Concert')
+        self.make_activity('Concert 2')
+        self.assertEqual(self.make_activity('Concert').slug, 'concert-1')
+        self.assertEqual(self.make_activity('Concert').slug, 'concert-3')
+
+    def test_bulk_creation(self):
+        self.make_activity('Concert')
+        self.make_activity('Concert 1')
+        activities = [
+            Activity(
+                name=name, date=date.today(), time=time(20), summary='s', description='d',
+                organizer=self.organizer, category=self.category, author=self.user
+            )
+            for name in ('Concert', 'Concert', 'Opera')
+        ]
+        bulk_create_with_slugs(Activity, activities)
+        self.assertEqual([activity.slug for activity in activities], ['concert-2', 'concert-3', 'opera'])
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+class ImporterTests(MainDataMixin, TestCase):
+
+    def row(self, name='Jazz night', **fields):
+        return {
+            'name': name,
+            'date': (date.today() + timedelta(days=7)).isoformat(),
+            'time': '20:00',
+            'summary': 'A long enough summary',
+            'description': 'A description that is long enough',
+            'organizer': self.organizer.slug,
+            **fields,
+        }
+
+    def test_row_errors(self):
+        importer = ActivityImporter(self.user, batch_size=2)
+        report = importer.run([
+            self.row('One'),
+            'not an object',
+            self.row('Two', date='2000-01-01'),
+            self.row('Three', organizer='nowhere'),
+            self.row('Four', category='Music', status='published'),
+            self.row('Five', category='nothing'),
+            self.row('Six', organizer=str(self.organizer.pk)),
+        ])
+        self.assertEqual((report['created'], report['failed']), (3, 4))
+        self.assertEqual(
+            [(error['row'], sorted(error['errors'])) for error in report['errors']],
+            [(2, ['non_field_errors']), (3, ['date']), (4, ['organizer']), (6, ['category'])]
+        )
+        self.assertEqual(
+            sorted(Activity.objects.values_list('name', flat=True)), ['Four', 'One', 'Six']
+        )
+        # bulk_create bypasses the signals: the importer updates the counters
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.activities_count, 1)
+
+    def test_error_report_is_capped(self):
+        importer = ActivityImporter(self.user, max_errors=2)
+        report = importer.run([{'name': 'Bad'}] * 5)
+        self.assertEqual((report['failed'], len(report['errors'])), (5, 2))
+        self.assertTrue(report['errors_truncated'])
+
+    def test_row_limit(self):
+        importer = ActivityImporter(self.user, batch_size=2, max_rows=3)
+        with self.assertRaises(ImportLimitError):
+            importer.run([self.row(f'Row {index}') for index in range(5)])
+        # Batches before the limit are kept
+        self.assertEqual(importer.created, 2)
+
+    def test_endpoint(self):
+        self.authenticate(self.user)
+        url = '/api/v1/activities/import/'
+        content = b'name,date,time,summary,description\n' + b'Jazz,%s,20:00,%s,%s\n' % (
+            (date.today() + timedelta(days=7)).isoformat().encode(),
+            b'A long enough summary', b'A description that is long enough'
+        )
+
+        def upload(**data):
+            return self.client.post(url, {
+                'file': SimpleUploadedFile('rows.csv', content), **data
+            }, format='multipart')
+
+        self.assertEqual(upload(organizer='nowhere').status_code, 400)
+        self.assertEqual(upload(organizer='12x').status_code, 400)
+        response = upload(organizer=str(self.organizer.pk))
+        self.assertEqual((response.status_code, response.data['created']), (201, 1))
+
+        with override_settings(ACTIVITY_IMPORT={'MAX_UPLOAD_SIZE': 10}):
+            self.assertEqual(upload(organizer=self.organizer.slug).status_code, 413)
+        with override_settings(ACTIVITY_IMPORT={'MAX_ROWS': 0}):
+            response = upload(organizer=self.organizer.slug)
+            self.assertEqual((response.status_code, response.data['created']), (400, 0))
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+class ExportTests(MainDataMixin, TestCase):
+
+    def export(self, export_format, **options):
+        return ''.join(export_lines(base_queryset(), export_format, **options))
+
+    def test_keyset_batches(self):
+        activities = [self.make_activity(f'Row {index}') for index in range(5)]
+        with self.assertNumQueries(3):
+            rows = list(iter_activities(base_queryset().order_by('-date'), chunk_size=2))
+        self.assertEqual(rows, activities)
+        # An exact multiple needs one more (empty) query
+        with self.assertNumQueries(2):
+            self.assertEqual(len(list(iter_activities(base_queryset(), chunk_size=5))), 5)
+
+    def test_ndjson_and_csv(self):
+        self.make_activity('Jazz, "live"', price=Decimal('12.50'))
+        self.make_activity('Free')
+
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Jazz, "live"', 'Free'])
+        self.assertEqual((rows[0]['price'], rows[1]['price']), ('12.50', None))
+        self.assertEqual(rows[0]['organizer'], self.organizer.slug)
+
+        rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual(rows[0]['name'], 'Jazz, "live"')
+        self.assertEqual((rows[0]['price'], rows[1]['price']), ('12.50', ''))
+        self.assertEqual(rows[0]['time'], '20:00:00')
+
+    def test_async_export_pulls_one_batch_at_a_time(self):
+        activities = [self.make_activity(f'Row {index}') for index in range(5)]
+        lines = aexport_lines(base_queryset(), 'ndjson', chunk_size=2)
+        with CaptureQueriesContext(connection) as queries:
+            first = async_to_sync(anext)(lines)
+        self.assertEqual(len(queries), 1)
+
+        async def rest():
+            return [line async for line in lines]
+        names = [json.loads(line)['name'] for line in [first, *async_to_sync(rest)()]]
+        self.assertEqual(names, [activity.name for activity in activities])
+
+    async def test_asgi_response_is_async(self):
+        await sync_to_async(self.make_activity)(status='published')
+        response = await self.async_client.get('/api/v1/activities/export/')
+        self.assertTrue(response.is_async)
+        content = b''.join([part async for part in response.streaming_content])
+        self.assertEqual(json.loads(content)['name'], 'Jazz night')
+
+    def test_ics_folding(self):
+        for line in ('A' * 200, 'é' * 100, 'x' + '€' * 60):
+            folded = _ics_fold(line)
+            parts = folded[:-2].split('\r\n')
+            self.assertTrue(all(len(part.encode()) <= 75 for part in parts))
+            self.assertTrue(all(part.startswith(' ') for part in parts[1:]))
+            self.assertEqual(''.join([parts[0]] + [part[1:] for part in parts[1:]]), line)
+        self.assertEqual(_ics_fold('short'), 'short\r\n')
+
+    def test_ics_round_trip(self):
+        description = 'Line one; with, punctuation\nand a second line ' + 'é' * 80
+        self.make_activity('Jazz, night', description=description, category=self.category)
+        content = self.export('ics', host='example.com')
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(all(len(line.encode()) <= 75 for line in content.split('\r\n')))
+
+        [row] = list(iter_ics(io.StringIO(content)))
+        self.assertEqual(row['name'], 'Jazz, night')
+        self.assertEqual(row['description'], description)
+        self.assertEqual(row['category'], 'Music')
+        self.assertEqual(row['organizer'], self.organizer.slug)
+
+
+# ============================================================================
+# MEDIA BLOBS
+# ============================================================================
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+class MediaBlobTests(MainDataMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = self.settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = get_media_storage()
+
+    def poster(self, content=PNG):
+        return SimpleUploadedFile('poster.png', content)
+
+    def refcount(self, name):
+        return MediaBlob.objects.get(name=name).refcount
+
+    def gc(self, grace_hours=0):
+        call_command('gc_media_blobs', grace_hours=grace_hours, stdout=io.StringIO())
+
+    def test_identical_uploads_share_a_blob(self):
+        first = self.make_activity('One', poster=self.poster())
+        second = self.make_activity('Two', poster=self.poster())
+        self.assertEqual(first.poster.name, second.poster.name)
+        self.assertTrue(first.poster.name.startswith('blobs/'))
+        self.assertEqual(self.refcount(first.poster.name), 2)
+        self.assertEqual(MediaBlob.objects.get().size, len(PNG))
+
+        second.poster = self.poster(PNG + b'other')
+        second.save()
+        self.assertEqual(self.refcount(first.poster.name), 1)
+        self.assertEqual(self.refcount(second.poster.name), 1)
+
+        first.delete()
+        self.assertEqual(self.refcount(second.poster.name), 1)
+        self.assertEqual(MediaBlob.objects.get(name=first.poster.name).refcount, 0)
+
+    def test_validator_digest_names_the_blob(self):
+        upload = ContentFile(PNG, name='poster.png')
+        upload.content_hash = 'ab' * 32
+        name = self.storage.save('poster.png', upload)
+        self.assertEqual(name, f'blobs/ab/ab/{"ab" * 32}.png')
+        self.assertTrue(self.storage.exists(name))
+        # Same digest: the stored file is reused
+        upload = ContentFile(b'ignored', name='poster.png')
+        upload.content_hash = 'ab' * 32
+        self.assertEqual(self.storage.save('poster.png', upload), name)
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), PNG)
+
+    def test_gc(self):
+        kept = self.make_activity('Kept', poster=self.poster())
+        dropped = self.make_activity('Dropped', poster=self.poster(PNG + b'dropped'))
+        name = dropped.poster.name
+        dropped.delete()
+
+        # Within the grace period
+        self.gc(grace_hours=1)
+        self.assertTrue(self.storage.exists(name))
+
+        self.gc()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertTrue(self.storage.exists(kept.poster.name))
+        self.assertEqual(self.refcount(kept.poster.name), 1)
+
+    def test_relinked_blob_is_kept(self):
+        activity = self.make_activity(poster=self.poster())
+        name = activity.poster.name
+        activity.delete()
+        MediaBlob.objects.update(linked_at=timezone.now() - timedelta(days=2))
+
+        # Uploaded again: linked now, so within the grace period
+        self.make_activity('Again', poster=self.poster())
+        self.gc(grace_hours=1)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+
+# ============================================================================
+# MAP CLUSTERS
+# ============================================================================
+
+class ClusterZoomTests(TestCase):
+
+    def test_large_bbox_lowers_zoom(self):
+        world = (-180, -85, 180, 85)
+        zoom = fit_zoom(world, MAX_ZOOM)
+        x_min, y_min, x_max, y_max = cell_range(world, zoom)
+        self.assertLess(zoom, MAX_ZOOM)
+        self.assertLessEqual((x_max - x_min + 1) * (y_max - y_min + 1), MAX_CELLS)
+
+    def test_small_bbox_keeps_zoom(self):
+        brussels = (4.35, 50.84, 4.36, 50.85)
+        self.assertEqual(fit_zoom(brussels, 14), 14)
+        self.assertEqual(fit_zoom(brussels, 99), MAX_ZOOM)
+
+
+class ClusterDeltaTests(MainDataMixin, TestCase):
+    brussels = (4.3525, 50.8467)
+    liege = (5.5797, 50.6326)
+
+    def cells(self):
+        return {
+            (cell.zoom, cell.x, cell.y): cell.count
+            for cell in MapClusterCell.objects.filter(count__gt=0)
+        }
+
+    def expected(self, lng, lat):
+        return {(zoom, *cell_for(lng, lat, zoom)): 1 for zoom in range(MAX_ZOOM + 1)}
+
+    def test_address_moves_between_cells(self):
+        address = ActivityAddress(
+            activity=self.make_activity(status='published'), address='Grand-Place'
+        )
+        address.set_coordinates(*self.brussels)
+        address.save()
+        self.assertEqual(self.cells(), self.expected(*self.brussels))
+
+        address.set_coordinates(*self.liege)
+        address.save()
+        self.assertEqual(self.cells(), self.expected(*self.liege))
+
+        address.delete()
+        self.assertEqual(self.cells(), {})
+
+    def test_move_is_batched(self):
+        move_point(None, self.brussels)
+        # Lookup, insert of the new cells (in a savepoint), one UPDATE
+        with self.assertNumQueries(5):
+            move_point(self.brussels, self.liege)
+        self.assertEqual(self.cells(), self.expected(*self.liege))
+
+
+# ============================================================================
+# NEARBY
+# ============================================================================
+
+@skipUnlessDBFeature('gis_enabled')
+class NearbyFilterTests(MainDataMixin, TestCase):
+    url = '/api/v1/activities/'
+    # Brussels Grand-Place
+    near = '4.3525,50.8467'
+
+    def place(self, name, longitude, latitude, **fields):
+        fields.setdefault('status', 'published')
+        activity = self.make_activity(name, **fields)
+        address = ActivityAddress(activity=activity, address='Somewhere')
+        address.set_coordinates(longitude, latitude)
+        address.save()
+        return activity
+
+    def nearby(self, query=''):
+        response = self.client.get(f'{self.url}?near={self.near}&{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_nearest_first_within_radius(self):
+        self.place('Leuven', 4.7005, 50.8798)       # ~25 km
+        self.place('Ixelles', 4.3670, 50.8330)      # ~2 km
+        self.place('Antwerp', 4.4025, 51.2194)      # ~42 km
+        ActivityAddress.objects.create(
+            activity=self.make_activity('No location', status='published'), address='Unknown'
+        )
+
+        rows = self.nearby('radius_km=30')
+        self.assertEqual([row['name'] for row in rows], ['Ixelles', 'Leuven'])
+        self.assertLess(rows[0]['distance_km'], 3)
+        self.assertAlmostEqual(rows[1]['distance_km'], 25, delta=2)
+        self.assertEqual([row['name'] for row in self.nearby('radius_km=1')], [])
+
+    def test_combined_with_status_and_dates(self):
+        today = date.today()
+        self.place('Soon', 4.3600, 50.8450, date=today + timedelta(days=2))
+        self.place('Later', 4.3550, 50.8470, date=today + timedelta(days=30))
+        self.place('Draft', 4.3525, 50.8467, status='draft')
+        self.place('Past', 4.3530, 50.8460, date=today - timedelta(days=3))
+
+        rows = self.nearby(f'date_to={(today + timedelta(days=10)).isoformat()}&filter=upcoming')
+        self.assertEqual([row['name'] for row in rows], ['Soon'])
+        rows = self.nearby('status=published&filter=upcoming')
+        self.assertEqual([row['name'] for row in rows], ['Later', 'Soon'])
+
+
+# ============================================================================
+# CURSOR PAGINATION
+# ============================================================================
+
+class CursorPaginationTests(MainDataMixin, TestCase):
+    url = '/api/v1/activities/'
+
+    def walk(self, query):
+        """Names of every row, following `next` links"""
+        names, pages = [], []
+        response = self.client.get(f'{self.url}?pagination=cursor&page_size=2&{query}')
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append(response)
+            names += [row['name'] for row in response.data['results']]
+            if not response.data['next']:
+                return names, pages
+            response = self.client.get(response.data['next'])
+
+    def test_ties_are_neither_skipped_nor_repeated(self):
+        for index in range(5):
+            self.make_activity(f'Same day {index}', status='published')
+        names, _ = self.walk('')
+        # (-date, -created_at, -id): same date, newest first
+        self.assertEqual(names, [f'Same day {index}' for index in reversed(range(5))])
+
+    def test_nullable_ordering(self):
+        for name, price in [('Free a', None), ('Ten', '10.00'), ('Five', '5.50'),
+                            ('Free b', None), ('Zero', '0.00')]:
+            self.make_activity(name, status='published', price=price and Decimal(price))
+
+        names, _ = self.walk('ordering=price')
+        self.assertEqual(names, ['Free a', 'Free b', 'Zero', 'Five', 'Ten'])
+        names, pages = self.walk('ordering=-price')
+        self.assertEqual(names, ['Ten', 'Five', 'Zero', 'Free b', 'Free a'])
+
+        # Back from the last page (cursor on a NULL price)
+        previous = self.client.get(pages[-1].data['previous'])
+        self.assertEqual(
+            [row['name'] for row in previous.data['results']],
+            [row['name'] for row in pages[-2].data['results']]
+        )
+
+    def test_invalid_cursor(self):
+        tokens = ['not-base64!', 'eyJwIjpbMV0sInIiOmZhbHNlfQ'] + [
+            # Values that do not fit the (date, created_at, id) fields
+            base64.urlsafe_b64encode(payload).decode()
+            for payload in (b'{"p":["x",1],"r":false}', b'{"p":["x",1,2],"r":false}',
+                            b'{"p":["2030-01-01",1,2],"r":false}', b'{"p":[null,null,[1]],"r":true}')
+        ]
+        for token in tokens:
+            response = self.client.get(f'{self.url}?cursor={token}')
+            self.assertEqual(response.status_code, 404)
+
+    def test_ranked_order_is_refused(self):
+        self.make_activity(status='published')
+        response = self.client.get(f'{self.url}?pagination=cursor&search=jazz')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(f'{self.url}?pagination=cursor&search=jazz&ordering=date')
+        self.assertEqual(response.status_code, 200)
+
+    def test_page_numbers_stay_the_default(self):
+        self.make_activity(status='published')
+        self.assertIn('count', self.client.get(self.url).data)
+
+    def test_nested_comments_are_paginated_by_default(self):
+        activity = self.make_activity(status='published')
+        for index in range(3):
+            Comment.objects.create(activity=activity, author=self.other, text=f'Hello {index}')
+        url = f'/api/v1/activities/{activity.slug}/comments/'
+
+        first = self.client.get(f'{url}?page_size=2').data
+        self.assertEqual([row['text'] for row in first['results']], ['Hello 2', 'Hello 1'])
+        rest = self.client.get(first['next']).data
+        self.assertEqual([row['text'] for row in rest['results']], ['Hello 0'])
+        self.assertEqual(rest['next'], None)
+
+        # The unbounded list only on request
+        rows = self.client.get(f'{url}?pagination=all').data
+        self.assertEqual([row['text'] for row in rows], ['Hello 2', 'Hello 1', 'Hello 0'])
+
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+
+class ResponseCacheTests(MainDataMixin, TestCase):
+    url = '/api/v1/categories/'
+
+    def test_hit_until_a_write_commits(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        second = self.client.get(self.url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Theatre')
+        third = self.client.get(self.url)
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertIn(b'Theatre', third.content)
+
+    def test_bump_waits_for_commit(self):
+        generation = get_generation()
+        with self.captureOnCommitCallbacks() as callbacks:
+            bump_generation()
+            self.assertEqual(get_generation(), generation)
+        callbacks[0]()
+        self.assertEqual(get_generation(), generation + 1)
+
+    def test_query_string_is_normalized(self):
+        self.assertEqual(self.client.get(f'{self.url}?b=2&a=1')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(f'{self.url}?a=1&b=2')['X-Cache'], 'HIT')
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.get(self.url)
+        self.authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('X-Cache'))
+
+    def test_evicted_generation_never_repeats(self):
+        seen = []
+        for _ in range(3):
+            seen.append(get_generation())
+            with self.captureOnCommitCallbacks(execute=True):
+                bump_generation()
+        seen.append(get_generation())
+
+        # Culled by the cache: responses of earlier generations may remain
+        get_cache().delete(GENERATION_KEY)
+        self.assertNotIn(get_generation(), seen)
+        seen.append(get_generation())
+
+        # Evicted right before a bump
+        get_cache().delete(GENERATION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_generation()
+        self.assertNotIn(get_generation(), seen)
+
+
+# ============================================================================
+# CONDITIONAL GET
+# ============================================================================
+
+class ConditionalGetTests(MainDataMixin, TestCase):
+    url = '/api/v1/activities/'
+
+    def setUp(self):
+        super().setUp()
+        self.activity = self.make_activity(status='published')
+        # The author's own views are not counted
+        self.authenticate(self.user)
+
+    def test_list_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], etag)
+
+        # Another filter is another representation
+        self.assertNotEqual(self.client.get(f'{self.url}?price=free')['ETag'], etag)
+
+    def test_list_etag_changes_with_the_data(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_activity('Another', status='published')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_validators(self):
+        url = f'{self.url}{self.activity.slug}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+        Comment.objects.create(activity=self.activity, author=self.other, text='New')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_etag_depends_on_the_user(self):
+        etag = self.client.get(self.url)['ETag']
+        self.authenticate(self.other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cached_anonymous_response_revalidates(self):
+        self.authenticate(None)
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        # Answered from the cached entry's validators
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+
+
+# ============================================================================
+# ASYNC ROUTES
+# ============================================================================
+
+def flatten(patterns, prefix=''):
+    """{url name: (route, view)} of a pattern list"""
+    routes = {}
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            routes.update(flatten(entry.url_patterns, prefix + str(entry.pattern)))
+        elif entry.name:
+            routes.setdefault(entry.name, (prefix + str(entry.pattern), entry.callback))
+    return routes
+
+
+class AsyncRouteTests(SimpleTestCase):
+
+    def test_route_table(self):
+        sync_routes = flatten(urls.urlpatterns)
+        async_routes = flatten(async_urls.urlpatterns)
+        self.assertLessEqual(set(async_urls.ASYNC_ROUTES), set(sync_routes))
+        self.assertEqual(
+            {name: route for name, (route, _) in async_routes.items()},
+            {name: route for name, (route, _) in sync_routes.items()}
+        )
+        for name, (_, view) in async_routes.items():
+            with self.subTest(route=name):
+                self.assertEqual(iscoroutinefunction(view), name in async_urls.ASYNC_ROUTES)
+                # Same view class and actions (query budgets, OpenAPI, ...)
+                self.assertEqual(view.cls, sync_routes[name][1].cls)
+                self.assertEqual(
+                    getattr(view, 'actions', None), getattr(sync_routes[name][1], 'actions', None)
+                )
+
+    def test_asgi_urlconf(self):
+        resolver = get_resolver('config.asgi_urls')
+        for path in ('/api/v1/activities/', '/api/v1/activities/jazz/comments/1/'):
+            match = resolver.resolve(path)
+            self.assertEqual(match.namespace, 'main')
+            self.assertTrue(iscoroutinefunction(match.func))
+        # Unchanged elsewhere, e.g. the create-only import action
+        self.assertFalse(iscoroutinefunction(resolver.resolve('/api/v1/activities/import/').func))
+        self.assertEqual(
+            reverse('main:activity-detail', kwargs={'slug': 'jazz'}, urlconf='config.asgi_urls'),
+            reverse('main:activity-detail', kwargs={'slug': 'jazz'}, urlconf='config.urls')
+        )
+
+
+# ============================================================================
+# QUERY BUDGETS
+# ============================================================================
+
+# Budgets are for the uncached requests
+@override_settings(CACHES={
+    **settings.CACHES,
+    'api': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class RouteBudgetTests(QueryBudgetTestMixin, MainDataMixin, TestCase):
+    """Every GET route of apps.main.urls within its query budget"""
+
+    def setUp(self):
+        super().setUp()
+        other_category = Category.objects.create(name='Theatre')
+        other_organizer = Organizer.objects.create(name='Other', email='o@example.com', phone='2')
+        self.activity = self.make_activity(status='published')
+        for index in range(3):
+            activity = self.make_activity(
+                f'Play {index}', status='published',
+                category=other_category, organizer=other_organizer, author=self.other
+            )
+            Comment.objects.create(activity=activity, author=self.user, text='Nice')
+        self.comment = Comment.objects.create(activity=self.activity, author=self.other, text='Hi')
+
+    def url_kwargs(self):
+        activity = {'slug': self.activity.slug}
+        return {
+            'main:category-detail': {'slug': self.category.slug},
+            'main:category-activities': {'slug': self.category.slug},
+            'main:organizer-detail': {'slug': self.organizer.slug},
+            'main:organizer-activities': {'slug': self.organizer.slug},
+            'main:activity-detail': activity,
+            'main:activity-address': activity,
+            'main:activity-comments': activity,
+            'main:activity-comments-list': {'activity_slug': self.activity.slug},
+            'main:activity-comments-detail': {
+                'activity_slug': self.activity.slug, 'pk': self.comment.pk
+            },
+        }
+
+    def assertBudgets(self):
+        self.assertRouteBudgets(self.url_kwargs(), query={
+            'main:activity-clusters': 'bbox=-10,40,10,60&zoom=6',
+        })
+
+    def test_anonymous(self):
+        self.assertBudgets()
+
+    def test_authenticated(self):
+        self.authenticate(self.user)
+        self.assertBudgets()
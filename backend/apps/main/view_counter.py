@@ -0,0 +1,294 @@
+# apps/main/view_counter.py
+
+"""
+Write-behind view counting for activity detail pages.
+
+Views are accumulated in a small SQLite file shared by every worker on the
+host, so recording a view never touches the main database and pending counts
+survive a worker restart. A background thread in each worker (or the
+flush_view_counts management command) periodically moves the pending counts
+into Activity.views_count in batches.
+
+Only one worker flushes at a time: the flush is guarded by a lease row in the
+same SQLite file. If a worker dies between committing the batch to the main
+database and clearing it from the buffer, that batch is counted twice -
+an acceptable trade-off for a view counter.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Activity
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'PATH': Path(settings.BASE_DIR) / 'var' / 'view_counts.sqlite3',
+    'FLUSH_INTERVAL': 30,   # seconds between flushes
+    'BATCH_SIZE': 500,      # activities per flush batch
+    'LEASE_SECONDS': 60,    # how long a flusher may hold the lock
+}
+
+
+def get_config():
+    """Settings merged with defaults"""
+    return {**DEFAULTS, **getattr(settings, 'VIEW_COUNTER', {})}
+
+
+# ============================================================================
+# BUFFER
+# ============================================================================
+
+class ViewCountBuffer:
+    """Pending view counts stored in a local SQLite file"""
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS pending_views ('
+        '  activity_id INTEGER PRIMARY KEY,'
+        '  hits INTEGER NOT NULL'
+        ')',
+        'CREATE TABLE IF NOT EXISTS flush_lease ('
+        '  id INTEGER PRIMARY KEY CHECK (id = 1),'
+        '  locked_until REAL NOT NULL,'
+        '  last_flush REAL NOT NULL'
+        ')',
+        'INSERT OR IGNORE INTO flush_lease (id, locked_until, last_flush) '
+        'VALUES (1, 0, 0)',
+    )
+
+    def __init__(self, path, flush_interval, batch_size, lease_seconds):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+
+    def _connect(self):
+        """One autocommit connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    def record(self, activity_id):
+        """
+        Add one view.
+
+        Returns:
+            int: Views for this activity not yet flushed to the database
+        """
+        conn = self._connect()
+        conn.execute(
+            'INSERT INTO pending_views (activity_id, hits) VALUES (?, 1) '
+            'ON CONFLICT (activity_id) DO UPDATE SET hits = hits + 1',
+            (activity_id,)
+        )
+        return self.pending(activity_id)
+
+    def pending(self, activity_id):
+        """Views not yet flushed for one activity"""
+        row = self._connect().execute(
+            'SELECT hits FROM pending_views WHERE activity_id = ?',
+            (activity_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def discard(self, activity_ids):
+        """Drop pending views (e.g. after an admin reset)"""
+        conn = self._connect()
+        conn.executemany(
+            'DELETE FROM pending_views WHERE activity_id = ?',
+            [(pk,) for pk in activity_ids]
+        )
+
+    # ------------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------------
+
+    def _acquire_lease(self, force):
+        now = time.time()
+        due = now if force else now - self.flush_interval
+        cursor = self._connect().execute(
+            'UPDATE flush_lease SET locked_until = ? '
+            'WHERE id = 1 AND locked_until < ? AND last_flush <= ?',
+            (now + self.lease_seconds, now, due)
+        )
+        return cursor.rowcount == 1
+
+    def _release_lease(self):
+        self._connect().execute(
+            'UPDATE flush_lease SET locked_until = 0, last_flush = ? WHERE id = 1',
+            (time.time(),)
+        )
+
+    def flush(self, force=False):
+        """
+        Move pending views into Activity.views_count.
+
+        Args:
+            force: Flush even if the interval has not elapsed yet
+
+        Returns:
+            int: Number of views flushed (0 if another worker holds the lease)
+        """
+        if not self._acquire_lease(force):
+            return 0
+
+        flushed = 0
+        try:
+            conn = self._connect()
+            while True:
+                rows = conn.execute(
+                    'SELECT activity_id, hits FROM pending_views LIMIT ?',
+                    (self.batch_size,)
+                ).fetchall()
+                if not rows:
+                    break
+
+                # One UPDATE per distinct increment keeps statements small
+                by_hits = defaultdict(list)
+                for activity_id, hits in rows:
+                    by_hits[hits].append(activity_id)
+
+                with transaction.atomic():
+                    for hits, ids in by_hits.items():
+                        Activity.objects.filter(pk__in=ids).update(
+                            views_count=F('views_count') + hits
+                        )
+
+                # Subtract rather than delete: views recorded meanwhile survive
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.executemany(
+                        'UPDATE pending_views SET hits = hits - ? '
+                        'WHERE activity_id = ?',
+                        [(hits, activity_id) for activity_id, hits in rows]
+                    )
+                    conn.execute('DELETE FROM pending_views WHERE hits <= 0')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                conn.execute('COMMIT')
+
+                flushed += sum(hits for _, hits in rows)
+                if len(rows) < self.batch_size:
+                    break
+        finally:
+            self._release_lease()
+
+        return flushed
+
+
+# ============================================================================
+# PROCESS-WIDE BUFFER AND BACKGROUND FLUSHER
+# ============================================================================
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_flusher = None
+_writer = None
+
+
+def get_buffer():
+    """Lazily created process-wide buffer"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = get_config()
+                _buffer = ViewCountBuffer(
+                    config['PATH'],
+                    config['FLUSH_INTERVAL'],
+                    config['BATCH_SIZE'],
+                    config['LEASE_SECONDS'],
+                )
+    return _buffer
+
+
+def _flush_loop(buffer):
+    while True:
+        time.sleep(buffer.flush_interval)
+        try:
+            buffer.flush()
+        except Exception:
+            logger.exception('Failed to flush buffered view counts')
+        finally:
+            connection.close()
+
+
+def _ensure_flusher(buffer):
+    """Start the flusher thread once per process"""
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        with _buffer_lock:
+            if _flusher is None or not _flusher.is_alive():
+                _flusher = threading.Thread(
+                    target=_flush_loop,
+                    args=(buffer,),
+                    name='view-counter-flusher',
+                    daemon=True
+                )
+                _flusher.start()
+
+
+def record_view(activity_id):
+    """
+    Record one view of an activity.
+
+    Returns:
+        int: Pending (not yet flushed) views, to add to the stored count
+    """
+    buffer = get_buffer()
+    _ensure_flusher(buffer)
+    return buffer.record(activity_id)
+
+
+def _record_in_background(activity_id):
+    try:
+        record_view(activity_id)
+    except Exception:
+        logger.exception('Failed to record a view of activity %s', activity_id)
+
+
+def defer_view(activity_id):
+    """
+    Record one view without waiting for the write (async views).
+    One background thread writes the views in order.
+    """
+    global _writer
+    if _writer is None:
+        with _buffer_lock:
+            if _writer is None:
+                _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='view-counter')
+    _writer.submit(_record_in_background, activity_id)
+
+
+def pending_views(activity_id):
+    """Views of an activity not yet flushed to the database"""
+    return get_buffer().pending(activity_id)
+
+
+def discard_views(activity_ids):
+    """Forget pending views for the given activities"""
+    get_buffer().discard(activity_ids)
+
+
+def flush_views(force=True):
+    """Flush pending views now"""
+    return get_buffer().flush(force=force)
@@ -2,12 +2,15 @@
 
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.db.models import Prefetch, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Max, Prefetch, Q
 from django.utils import timezone
 
 from .models import Category, Organizer, Activity, Comment
@@ -23,15 +26,35 @@ from .serializers import (
     CommentCreateSerializer,
     ActivityAddressSerializer,
     ActivityAddressWriteSerializer,
+    DETAIL_COMMENTS_LIMIT,
+    recent_comments_queryset,
 )
 from .permissions import IsAuthorOrReadOnly, IsAdminOrReadOnly
+from .filters import ActivitySearchFilter, NearbyFilter
+from .view_counter import defer_view, pending_views, record_view
+from .clusters import fit_zoom, get_clusters
+from .cache import AnonymousResponseCacheMixin
+from .exporter import FORMATS as EXPORT_FORMATS, aexport_lines, export_lines
+from .importer import (
+    ActivityImporter, ImportFormatError, detect_format, get_config as get_import_config,
+    reference_condition
+)
+from .conditional import ConditionalGetMixin
+from .fieldsets import query_plan, select_related
+from apps.query_budget import query_budget
+from apps.observability.tracing import TracedViewMixin
+from .pagination import (
+    ActivityCursorPagination,
+    CommentCursorPagination,
+    CursorPaginationMixin,
+)
 
 
 # ============================================================================
 # CATEGORY VIEWSET
 # ============================================================================
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(TracedViewMixin, AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for categories.
     
@@ -49,19 +72,25 @@ class CategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    # Most SQL queries per request, including the JWT user lookup
+    query_budgets = {'list': 3, 'retrieve': 2, 'activities': 3}
     
     @action(detail=True, methods=['get'])
     def activities(self, request, slug=None):
         """Get all activities for this category"""
         category = self.get_object()
         
-        # ✅ ДОБАВЛЕНО: select_related для оптимизации
         activities = category.activities.filter(
             status='published',
             date__gte=timezone.now().date()
-        ).select_related('organizer', 'category', 'author', 'address')
+        )
+        
+        # Join only what the (?fields=/?expand=) selection serializes
+        context = self.get_serializer_context()
+        select, _ = query_plan(ActivityListSerializer(context=context), Activity)
+        activities = select_related(activities, select)
         
-        serializer = ActivityListSerializer(activities, many=True)
+        serializer = ActivityListSerializer(activities, many=True, context=context)
         return Response(serializer.data)
 
 
@@ -69,7 +98,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 # ORGANIZER VIEWSET
 # ============================================================================
 
-class OrganizerViewSet(viewsets.ModelViewSet):
+class OrganizerViewSet(TracedViewMixin, AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     """
     ViewSet for organizers.
     
@@ -86,6 +115,8 @@ class OrganizerViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
     ordering_fields = ['name', 'created_at']
     ordering = ['-created_at']
+    # Most SQL queries per request, including the JWT user lookup
+    query_budgets = {'list': 3, 'retrieve': 2, 'activities': 3}
     
     def get_serializer_class(self):
         """Return full serializer for staff/admin, public for others"""
@@ -113,10 +144,12 @@ class OrganizerViewSet(viewsets.ModelViewSet):
                 date__gte=timezone.now().date()
             )
         
-        # ✅ ДОБАВЛЕНО: select_related для оптимизации
-        activities = activities.select_related('category', 'organizer', 'author', 'address')
+        # Join only what the (?fields=/?expand=) selection serializes
+        context = self.get_serializer_context()
+        select, _ = query_plan(ActivityListSerializer(context=context), Activity)
+        activities = select_related(activities, select)
         
-        serializer = ActivityListSerializer(activities, many=True)
+        serializer = ActivityListSerializer(activities, many=True, context=context)
         return Response(serializer.data)
 
 
@@ -124,43 +157,67 @@ class OrganizerViewSet(viewsets.ModelViewSet):
 # ACTIVITY VIEWSET
 # ============================================================================
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(
+    TracedViewMixin,
+    AnonymousResponseCacheMixin,
+    ConditionalGetMixin,
+    CursorPaginationMixin,
+    viewsets.ModelViewSet
+):
     """
     ViewSet for activities.
     
     list: Get all published activities
-    retrieve: Get single activity (increments views)
+          (?pagination=cursor switches to keyset pagination without COUNT)
+    retrieve: Get single activity (increments views, embeds the newest comments)
+    
+    list/retrieve send ETag and Last-Modified and answer 304 to matching
+    conditional requests. views_count is not part of the validators, so a
+    304 may carry a slightly stale view count.
     create: Create new activity
     update: Update activity (author only)
     destroy: Delete activity (author only)
     """
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    cursor_pagination_class = ActivityCursorPagination
+    # Search and "near me" run last so they can order by relevance/distance
+    # when no ?ordering= is given (distance wins when both are used)
+    filter_backends = [
+        DjangoFilterBackend,
+        filters.OrderingFilter,
+        ActivitySearchFilter,
+        NearbyFilter,
+    ]
     filterset_fields = ['category', 'organizer', 'status']
-    search_fields = ['name', 'summary', 'description']
     ordering_fields = ['date', 'created_at', 'views_count', 'price']
     ordering = ['-date', '-created_at']
+    # Most SQL queries per request, including the JWT user lookup
+    # (actions decorated with @query_budget declare their own)
+    query_budgets = {'list': 4, 'retrieve': 3}
+    # Count detail views in the background (set by the async views)
+    defer_view_count = False
     
     def get_queryset(self):
         """
         Get queryset with optimized select/prefetch.
         Show all for staff, only published for others.
         """
-        # ✅ БАЗОВАЯ ОПТИМИЗАЦИЯ: всегда используем select_related
-        queryset = Activity.objects.select_related(
-            'organizer', 'category', 'author', 'address'
-        )
+        if self.action in ('list', 'retrieve'):
+            # Join/prefetch only what the ?fields=/?expand= selection serializes
+            select, prefetch = query_plan(self.get_serializer(), Activity)
+        else:
+            select, prefetch = ('organizer', 'category', 'author', 'address'), ()
+        queryset = select_related(Activity.objects.all(), select)
         
-        # Optimize prefetch based on action
-        if self.action == 'retrieve':
-            # ✅ ДОБАВЛЕНО: select_related для author в comments
+        if 'comments' in prefetch:
+            # Only the newest comments are embedded (one windowed query);
+            # the total comes from the denormalized comments_count
             queryset = queryset.prefetch_related(
                 Prefetch(
                     'comments',
-                    queryset=Comment.objects.filter(
-                        is_active=True
-                    ).select_related('author')  # ✅ Оптимизация N+1
+                    queryset=recent_comments_queryset()[:DETAIL_COMMENTS_LIMIT],
+                    to_attr='recent_comments'
                 )
             )
         
@@ -203,19 +260,204 @@ class ActivityViewSet(viewsets.ModelViewSet):
             return ActivityUpdateSerializer
         return ActivityDetailSerializer
     
+    def get_list_validators(self, queryset):
+        """ETag/Last-Modified of a filtered list, from one aggregate query"""
+        stats = queryset.order_by().aggregate(
+            count=Count('pk'),
+            updated=Max('updated_at'),
+            organizer_updated=Max('organizer__updated_at'),
+            address_updated=Max('address__updated_at'),
+        )
+        modified = [
+            stats['updated'], stats['organizer_updated'], stats['address_updated']
+        ]
+        return self.build_validators(self.request, [stats['count'], *modified], modified)
+    
+    def get_object_validators(self, instance):
+        """ETag/Last-Modified of a detail, from already loaded rows"""
+        # Relations left out by ?fields=/?expand= are not loaded (nor serialized)
+        related = [
+            getattr(instance, name, None) for name in ('organizer', 'author', 'address')
+            if getattr(Activity, name).is_cached(instance)
+        ]
+        comments = getattr(instance, 'recent_comments', [])
+        modified = [
+            instance.updated_at,
+            *(obj.updated_at for obj in related if obj is not None),
+            max((comment.updated_at for comment in comments), default=None),
+            max((comment.author.updated_at for comment in comments), default=None),
+        ]
+        # comments_count changes when an older, not embedded comment goes away
+        parts = [instance.pk, instance.comments_count, *modified]
+        return self.build_validators(self.request, parts, modified)
+    
+    def list(self, request, *args, **kwargs):
+        """List activities, answering conditional requests before serializing"""
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        validators = self.get_list_validators(queryset)
+        not_modified = self.not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        return self.set_validators(response, validators)
+    
     def retrieve(self, request, *args, **kwargs):
         """Get activity detail and increment views"""
         instance = self.get_object()
         
         # Increment views for published activities (only for non-authors)
-        if instance.status == 'published' and instance.author != request.user:
-            instance.increment_views()
-            # ✅ ИСПРАВЛЕНО: refresh_from_db не нужен, 
-            # т.к. views_count берется из базы при сериализации
+        if instance.status == 'published' and instance.author_id != request.user.pk:
+            # Buffered write: add views not yet flushed to the stored count
+            if self.defer_view_count:
+                # Pending before this view's write is queued, plus this one
+                instance.views_count += pending_views(instance.pk) + 1
+                defer_view(instance.pk)
+            else:
+                instance.views_count += record_view(instance.pk)
+            # Cached anonymous responses still count the view on hits
+            self.response_cache_meta = {'count_view': instance.pk}
+        
+        # A revalidated view still counts as a view
+        validators = self.get_object_validators(instance)
+        not_modified = self.not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
         
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return self.set_validators(Response(serializer.data), validators)
     
+    def on_response_cache_hit(self, request, meta):
+        """Count views served from the anonymous response cache"""
+        if meta and meta.get('count_view'):
+            if self.defer_view_count:
+                defer_view(meta['count_view'])
+            else:
+                record_view(meta['count_view'])
+    
+    @query_budget(3)
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Clustered published activities for a map viewport.
+        ?bbox=min_lng,min_lat,max_lng,max_lat&zoom=12
+        """
+        try:
+            bbox = [float(part) for part in request.query_params['bbox'].split(',')]
+            zoom = int(request.query_params['zoom'])
+        except (KeyError, ValueError):
+            return Response(
+                {'detail': 'Provide bbox=min_lng,min_lat,max_lng,max_lat and an integer zoom.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        min_lng, min_lat, max_lng, max_lat = bbox if len(bbox) == 4 else (0, 0, -1, -1)
+        if not (-180 <= min_lng <= max_lng <= 180 and -90 <= min_lat <= max_lat <= 90):
+            return Response(
+                {'detail': 'Invalid bbox.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Large viewports are served at a lower zoom (bounded cell count)
+        zoom = fit_zoom(bbox, zoom)
+        return Response({
+            'zoom': zoom,
+            'clusters': get_clusters(bbox, zoom),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream all matching activities (same filters as list, no pagination)
+        in creation (pk) order, one query per exporter.CHUNK_SIZE rows.
+        ?export_format=ndjson|csv|ics (default ndjson)
+        Under ASGI the content is an async iterator, so it is still
+        streamed batch by batch.
+        """
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'detail': f'export_format must be one of {", ".join(EXPORT_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        options = {'host': request.get_host()} if export_format == 'ics' else {}
+        content_type, extension = EXPORT_FORMATS[export_format]
+        
+        if isinstance(request._request, ASGIRequest):
+            content = aexport_lines(queryset, export_format, **options)
+        else:
+            content = (chunk.encode() for chunk in export_lines(queryset, export_format, **options))
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="activities.{extension}"'
+        return response
+    
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        permission_classes=[IsAuthenticated],
+        parser_classes=[MultiPartParser, FormParser]
+    )
+    def import_activities(self, request):
+        """
+        Bulk import activities from an uploaded file.
+        Form fields: file (.csv, .json, .ndjson or .ics), optional
+        file_format (csv/json/ics) and organizer (default id or slug).
+        Returns a per-row error report. Uploads are limited in size and
+        rows (ACTIVITY_IMPORT); use `manage.py import_activities` beyond.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'detail': 'Upload a file in the "file" field.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limits = get_import_config()
+        if upload.size > limits['MAX_UPLOAD_SIZE']:
+            return Response(
+                {'detail': f'File too large (at most {limits["MAX_UPLOAD_SIZE"]} bytes).'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        
+        organizer = None
+        reference = request.data.get('organizer')
+        if reference:
+            organizer = Organizer.objects.filter(reference_condition(reference)).first()
+            if organizer is None:
+                return Response(
+                    {'detail': f'Unknown organizer "{reference}".'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        importer = ActivityImporter(
+            request.user,
+            organizer=organizer,
+            max_rows=limits['MAX_ROWS']
+        )
+        try:
+            report = importer.import_file(upload, file_format)
+        except ImportFormatError as error:
+            return Response(
+                {'detail': str(error), **importer.report},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK
+        )
+    
+    @query_budget(2)
     @action(detail=True, methods=['get'])
     def address(self, request, slug=None):
         """Get activity address"""
@@ -284,18 +526,27 @@ class ActivityViewSet(viewsets.ModelViewSet):
         activity.address.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
     
+    @query_budget(3)
     @action(detail=True, methods=['get'])
     def comments(self, request, slug=None):
-        """Get all active comments for activity"""
+        """
+        Active comments for activity, newest first, one keyset-paginated
+        page at a time (?pagination=all: every comment in a plain list)
+        """
         activity = self.get_object()
         
-        # ✅ ДОБАВЛЕНО: select_related для author
-        comments = activity.comments.filter(
-            is_active=True
-        ).select_related('author')
+        context = self.get_serializer_context()
+        comments = recent_comments_queryset().filter(activity=activity)
+        if 'author' not in query_plan(CommentSerializer(context=context), Comment)[0]:
+            comments = comments.select_related(None)
         
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        if request.query_params.get('pagination') == 'all':
+            return Response(CommentSerializer(comments, many=True, context=context).data)
+        
+        paginator = CommentCursorPagination()
+        page = paginator.paginate_queryset(comments, request, view=self)
+        serializer = CommentSerializer(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def add_comment(self, request, slug=None):
@@ -326,22 +577,29 @@ class ActivityViewSet(viewsets.ModelViewSet):
 # COMMENT VIEWSET
 # ============================================================================
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(TracedViewMixin, CursorPaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet for comments.
     Nested under activities.
+    list: page numbers (?pagination=cursor switches to keyset pagination)
     """
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
+    cursor_pagination_class = CommentCursorPagination
+    # Most SQL queries per request, including the JWT user lookup
+    query_budgets = {'list': 3, 'retrieve': 2}
     
     def get_queryset(self):
         """Get active comments for specific activity"""
         activity_slug = self.kwargs.get('activity_slug')
         
-        # ✅ ДОБАВЛЕНО: select_related для author и activity
-        return Comment.objects.filter(
+        queryset = Comment.objects.filter(
             activity__slug=activity_slug,
             is_active=True
-        ).select_related('author', 'activity')
+        )
+        if self.action in ('list', 'retrieve'):
+            select, _ = query_plan(self.get_serializer(), Comment)
+            return select_related(queryset, select)
+        return queryset.select_related('author', 'activity')
     
     def get_serializer_class(self):
         """Choose serializer based on action"""
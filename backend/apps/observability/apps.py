@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+
+
+class ObservabilityConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.observability'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from apps import execute_wrappers
+        from . import slow_queries
+
+        # Per-request SQL instrumentation (query counts, metrics, traces,
+        # profiles) in whichever thread the request's queries run
+        connection_created.connect(execute_wrappers.install, dispatch_uid='execute_wrappers')
+        # Slow-query log on every database connection
+        connection_created.connect(slow_queries.install, dispatch_uid='observability.slow_queries')
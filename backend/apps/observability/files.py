@@ -0,0 +1,126 @@
+# apps/observability/files.py
+
+"""
+Per-process JSON files shared by the workers of one server.
+
+Each process owns <directory>/<pid>-<start>.json and replaces it
+atomically; readers merge every file. Used where several worker processes
+must add up to one view (metrics, slow queries). <start> is the process
+start time (from /proc), so a new process reusing a PID does not take
+over an exited one's file, and files of exited processes can be told
+apart (remove_dead_process_files).
+"""
+
+import os
+import tempfile
+import time
+
+import orjson
+
+# (pid, start) of this process, recomputed after a fork
+_identity = None
+
+
+def process_start_time(pid):
+    """Start time of a process in clock ticks since boot (None without /proc)"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as stat_file:
+            # Fields after the command name, which may contain spaces;
+            # starttime is field 22, the 20th after it
+            fields = stat_file.read().rsplit(b')', 1)[1].split()
+        return int(fields[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _own_identity():
+    global _identity
+    pid = os.getpid()
+    if _identity is None or _identity[0] != pid:
+        start = process_start_time(pid)
+        # Without /proc: any token unique to this process
+        _identity = (pid, str(start) if start is not None else f't{time.time_ns()}')
+    return _identity
+
+
+def own_filename():
+    pid, start = _own_identity()
+    return f'{pid}-{start}.json'
+
+
+def is_alive(pid, start):
+    """Whether the process that wrote <pid>-<start>.json is still running"""
+    current = process_start_time(pid)
+    if current is not None:
+        return str(current) == start
+    # No /proc entry: gone, or a system without /proc (PID check only)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_process_file(directory, data):
+    """Atomically replace this process' file with data (JSON-serializable)"""
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(orjson.dumps(data))
+        os.replace(temp_path, os.path.join(directory, own_filename()))
+    except OSError:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def read_process_files(directory, include_own=True):
+    """Yield the data of every process file (unreadable files are skipped)"""
+    if not directory or not os.path.isdir(directory):
+        return
+    own = own_filename()
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json') or (filename == own and not include_own):
+            continue
+        try:
+            with open(os.path.join(directory, filename), 'rb') as process_file:
+                yield orjson.loads(process_file.read())
+        except (OSError, orjson.JSONDecodeError):
+            continue
+
+
+def remove_process_files(directory):
+    """Delete every process file; returns how many were removed"""
+    removed = 0
+    if not directory or not os.path.isdir(directory):
+        return removed
+    for filename in os.listdir(directory):
+        if filename.endswith('.json'):
+            try:
+                os.unlink(os.path.join(directory, filename))
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def remove_dead_process_files(directory):
+    """Delete the files of exited processes; returns how many were removed"""
+    removed = 0
+    if not directory or not os.path.isdir(directory):
+        return removed
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        pid, _, start = filename[:-len('.json')].partition('-')
+        if pid.isdigit() and start and is_alive(int(pid), start):
+            continue
+        try:
+            os.unlink(os.path.join(directory, filename))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
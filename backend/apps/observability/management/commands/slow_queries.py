@@ -0,0 +1,82 @@
+# apps/observability/management/commands/slow_queries.py
+
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.observability import slow_queries
+
+SORT_KEYS = {
+    'max': lambda entry: entry['max_ms'],
+    'total': lambda entry: entry['total_ms'],
+    'count': lambda entry: entry['count'],
+    'mean': lambda entry: entry['total_ms'] / entry['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'List the slowest query fingerprints recorded by all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Fingerprints to list (default: 10)'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=list(SORT_KEYS),
+            default='total',
+            help='Order by total, max or mean time, or by count (default: total)'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Also print the last captured plan of each fingerprint'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the entries as JSON'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete the recorded tables of all workers and exit'
+        )
+
+    def handle(self, *args, **options):
+        directory = slow_queries.get_config()['DIRECTORY']
+        if not directory:
+            raise CommandError("SLOW_QUERIES['DIRECTORY'] is not set.")
+
+        if options['reset']:
+            removed = slow_queries.reset(directory)
+            self.stdout.write(self.style.SUCCESS(f'Removed {removed} slow query table(s).'))
+            return
+
+        entries = sorted(slow_queries.collect(directory), key=SORT_KEYS[options['sort']], reverse=True)
+        entries = entries[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(entries, indent=2))
+            return
+
+        if not entries:
+            self.stdout.write('No slow queries recorded.')
+            return
+
+        for rank, entry in enumerate(entries, start=1):
+            mean_ms = entry['total_ms'] / entry['count']
+            last_seen = datetime.fromtimestamp(entry['last_seen']).strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'#{rank}  {entry["count"]} x  total {entry["total_ms"]:.1f} ms  '
+                f'mean {mean_ms:.1f} ms  max {entry["max_ms"]:.1f} ms  '
+                f'({entry["alias"]}, last {last_seen})'
+            ))
+            self.stdout.write(f'    {entry["fingerprint"]}')
+            if options['explain'] and entry['plan']:
+                for line in entry['plan'].splitlines():
+                    self.stdout.write(f'      {line}')
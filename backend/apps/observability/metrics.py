@@ -0,0 +1,290 @@
+# apps/observability/metrics.py
+
+"""
+Per-route request metrics in Prometheus text format.
+
+MetricsMiddleware records, for every request, histograms of latency,
+SQL query count, SQL time, serializer time and response size, plus a
+request counter by status. Routes are labelled with their URL name
+(e.g. main:activity-list), so the label set stays small.
+
+Worker processes aggregate through files: each process keeps its
+metrics in memory and writes them to METRICS['DIRECTORY']/<pid>-<start>.json
+at most every FLUSH_INTERVAL seconds (atomically, with os.replace). The
+/metrics view sums every process file, so counts may lag by one flush
+interval. A starting worker deletes the files of exited ones (see
+apps.observability.files); Prometheus sees the drop as a counter reset.
+
+/metrics only answers clients in METRICS['ALLOWED_IPS'] (REMOTE_ADDR).
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from apps.query_budget import count_queries
+
+from .files import read_process_files, remove_dead_process_files, write_process_file
+from .timing import request_timings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'DIRECTORY': None,
+    'FLUSH_INTERVAL': 5,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRICS_ROUTE = 'metrics'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (help, bucket upper bounds)
+HISTOGRAMS = {
+    'http_request_duration_seconds': (
+        'Request latency in seconds', LATENCY_BUCKETS
+    ),
+    'http_request_db_queries': (
+        'SQL queries per request', (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+    ),
+    'http_request_db_duration_seconds': (
+        'Seconds spent in SQL per request', LATENCY_BUCKETS
+    ),
+    'http_request_serializer_duration_seconds': (
+        'Seconds spent serializing per request', LATENCY_BUCKETS
+    ),
+    'http_response_size_bytes': (
+        'Response body size in bytes',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+    ),
+}
+
+COUNTERS = {
+    'http_requests_total': 'Requests by route, method and status',
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class MetricsStore:
+    """
+    Metrics of this process, keyed by (name, labels).
+    Histograms are [count per bucket..., +Inf count, sum], counters [value].
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.values = {}
+        self.last_flush = 0.0
+
+    def _check_process(self):
+        # A forked worker must not report its parent's metrics again
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.values = {}
+            self.last_flush = time.monotonic()
+            self.prune()
+
+    def prune(self):
+        """Delete the files of exited workers (on a worker's first request)"""
+        try:
+            remove_dead_process_files(get_config()['DIRECTORY'])
+        except OSError:
+            logger.warning('Could not prune metrics files', exc_info=True)
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+        with self.lock:
+            self._check_process()
+            entry = self.values.get((name, labels))
+            if entry is None:
+                entry = self.values[(name, labels)] = [0] * (len(buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def increment(self, name, labels, amount=1):
+        with self.lock:
+            self._check_process()
+            entry = self.values.setdefault((name, labels), [0])
+            entry[0] += amount
+
+    def snapshot(self):
+        with self.lock:
+            self._check_process()
+            return {key: list(entry) for key, entry in self.values.items()}
+
+    # ------------------------------------------------------------------
+    # Files shared by the workers
+    # ------------------------------------------------------------------
+
+    def maybe_flush(self):
+        interval = get_config()['FLUSH_INTERVAL']
+        if time.monotonic() - self.last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        directory = get_config()['DIRECTORY']
+        self.last_flush = time.monotonic()
+        if not directory:
+            return
+        write_process_file(directory, [
+            [name, [list(pair) for pair in labels], entry]
+            for (name, labels), entry in self.snapshot().items()
+        ])
+
+    def collect(self):
+        """Metrics of every process: this one live, the others from files"""
+        merged = self.snapshot()
+        directory = get_config()['DIRECTORY']
+        for rows in read_process_files(directory, include_own=False):
+            for name, labels, entry in rows:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = entry
+                elif len(total) == len(entry):
+                    # Different lengths: buckets changed between deploys
+                    merged[key] = [a + b for a, b in zip(total, entry)]
+        return merged
+
+
+store = MetricsStore()
+
+
+@atexit.register
+def _flush_at_exit():
+    if store.values:
+        try:
+            store.flush()
+        except OSError:
+            pass
+
+
+# ============================================================================
+# PROMETHEUS TEXT FORMAT
+# ============================================================================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render(metrics):
+    """Prometheus text exposition (format 0.0.4) of collected metrics"""
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (metric, labels), entry in sorted(metrics.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {_number(entry[0])}')
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        bounds = [repr(float(bound)) for bound in buckets] + ['+Inf']
+        for (metric, labels), entry in sorted(metrics.items()):
+            if metric != name or len(entry) != len(bounds) + 1:
+                continue
+            cumulative = 0
+            for bound, count in zip(bounds, entry):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(entry[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    if request.META.get('REMOTE_ADDR') not in get_config()['ALLOWED_IPS']:
+        raise Http404
+    return HttpResponse(render(store.collect()), content_type=CONTENT_TYPE)
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name
+
+
+class MetricsMiddleware:
+    """Records per-route request metrics (METRICS['ENABLED'])"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_config()['ENABLED']:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with request_timings() as timings, count_queries() as queries:
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, timings, queries)
+        return response
+
+    async def __acall__(self, request):
+        if not get_config()['ENABLED']:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        with request_timings() as timings, count_queries() as queries:
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, timings, queries)
+        return response
+
+    def record(self, request, response, elapsed, timings, queries):
+        route = route_label(request)
+        if route == METRICS_ROUTE:
+            return
+
+        labels = (('route', route), ('method', request.method))
+        store.observe('http_request_duration_seconds', labels, elapsed)
+        store.observe('http_request_db_queries', labels, queries.count)
+        store.observe('http_request_db_duration_seconds', labels, queries.duration)
+        store.observe('http_request_serializer_duration_seconds', labels, timings.phases['serialize'])
+        if not response.streaming:
+            store.observe('http_response_size_bytes', labels, len(response.content))
+        store.increment('http_requests_total', labels + (('status', str(response.status_code)),))
+        try:
+            store.maybe_flush()
+        except OSError as exc:
+            logger.warning('Could not write metrics: %s', exc)
@@ -0,0 +1,397 @@
+# apps/observability/profiling.py
+
+"""
+On-demand request profiling.
+
+Staff users profile a single request with a header or query flag:
+
+    X-Profile: 1            sampling profiler (flame graph)
+    X-Profile: cprofile     deterministic profiler (cProfile)
+    ?_profile=1             same, for a browser
+
+PROFILING['SAMPLE_RATE'] = N also profiles 1 in N requests of anyone
+(continuous profiling, MODE decides the profiler).
+
+The sampling profiler is a thread that records the request thread's
+stack every INTERVAL seconds (the GIL switch interval, 5 ms by default,
+bounds the real resolution). Each profile is saved as
+PROFILING['DIRECTORY']/<id>.json with the request, the SQL timeline and
+either the folded stacks or the cProfile function table (plus <id>.prof).
+The response carries X-Profile-Id; staff download profiles from
+/api/v1/profiles/ (see views.py). Only the newest MAX_PROFILES are kept.
+
+Checking that a JWT request comes from staff loads the user once more
+than the view itself does.
+
+Under ASGI the stacks (or cProfile) only cover threads entering
+profile_thread(): the thread pool of the async views. Other requests
+get the SQL timeline and timings only.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+import orjson
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+
+from apps.execute_wrappers import context_wrapper
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'HEADER': 'HTTP_X_PROFILE',
+    'QUERY_PARAM': '_profile',
+    # Profile 1 in N requests (0: only on demand)
+    'SAMPLE_RATE': 0,
+    'MODE': 'sample',
+    'INTERVAL': 0.005,
+    'DIRECTORY': None,
+    'MAX_PROFILES': 200,
+}
+
+MODES = ('sample', 'cprofile')
+RESPONSE_HEADER = 'X-Profile-Id'
+PROFILE_ID_RE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+
+# cProfile functions listed in the JSON profile
+FUNCTION_LIMIT = 100
+
+# ProfileSession of the request being profiled (async requests)
+_session = ContextVar('observability_profile', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PROFILING', {})}
+
+
+def profile_path(profile_id, extension='json'):
+    return os.path.join(get_config()['DIRECTORY'], f'{profile_id}.{extension}')
+
+
+# ============================================================================
+# COLLECTORS
+# ============================================================================
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{module}.{name}:{frame.f_lineno}'.replace(';', ':')
+
+
+class StackSampler:
+    """Samples another thread's call stack into folded-stack counts"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+class SQLTimeline:
+    """Execute wrapper recording when each statement ran"""
+
+    def __init__(self, start):
+        self.start = start
+        self.entries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.entries.append({
+                'offset_ms': round((began - self.start) * 1000, 3),
+                'duration_ms': round((time.perf_counter() - began) * 1000, 3),
+                'sql': sql,
+                'many': many,
+                'alias': context['connection'].alias,
+            })
+
+
+def _function_table(profiler):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': f'{name} ({filename}:{line})',
+            'calls': calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+    return rows[:FUNCTION_LIMIT]
+
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+def save_profile(profile, profiler=None):
+    directory = get_config()['DIRECTORY']
+    os.makedirs(directory, exist_ok=True)
+    if profiler is not None:
+        profiler.dump_stats(profile_path(profile['id'], 'prof'))
+    with open(profile_path(profile['id']), 'wb') as profile_file:
+        profile_file.write(orjson.dumps(profile))
+    prune_profiles()
+
+
+def list_profiles():
+    """Profile ids, newest first"""
+    directory = get_config()['DIRECTORY']
+    if not directory or not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        profile_id = entry.name[:-5]
+        if entry.name.endswith('.json') and PROFILE_ID_RE.match(profile_id):
+            try:
+                profiles.append((entry.stat().st_mtime, profile_id))
+            except FileNotFoundError:
+                continue
+    return [profile_id for _, profile_id in sorted(profiles, reverse=True)]
+
+
+def load_profile(profile_id):
+    """Saved profile dict, or None"""
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    try:
+        with open(profile_path(profile_id), 'rb') as profile_file:
+            return orjson.loads(profile_file.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+def prune_profiles():
+    for profile_id in list_profiles()[get_config()['MAX_PROFILES']:]:
+        for extension in ('json', 'prof'):
+            try:
+                os.unlink(profile_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+def folded_stacks(profile):
+    """Brendan Gregg's folded format (flamegraph.pl, speedscope)"""
+    stacks = profile.get('samples', {}).get('stacks', {})
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.items())
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    # JWT is authenticated inside DRF views, after the middleware
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, TokenError):
+        return False
+    return result is not None and result[0].is_staff
+
+
+class ProfileSession:
+    """Collectors of one profiled request"""
+
+    def __init__(self, mode, config):
+        self.id = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+        self.created_at = timezone.now()
+        self.mode = mode
+        self.interval = config['INTERVAL']
+        self.start = time.perf_counter()
+        self.timeline = SQLTimeline(self.start)
+        self.profiler = None
+        self.stacks = None
+
+    @contextmanager
+    def on_thread(self):
+        """Profile the current thread for the duration of the block"""
+        with ExitStack() as stack:
+            if self.mode == 'cprofile':
+                profiler = self.profiler or cProfile.Profile()
+                try:
+                    profiler.enable()
+                    stack.callback(profiler.disable)
+                    self.profiler = profiler
+                except ValueError as exc:
+                    # Another profiling tool is active: sample instead
+                    logger.warning('cProfile unavailable, sampling instead: %s', exc)
+                    self.mode = 'sample'
+            if self.mode == 'sample':
+                sampler = stack.enter_context(StackSampler(threading.get_ident(), self.interval))
+                stack.callback(lambda: self.add_stacks(sampler.stacks))
+            yield
+
+    def add_stacks(self, stacks):
+        if self.stacks is None:
+            self.stacks = Counter()
+        self.stacks.update(stacks)
+
+
+@contextmanager
+def profile_thread():
+    """
+    Profile the current thread for the request being profiled, if any.
+    For code running a request's work in another thread (async views).
+    """
+    session = _session.get()
+    if session is None:
+        yield
+        return
+    with session.on_thread():
+        yield
+
+
+def _user_label(request):
+    user = getattr(request, 'user', None)
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        # Not loaded during the request (and not loadable on the event loop)
+        return None
+    return str(user) if user.is_authenticated else None
+
+
+class ProfilingMiddleware:
+    """Profiles requests asking for it (staff) and sampled ones"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def flag(self, request, config):
+        return request.META.get(config['HEADER']) or request.GET.get(config['QUERY_PARAM'])
+
+    def requested_mode(self, request, config):
+        """(mode, trigger) when the request must be profiled, else None"""
+        flag = self.flag(request, config)
+        if flag:
+            if not _is_staff(request):
+                return None
+            return (flag if flag in MODES else 'sample'), 'request'
+        rate = config['SAMPLE_RATE']
+        if rate and random.randrange(rate) == 0:
+            return config['MODE'], 'sample'
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        requested = self.requested_mode(request, config) if config['ENABLED'] else None
+        if requested is None:
+            return self.get_response(request)
+
+        mode, trigger = requested
+        session = ProfileSession(mode, config)
+        with context_wrapper(session.timeline), session.on_thread():
+            response = self.get_response(request)
+        return self.finish(request, response, session, trigger)
+
+    async def __acall__(self, request):
+        config = get_config()
+        requested = None
+        if config['ENABLED']:
+            if self.flag(request, config):
+                # The staff check may load the user: not on the event loop
+                requested = await sync_to_async(self.requested_mode)(request, config)
+            else:
+                requested = self.requested_mode(request, config)
+        if requested is None:
+            return await self.get_response(request)
+
+        # Only threads entering profile_thread() are profiled (the async
+        # views' pool); the SQL timeline covers every thread
+        mode, trigger = requested
+        session = ProfileSession(mode, config)
+        token = _session.set(session)
+        try:
+            with context_wrapper(session.timeline):
+                response = await self.get_response(request)
+        finally:
+            _session.reset(token)
+        return self.finish(request, response, session, trigger)
+
+    def finish(self, request, response, session, trigger):
+        """Save the profile and name it in the response"""
+        duration = time.perf_counter() - session.start
+        profile = {
+            'id': session.id,
+            'created_at': session.created_at.isoformat(),
+            'mode': session.mode,
+            'trigger': trigger,
+            'request': {
+                'method': request.method,
+                'path': request.path,
+                'query_string': request.META.get('QUERY_STRING', ''),
+                'user': _user_label(request),
+            },
+            'response': {
+                'status': response.status_code,
+                'bytes': None if response.streaming else len(response.content),
+            },
+            'duration_ms': round(duration * 1000, 3),
+            'sql': session.timeline.entries,
+        }
+        if session.mode == 'sample':
+            stacks = session.stacks or Counter()
+            profile['samples'] = {
+                'interval_ms': session.interval * 1000,
+                'count': sum(stacks.values()),
+                'stacks': dict(stacks),
+            }
+        else:
+            profile['functions'] = _function_table(session.profiler) if session.profiler else []
+
+        try:
+            save_profile(profile, session.profiler)
+        except OSError as exc:
+            logger.warning('Could not save profile %s: %s', session.id, exc)
+            return response
+
+        response[RESPONSE_HEADER] = session.id
+        return response
@@ -0,0 +1,228 @@
+# apps/observability/slow_queries.py
+
+"""
+Slow-query log with EXPLAIN capture.
+
+SlowQueryWrapper is installed on every database connection (see
+apps.ObservabilityConfig.ready) and times each statement. Statements
+slower than SLOW_QUERIES['THRESHOLD_MS'] are logged with their
+fingerprint (apps.query_budget.fingerprint: parameters and inline
+numbers collapsed) and, for SELECTs, the EXPLAIN output of the
+backend (EXPLAIN QUERY PLAN on SQLite/SpatiaLite, EXPLAIN FORMAT=TREE
+on MySQL 8.0.16+, the default format where TREE is not supported, e.g.
+MariaDB). A fingerprint is explained again at most every
+EXPLAIN_INTERVAL seconds.
+
+Every process also keeps a rolling table of slow fingerprints (count,
+total and max time, last plan) over the last WINDOW seconds, capped at
+TOP_N entries and written to SLOW_QUERIES['DIRECTORY'] after each slow
+statement. `manage.py slow_queries` merges the tables of all workers.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from apps.query_budget import fingerprint
+
+from .files import read_process_files, remove_process_files, write_process_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 100,
+    'EXPLAIN': True,
+    'EXPLAIN_INTERVAL': 300,
+    # Parameters may hold personal data: off by default
+    'LOG_PARAMS': False,
+    'TOP_N': 50,
+    'WINDOW': 24 * 3600,
+    'DIRECTORY': None,
+}
+
+EXPLAINABLE = ('SELECT', 'WITH')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'SLOW_QUERIES', {})}
+
+
+# ============================================================================
+# EXPLAIN
+# ============================================================================
+
+def explain(connection, sql, params):
+    """Plan of a statement as text, or the error that prevented it"""
+    options = {}
+    if connection.vendor == 'mysql' and 'TREE' in connection.features.supported_explain_formats:
+        options['format'] = 'TREE'
+    prefix = connection.ops.explain_query_prefix(**options)
+    # Bypass the execute wrappers (this one, query counters, profiler):
+    # the EXPLAIN is not part of the request's work
+    wrappers, connection.execute_wrappers = connection.execute_wrappers, []
+    try:
+        # Savepoint: a failed EXPLAIN must not break the caller's transaction
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+    finally:
+        connection.execute_wrappers = wrappers
+    return '\n'.join(' | '.join(str(column) for column in row) for row in rows)
+
+
+# ============================================================================
+# ROLLING TABLE
+# ============================================================================
+
+class SlowQueryTable:
+    """Slow fingerprints of this process: {fingerprint: stats}"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def record(self, key, sql, duration_ms, alias, plan=None):
+        now = time.time()
+        config = get_config()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {
+                    'fingerprint': key,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'first_seen': now,
+                    'explained_at': None,
+                    'plan': None,
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['last_seen'] = now
+            entry['last_sql'] = sql
+            entry['alias'] = alias
+            if plan is not None:
+                entry['plan'] = plan
+                entry['explained_at'] = now
+            self._trim(now, config)
+            return list(self.entries.values())
+
+    def _trim(self, now, config):
+        horizon = now - config['WINDOW']
+        for key in [key for key, entry in self.entries.items() if entry['last_seen'] < horizon]:
+            del self.entries[key]
+        if len(self.entries) > config['TOP_N']:
+            keep = sorted(self.entries.values(), key=lambda entry: entry['max_ms'], reverse=True)
+            self.entries = {entry['fingerprint']: entry for entry in keep[:config['TOP_N']]}
+
+    def needs_plan(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry['explained_at'] is None:
+            return True
+        return time.time() - entry['explained_at'] >= get_config()['EXPLAIN_INTERVAL']
+
+
+table = SlowQueryTable()
+
+
+def save(entries):
+    directory = get_config()['DIRECTORY']
+    if not directory:
+        return
+    try:
+        write_process_file(directory, entries)
+    except OSError as exc:
+        logger.warning('Could not write slow query table: %s', exc)
+
+
+@atexit.register
+def _save_at_exit():
+    if table.entries:
+        save(list(table.entries.values()))
+
+
+def collect(directory=None):
+    """Slow fingerprints of all processes within the window, merged"""
+    config = get_config()
+    horizon = time.time() - config['WINDOW']
+    merged = {}
+    for entries in read_process_files(directory or config['DIRECTORY']):
+        for entry in entries:
+            if entry['last_seen'] < horizon:
+                continue
+            total = merged.get(entry['fingerprint'])
+            if total is None:
+                merged[entry['fingerprint']] = dict(entry)
+                continue
+            total['count'] += entry['count']
+            total['total_ms'] += entry['total_ms']
+            total['max_ms'] = max(total['max_ms'], entry['max_ms'])
+            total['first_seen'] = min(total['first_seen'], entry['first_seen'])
+            if entry['last_seen'] > total['last_seen']:
+                total.update(last_seen=entry['last_seen'], last_sql=entry['last_sql'])
+            if entry['plan'] and (entry['explained_at'] or 0) > (total['explained_at'] or 0):
+                total.update(plan=entry['plan'], explained_at=entry['explained_at'])
+    return list(merged.values())
+
+
+def reset(directory=None):
+    table.entries = {}
+    return remove_process_files(directory or get_config()['DIRECTORY'])
+
+
+# ============================================================================
+# CONNECTION WRAPPER
+# ============================================================================
+
+class SlowQueryWrapper:
+    """connection.execute_wrappers entry logging slow statements"""
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        config = get_config()
+        if config['ENABLED'] and duration_ms >= config['THRESHOLD_MS']:
+            self.report(context['connection'], sql, params, many, duration_ms, config)
+        return result
+
+    def report(self, connection, sql, params, many, duration_ms, config):
+        key = fingerprint(sql)
+        plan = None
+        if (
+            config['EXPLAIN']
+            and not many
+            and key.lstrip('(').upper().startswith(EXPLAINABLE)
+            and table.needs_plan(key)
+        ):
+            plan = explain(connection, sql, params)
+
+        save(table.record(key, sql, duration_ms, connection.alias, plan))
+
+        message = [f'Slow query ({duration_ms:.1f} ms on {connection.alias}): {key}']
+        if config['LOG_PARAMS']:
+            message.append(f'Params: {params!r}'[:1000])
+        if plan:
+            message.append(f'Plan:\n{plan}')
+        logger.warning('\n'.join(message))
+
+
+wrapper = SlowQueryWrapper()
+
+
+def install(connection, **kwargs):
+    """connection_created receiver: add the wrapper once per connection"""
+    if wrapper not in connection.execute_wrappers:
+        # First (outermost): connection.execute_wrapper() blocks that are
+        # open while the connection is created pop the last entry
+        connection.execute_wrappers.insert(0, wrapper)
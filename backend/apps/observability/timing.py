@@ -0,0 +1,85 @@
+# apps/observability/timing.py
+
+"""
+Request-scoped phase timers.
+
+A middleware opens request_timings(); code anywhere below it wraps a
+phase in timed('serialize') and the elapsed time is added to the
+request's totals. Nested timers of the same phase only count once (the
+outermost), so a serializer building another serializer is not counted
+twice. Outside a request timed() costs nothing.
+
+Phases are also tracing spans when the request is traced (tracing.py).
+Serializers opt in with TimedSerializerMixin.
+"""
+
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .tracing import current_trace, span
+
+_current = ContextVar('observability_timings', default=None)
+
+
+class RequestTimings:
+    """Seconds spent per phase during one request"""
+
+    def __init__(self):
+        self.phases = defaultdict(float)
+        self.depth = Counter()
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def request_timings():
+    """Collect timed() phases for the duration of a request"""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    timings = _current.get()
+    if timings is None:
+        with span(phase):
+            yield
+        return
+    if timings.depth[phase]:
+        yield
+        return
+
+    timings.depth[phase] += 1
+    start = time.perf_counter()
+    try:
+        with span(phase):
+            yield
+    finally:
+        timings.phases[phase] += time.perf_counter() - start
+        timings.depth[phase] -= 1
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin: `.data` as the 'serialize' phase and, on traced
+    requests, every nested serializer as a span of its own.
+    """
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+    def to_representation(self, instance):
+        if not self.field_name or current_trace() is None:
+            return super().to_representation(instance)
+        with span(f'serialize {type(self).__name__}', **{'serializer.field': self.field_name}):
+            return super().to_representation(instance)
@@ -0,0 +1,404 @@
+# apps/observability/tracing.py
+
+"""
+Built-in request tracing.
+
+TracingMiddleware traces a fraction of the requests (TRACING['SAMPLE_RATE'],
+0.0 to 1.0) and every request whose W3C traceparent header has the
+sampled flag (HONOR_TRACEPARENT), joining the caller's trace. A traced
+request is a tree of spans:
+
+    GET main:activity-detail          root (server) span
+      authenticate                    TracedViewMixin
+        auth.jwt.decode               TracedJWTAuthentication
+        auth.user.load
+          db SELECT                   every SQL statement
+      permissions.check
+      queryset.get_object / queryset.paginate
+      serialize                       timing.timed('serialize')
+        serialize OrganizerPublicSerializer   nested serializers
+      render                          timing.timed('render')
+
+Finished traces are appended to TRACING['DIRECTORY'] as OTLP/JSON lines
+(traces-<pid>.jsonl, one ExportTraceServiceRequest per line, readable by
+the OpenTelemetry Collector's otlpjsonfile receiver) or, with
+FORMAT='chrome', as Chrome trace events (traces-<pid>.json, open it in
+Perfetto or chrome://tracing). A file over MAX_FILE_BYTES is rotated to
+<name>.1. The response carries X-Trace-Id.
+
+Outside a traced request span() costs one context variable lookup.
+"""
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import orjson
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.execute_wrappers import context_wrapper
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Fraction of requests traced
+    'SAMPLE_RATE': 0.0,
+    # Also trace requests whose traceparent header is sampled
+    'HONOR_TRACEPARENT': True,
+    'FORMAT': 'otlp',
+    'DIRECTORY': None,
+    'MAX_FILE_BYTES': 50 * 1024 * 1024,
+    # Spans kept per trace (a long loop must not grow a trace unbounded)
+    'MAX_SPANS': 1000,
+    'SERVICE_NAME': 'whatsnew-api',
+}
+
+FORMATS = ('otlp', 'chrome')
+RESPONSE_HEADER = 'X-Trace-Id'
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# Longest SQL statement kept in a span
+STATEMENT_LIMIT = 2000
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_current = ContextVar('observability_trace', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TRACING', {})}
+
+
+# ============================================================================
+# SPANS
+# ============================================================================
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent_id', 'kind', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name, parent_id, kind, attributes):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+
+class Trace:
+    """Spans of one traced request"""
+
+    def __init__(self, trace_id=None, parent_id=None, max_spans=DEFAULTS['MAX_SPANS']):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.parent_id = parent_id
+        self.max_spans = max_spans
+        self.thread_id = threading.get_ident()
+        self.spans = []
+        self.stack = []
+        self.dropped = 0
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def span(name, kind=KIND_INTERNAL, **attributes):
+    """Record the block as a child of the current span (if tracing)"""
+    trace = _current.get()
+    if trace is None:
+        yield None
+        return
+    if len(trace.spans) >= trace.max_spans:
+        trace.dropped += 1
+        yield None
+        return
+
+    parent_id = trace.stack[-1].span_id if trace.stack else trace.parent_id
+    current = Span(name, parent_id, kind, attributes)
+    trace.spans.append(current)
+    trace.stack.append(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = type(exc).__name__
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        trace.stack.pop()
+
+
+def parse_traceparent(value):
+    """(trace id, parent span id, sampled) of a W3C traceparent, or None"""
+    match = TRACEPARENT_RE.match(value or '')
+    if match is None or match[1] == '0' * 32 or match[2] == '0' * 16:
+        return None
+    return match[1], match[2], bool(int(match[3], 16) & 1)
+
+
+class SQLSpans:
+    """Execute wrapper recording each statement as a span"""
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        verb = sql.lstrip('( ').split(None, 1)[0].upper() if sql.strip() else 'SQL'
+        with span(
+            f'db {verb}',
+            kind=KIND_CLIENT,
+            **{
+                'db.system': connection.vendor,
+                'db.alias': connection.alias,
+                'db.statement': sql[:STATEMENT_LIMIT],
+                'db.executemany': many,
+            }
+        ):
+            return execute(sql, params, many, context)
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(trace, service_name):
+    """ExportTraceServiceRequest (OTLP/JSON encoding)"""
+    spans = []
+    for item in trace.spans:
+        encoded = {
+            'traceId': trace.trace_id,
+            'spanId': item.span_id,
+            'parentSpanId': item.parent_id or '',
+            'name': item.name,
+            'kind': item.kind,
+            'startTimeUnixNano': str(item.start_ns),
+            'endTimeUnixNano': str(item.end_ns),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in item.attributes.items()
+            ],
+        }
+        if item.error:
+            encoded['status'] = {'code': 2, 'message': item.error}
+        spans.append(encoded)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': service_name}},
+                {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}},
+            ]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}],
+        }],
+    }
+
+
+def to_chrome(trace):
+    """Chrome trace "complete" events, one per span"""
+    return [
+        {
+            'name': item.name,
+            'cat': item.name.split(' ', 1)[0].split('.', 1)[0],
+            'ph': 'X',
+            'ts': item.start_ns / 1000,
+            'dur': (item.end_ns - item.start_ns) / 1000,
+            'pid': os.getpid(),
+            'tid': trace.thread_id,
+            'args': {
+                **item.attributes,
+                'trace_id': trace.trace_id,
+                'span_id': item.span_id,
+                **({'error': item.error} if item.error else {}),
+            },
+        }
+        for item in trace.spans
+    ]
+
+
+_write_lock = threading.Lock()
+
+
+def trace_path(config):
+    extension = 'jsonl' if config['FORMAT'] == 'otlp' else 'json'
+    return os.path.join(config['DIRECTORY'], f'traces-{os.getpid()}.{extension}')
+
+
+def export(trace, config):
+    """Append a finished trace to this process' trace file"""
+    if not config['DIRECTORY'] or not trace.spans:
+        return
+    if config['FORMAT'] == 'chrome':
+        # The JSON array format allows the closing bracket to be missing
+        payload = b''.join(
+            orjson.dumps(event, default=str) + b',\n' for event in to_chrome(trace)
+        )
+    else:
+        payload = orjson.dumps(to_otlp(trace, config['SERVICE_NAME']), default=str) + b'\n'
+
+    path = trace_path(config)
+    with _write_lock:
+        os.makedirs(config['DIRECTORY'], exist_ok=True)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(payload) > config['MAX_FILE_BYTES']:
+            os.replace(path, f'{path}.1')
+            size = 0
+        with open(path, 'ab') as trace_file:
+            if not size and config['FORMAT'] == 'chrome':
+                trace_file.write(b'[\n')
+            trace_file.write(payload)
+
+
+# ============================================================================
+# INSTRUMENTATION
+# ============================================================================
+
+class TracedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication with token decoding and user loading as spans"""
+
+    def get_validated_token(self, raw_token):
+        with span('auth.jwt.decode'):
+            return super().get_validated_token(raw_token)
+
+    def get_user(self, validated_token):
+        with span('auth.user.load'):
+            return super().get_user(validated_token)
+
+
+class TracedViewMixin:
+    """APIView mixin: authentication, permissions and queryset evaluation as spans"""
+
+    def perform_authentication(self, request):
+        with span('authenticate'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with span('permissions.check'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with span('permissions.check_object'):
+            super().check_object_permissions(request, obj)
+
+    def get_object(self):
+        with span('queryset.get_object'):
+            return super().get_object()
+
+    def paginate_queryset(self, queryset):
+        with span('queryset.paginate'):
+            return super().paginate_queryset(queryset)
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name, match.route) if match is not None else ('unmatched', '')
+
+
+class TracingMiddleware:
+    """Traces sampled requests and exports them (TRACING['ENABLED'])"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def start_trace(self, request, config):
+        """New Trace when the request must be traced, else None"""
+        parent = None
+        if config['HONOR_TRACEPARENT']:
+            parent = parse_traceparent(request.META.get('HTTP_TRACEPARENT'))
+        if parent is not None and parent[2]:
+            return Trace(parent[0], parent[1], config['MAX_SPANS'])
+        rate = config['SAMPLE_RATE']
+        if rate and random.random() < rate:
+            # Unsampled parent: keep its trace id, sample locally
+            trace_id, parent_id = parent[:2] if parent is not None else (None, None)
+            return Trace(trace_id, parent_id, config['MAX_SPANS'])
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        trace = self.start_trace(request, config) if config['ENABLED'] else None
+        if trace is None:
+            return self.get_response(request)
+
+        token = _current.set(trace)
+        try:
+            with context_wrapper(SQLSpans()), self.root_span(request) as root:
+                response = self.get_response(request)
+                self.end_root_span(root, request, response, trace)
+        finally:
+            _current.reset(token)
+        return self.finish(trace, response, config)
+
+    async def __acall__(self, request):
+        config = get_config()
+        trace = self.start_trace(request, config) if config['ENABLED'] else None
+        if trace is None:
+            return await self.get_response(request)
+
+        token = _current.set(trace)
+        try:
+            with context_wrapper(SQLSpans()), self.root_span(request) as root:
+                response = await self.get_response(request)
+                self.end_root_span(root, request, response, trace)
+        finally:
+            _current.reset(token)
+        return self.finish(trace, response, config)
+
+    def root_span(self, request):
+        return span(
+            request.method,
+            kind=KIND_SERVER,
+            **{'http.request.method': request.method, 'url.path': request.path}
+        )
+
+    def end_root_span(self, root, request, response, trace):
+        view_name, route = _route(request)
+        root.name = f'{request.method} {view_name}'
+        root.attributes['http.route'] = route
+        root.attributes['http.response.status_code'] = response.status_code
+        if response.status_code >= 500:
+            root.error = str(response.status_code)
+        if trace.dropped:
+            root.attributes['tracing.dropped_spans'] = trace.dropped
+
+    def finish(self, trace, response, config):
+        try:
+            export(trace, config)
+        except OSError as exc:
+            logger.warning('Could not export trace %s: %s', trace.trace_id, exc)
+            return response
+
+        response[RESPONSE_HEADER] = trace.trace_id
+        return response
@@ -0,0 +1,14 @@
+# apps/observability/urls.py
+
+from django.urls import path
+
+from .views import ProfileDetailView, ProfileFoldedView, ProfileListView, ProfileStatsView
+
+app_name = 'observability'
+
+urlpatterns = [
+    path('profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('profiles/<str:profile_id>/stacks.folded', ProfileFoldedView.as_view(), name='profile-folded'),
+    path('profiles/<str:profile_id>/stats.prof', ProfileStatsView.as_view(), name='profile-stats'),
+]
@@ -0,0 +1,77 @@
+# apps/observability/views.py
+
+from django.http import FileResponse, Http404, HttpResponse
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .profiling import folded_stacks, list_profiles, load_profile, profile_path
+
+
+def get_profile_or_404(profile_id):
+    profile = load_profile(profile_id)
+    if profile is None:
+        raise Http404
+    return profile
+
+
+class ProfileListView(APIView):
+    """Saved request profiles, newest first (staff only)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        results = []
+        for profile_id in list_profiles():
+            profile = load_profile(profile_id)
+            if profile is None:
+                continue
+            results.append({
+                'id': profile['id'],
+                'created_at': profile['created_at'],
+                'mode': profile['mode'],
+                'trigger': profile['trigger'],
+                'method': profile['request']['method'],
+                'path': profile['request']['path'],
+                'query_string': profile['request']['query_string'],
+                'status': profile['response']['status'],
+                'duration_ms': profile['duration_ms'],
+                'queries': len(profile['sql']),
+            })
+        return Response({'count': len(results), 'results': results})
+
+
+class ProfileDetailView(APIView):
+    """Full profile: request, SQL timeline, stacks or function table"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        return Response(get_profile_or_404(profile_id))
+
+
+class ProfileFoldedView(APIView):
+    """Folded stacks of a sampled profile, for flamegraph.pl or speedscope"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = get_profile_or_404(profile_id)
+        if profile['mode'] != 'sample':
+            return Response(
+                {'detail': 'Only sampled profiles have stacks; download the .prof file.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = HttpResponse(folded_stacks(profile), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{profile_id}.folded"'
+        return response
+
+
+class ProfileStatsView(APIView):
+    """cProfile dump of a deterministic profile (pstats, snakeviz)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        get_profile_or_404(profile_id)
+        try:
+            stats_file = open(profile_path(profile_id, 'prof'), 'rb')
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(stats_file, as_attachment=True, filename=f'{profile_id}.prof')
@@ -0,0 +1,276 @@
+# backend/apps/query_budget.py
+
+"""
+Per-endpoint query budgets.
+
+Views declare the most SQL queries a request may run:
+
+    class ActivityViewSet(viewsets.ModelViewSet):
+        query_budgets = {'list': 4, 'retrieve': 3}
+
+        @query_budget(2)
+        @action(detail=True, methods=['get'])
+        def address(self, request, slug=None):
+            ...
+
+A decorated action wins over query_budgets; query_budgets['*'] covers
+the remaining actions of a viewset and QUERY_BUDGET['DEFAULT'] every
+other view (None: unlimited). Function views use the decorator as well.
+
+QueryBudgetMiddleware counts the queries of each request and, over
+budget, logs a warning (MODE 'log') or raises QueryBudgetExceeded
+(MODE 'raise') listing the SQL statements that ran more than once —
+the usual N+1 suspects. Queries run while a streaming response is
+consumed are not counted.
+
+QueryBudgetTestMixin.assertRouteBudgets() requests every GET route of
+a urlconf and checks its budget, for use in the test suite.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import URLPattern, URLResolver, resolve, reverse
+
+from apps.execute_wrappers import context_wrapper
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'MODE': 'log',
+    'DEFAULT': None,
+    # Duplicated statements listed in warnings and errors
+    'REPORT_LIMIT': 5,
+}
+
+HEADER = 'X-Query-Count'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'QUERY_BUDGET', {})}
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more queries than its view allows"""
+
+    def __init__(self, label, budget, queries, duplicates):
+        self.label = label
+        self.budget = budget
+        self.queries = queries
+        self.duplicates = duplicates
+        super().__init__(format_report(label, budget, queries, duplicates))
+
+
+# ============================================================================
+# DECLARING BUDGETS
+# ============================================================================
+
+def query_budget(limit):
+    """Decorator setting the query budget of a view function or viewset action"""
+    def decorator(func):
+        func.query_budget = limit
+        return func
+    return decorator
+
+
+def get_budget(view_func, method):
+    """
+    Budget of a resolved view for an HTTP method.
+
+    Returns:
+        tuple: (label, budget or None)
+    """
+    default = get_config()['DEFAULT']
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        # Function view
+        label = getattr(view_func, '__qualname__', repr(view_func))
+        return label, getattr(view_func, 'query_budget', default)
+
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    label = f'{cls.__name__}.{action}'
+
+    handler = getattr(cls, action, None)
+    if getattr(handler, 'query_budget', None) is not None:
+        return label, handler.query_budget
+
+    budgets = getattr(cls, 'query_budgets', {})
+    if action in budgets:
+        return label, budgets[action]
+    return label, budgets.get('*', default)
+
+
+# ============================================================================
+# COUNTING
+# ============================================================================
+
+_IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)', re.IGNORECASE)
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with IN lists and inline numbers collapsed (parameters are already %s)"""
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _NUMBER.sub('N', sql)
+
+
+class QueryCounter:
+    """connection.execute_wrapper() recording the statements run and their time"""
+
+    def __init__(self):
+        self.statements = []
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append(sql)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def duplicates(self):
+        """[(fingerprint, times)] of statements that ran more than once"""
+        counts = Counter(fingerprint(sql) for sql in self.statements)
+        return [(sql, times) for sql, times in counts.most_common() if times > 1]
+
+
+def count_queries():
+    """Count the queries of this context, on every database connection"""
+    return context_wrapper(QueryCounter())
+
+
+def format_report(label, budget, queries, duplicates):
+    limit = get_config()['REPORT_LIMIT']
+    lines = [f'{label} ran {queries} queries (budget {budget})']
+    for sql, times in duplicates[:limit]:
+        lines.append(f'  {times}x {sql}')
+    return '\n'.join(lines)
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+class QueryBudgetMiddleware:
+    """Enforces view query budgets (QUERY_BUDGET['ENABLED'])"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        with count_queries() as counter:
+            response = self.get_response(request)
+        return self.check(request, response, counter, config)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        with count_queries() as counter:
+            response = await self.get_response(request)
+        return self.check(request, response, counter, config)
+
+    def check(self, request, response, counter, config):
+        response[HEADER] = str(counter.count)
+        match = request.resolver_match
+        if match is None:
+            return response
+
+        label, budget = get_budget(match.func, request.method)
+        if budget is None or counter.count <= budget:
+            return response
+
+        duplicates = counter.duplicates()
+        if config['MODE'] == 'raise':
+            raise QueryBudgetExceeded(label, budget, counter.count, duplicates)
+        logger.warning(
+            'Query budget exceeded: %s %s\n%s',
+            request.method,
+            request.path,
+            format_report(label, budget, counter.count, duplicates)
+        )
+        return response
+
+
+# ============================================================================
+# TEST HELPER
+# ============================================================================
+
+def iter_routes(urlconf, namespace=None, patterns=None):
+    """(url name, view function) of every named route of a urlconf module"""
+    if patterns is None:
+        module = __import__(urlconf, fromlist=['urlpatterns'])
+        namespace = getattr(module, 'app_name', namespace)
+        patterns = module.urlpatterns
+
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(
+                urlconf, pattern.namespace or namespace, pattern.url_patterns
+            )
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            if 'format' in pattern.pattern.regex.groupindex:
+                # Router format-suffix duplicates (.json)
+                continue
+            name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+            yield name, pattern.callback
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin checking the query budgets of routes"""
+
+    def assertWithinBudget(self, view_func, path, method='get', **request_kwargs):
+        """Request path and fail when its view goes over budget"""
+        label, budget = get_budget(view_func, method)
+        with count_queries() as counter:
+            response = getattr(self.client, method.lower())(path, **request_kwargs)
+        if budget is not None and counter.count > budget:
+            self.fail(format_report(label, budget, counter.count, counter.duplicates()))
+        return response
+
+    def assertRouteBudgets(self, url_kwargs, urlconf='apps.main.urls', skip=(), query=None):
+        """
+        Check every GET route of urlconf.
+
+        Args:
+            url_kwargs: {url name: reverse() kwargs} for routes with
+                parameters, e.g. {'main:activity-detail': {'slug': ...}}
+            skip: url names not to request
+            query: {url name: query string} for routes that need one
+        """
+        query = query or {}
+        for name, view_func in iter_routes(urlconf):
+            actions = getattr(view_func, 'actions', None)
+            if name in skip or (actions is not None and 'get' not in actions):
+                continue
+            with self.subTest(route=name):
+                path = reverse(name, kwargs=url_kwargs.get(name))
+                # The view that serves the path (an earlier route may shadow this one)
+                view_func = resolve(path).func
+                if name in query:
+                    path = f'{path}?{query[name]}'
+                self.assertWithinBudget(view_func, path)
@@ -0,0 +1,106 @@
+# backend/apps/renderers.py
+
+"""
+API renderers: orjson-backed JSON and optional MessagePack.
+
+ORJSONRenderer is a drop-in JSONRenderer: dates, times and datetimes are
+encoded natively by orjson (UTC as "Z", like DRF), Decimal becomes a
+number and GEOS points [lng, lat] (like ActivityAddress.coordinates).
+Anything else goes through DRF's JSONEncoder, so the output matches the
+stdlib renderer. Pretty-printing (Accept: application/json; indent=4)
+falls back to the stdlib renderer.
+
+MessagePackRenderer is only usable when the msgpack package is
+installed (see MSGPACK_AVAILABLE); clients select it with
+Accept: application/msgpack.
+"""
+
+import datetime
+import decimal
+
+import orjson
+from django.contrib.gis.geos import GEOSGeometry, Point
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.observability.timing import timed
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_AVAILABLE = msgpack is not None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_fallback_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """Types the fast encoders do not know"""
+    if isinstance(obj, decimal.Decimal):
+        # Serializers already coerce decimals to strings by default
+        return float(obj)
+    if isinstance(obj, Point):
+        return list(obj.coords)
+    if isinstance(obj, GEOSGeometry):
+        return orjson.loads(obj.json)
+    return _fallback_encoder.default(obj)
+
+
+# ============================================================================
+# JSON
+# ============================================================================
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer producing the same JSON through orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            with timed('render'):
+                return super().render(data, accepted_media_type, renderer_context)
+
+        with timed('render'):
+            ret = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+
+        # Escape U+2028/U+2029 like JSONRenderer (JavaScript-safe JSON)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+# ============================================================================
+# MESSAGEPACK
+# ============================================================================
+
+def _msgpack_default(obj):
+    # Same values as the JSON renderer; MessagePack has no date types
+    if isinstance(obj, datetime.datetime):
+        representation = obj.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (tuple, set, frozenset)):
+        return list(obj)
+    return encode_default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack for clients sending Accept: application/msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with timed('render'):
+            return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
@@ -0,0 +1,287 @@
+# backend/apps/renditions.py
+
+"""
+Resized image renditions (WebP and JPEG at several widths).
+
+An image field is registered with the JSON field that stores its renditions:
+
+    register(Activity, 'poster', 'poster_renditions')
+
+After a save whose image differs from the source recorded in the
+renditions map, generation is queued as a background task (apps.tasks).
+The task writes the files through the default storage and stores
+
+    {'source': 'activities/posters/x.jpg',
+     'formats': {'webp': {'320': 'renditions/.../320w.webp', ...}, ...}}
+
+Old renditions are deleted once the new ones are stored; an unchanged
+image is never re-processed.
+"""
+
+import logging
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from apps.storage import get_media_storage
+from apps.tasks.queue import task
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WIDTHS': (320, 640, 1280),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'PREFIX': 'renditions',
+}
+
+PIL_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'IMAGE_RENDITIONS', {}).get(name, DEFAULTS[name])
+
+
+# ============================================================================
+# IMAGE PROCESSING
+# ============================================================================
+
+def target_widths(source_width):
+    """Configured widths below the source width (never upscale)"""
+    widths = sorted(width for width in get_setting('WIDTHS') if width < source_width)
+    return widths or [source_width]
+
+
+def rendition_name(source_name, width, fmt):
+    stem, _ = posixpath.splitext(source_name)
+    return posixpath.join(get_setting('PREFIX'), stem, f'{width}w.{fmt}')
+
+
+def rendition_names(source_name, storage=default_storage):
+    """Rendition files present in storage for a source, as a formats map"""
+    stem, _ = posixpath.splitext(source_name)
+    directory = posixpath.join(get_setting('PREFIX'), stem)
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return {}
+
+    formats = {}
+    for filename in files:
+        width, _, fmt = filename.partition('w.')
+        if width.isdigit() and fmt:
+            formats.setdefault(fmt, {})[width] = posixpath.join(directory, filename)
+    return formats
+
+
+def _encode(image, fmt):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha: flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    elif fmt == 'webp' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    output = BytesIO()
+    image.save(output, PIL_FORMATS[fmt], quality=get_setting('QUALITY'), optimize=True)
+    return output.getvalue()
+
+
+def generate(source_name, storage=default_storage, reuse=True):
+    """
+    Write every rendition of an uploaded image to `storage`.
+    Existing files of the same source are reused unless reuse=False
+    (e.g. after a stale instance saved an empty renditions map).
+
+    Returns:
+        dict: {'webp': {'320': name, ...}, 'jpeg': {...}}
+    """
+    with get_media_storage().open(source_name, 'rb') as source:
+        with Image.open(source) as opened:
+            # Size without decoding: EXIF rotation swaps width and height
+            width, height = opened.size
+            if opened.getexif().get(0x0112) in (5, 6, 7, 8):
+                width, height = height, width
+
+            names = {
+                (target, fmt): rendition_name(source_name, target, fmt)
+                for target in target_widths(width)
+                for fmt in get_setting('FORMATS')
+            }
+            if reuse and all(storage.exists(name) for name in names.values()):
+                image = None
+            else:
+                image = ImageOps.exif_transpose(opened)
+                image.load()
+
+    formats = {}
+    resized = {}
+    for (target, fmt), name in names.items():
+        if image is not None:
+            if target not in resized:
+                resized[target] = image if target == width else image.resize(
+                    (target, max(round(height * target / width), 1)), Image.LANCZOS
+                )
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(_encode(resized[target], fmt)))
+        formats.setdefault(fmt, {})[str(target)] = name
+    return formats
+
+
+def delete_renditions(renditions, storage=default_storage):
+    for names in (renditions or {}).get('formats', {}).values():
+        for name in names.values():
+            try:
+                storage.delete(name)
+            except OSError:
+                logger.warning('Could not delete rendition %s', name)
+
+
+def source_in_use(source):
+    """Whether any registered field still points at `source` (shared uploads)"""
+    return bool(source) and any(
+        model._default_manager.filter(**{image_field: source}).exists()
+        for model, image_field, _ in _registry
+    )
+
+
+def release_renditions(renditions):
+    """
+    Delete renditions unless a row still uses the same source. Files of a
+    source in use are only deleted with its blob (gc_media_blobs).
+    """
+    if renditions and not source_in_use(renditions.get('source')):
+        delete_renditions(renditions)
+
+
+# ============================================================================
+# BACKGROUND PROCESSING
+# ============================================================================
+
+def process(model, pk, image_field, renditions_field, force=False, reuse=True):
+    """
+    Generate renditions for one row if its image is still current.
+    force=True regenerates up-to-date renditions too; with reuse=False
+    their files are rewritten in place (same names, shared by every row
+    with the same source).
+    """
+    row = model._default_manager.filter(pk=pk).values(
+        image_field, renditions_field
+    ).first()
+    if row is None:
+        return
+    source = row[image_field] or ''
+    previous = row[renditions_field] or {}
+    if previous.get('source') == source and not force:
+        return
+
+    renditions = {'source': source, 'formats': generate(source, reuse=reuse)} if source else {}
+
+    # Only store if the image was not replaced meanwhile
+    updated = model._default_manager.filter(
+        pk=pk, **{image_field: row[image_field]}
+    ).update(**{renditions_field: renditions})
+    if updated:
+        release_renditions(previous)
+        _on_stored()
+    else:
+        release_renditions(renditions)
+
+
+def _on_stored():
+    from apps.main.cache import bump_generation
+    bump_generation()
+
+
+@task(name='renditions.process')
+def process_task(model_label, pk, image_field, renditions_field):
+    process(apps.get_model(model_label), pk, image_field, renditions_field)
+
+
+def schedule(model, pk, image_field, renditions_field):
+    """Queue process() as a background task (runs after commit)"""
+    process_task.enqueue(
+        model._meta.label, pk, image_field, renditions_field,
+        dedupe_key=f'renditions:{model._meta.label}:{pk}:{image_field}'
+    )
+
+
+def needs_renditions(instance, image_field, renditions_field):
+    image = getattr(instance, image_field)
+    source = image.name if image else ''
+    return (getattr(instance, renditions_field) or {}).get('source', '') != source
+
+
+# ============================================================================
+# REGISTRATION
+# ============================================================================
+
+_registry = []
+
+
+def register(model, image_field, renditions_field):
+    """Keep `renditions_field` in sync with `image_field` on save/delete"""
+    if (model, image_field, renditions_field) not in _registry:
+        _registry.append((model, image_field, renditions_field))
+
+    def on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw:
+            return
+        if update_fields is not None and image_field not in update_fields:
+            return
+        if needs_renditions(instance, image_field, renditions_field):
+            schedule(sender, instance.pk, image_field, renditions_field)
+
+    def on_delete(sender, instance, **kwargs):
+        renditions = getattr(instance, renditions_field)
+        if renditions:
+            transaction.on_commit(lambda: release_renditions(renditions))
+
+    uid = f'renditions:{model._meta.label}.{image_field}'
+    post_save.connect(on_save, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=uid)
+
+
+# ============================================================================
+# SERIALIZER FIELD
+# ============================================================================
+
+class RenditionsField(serializers.Field):
+    """
+    Read-only srcset map of a renditions JSON field:
+    {'webp': 'url 320w, url 640w', 'jpeg': '...'} (empty until generated)
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        formats = (value or {}).get('formats')
+        if not formats:
+            return {}
+        request = self.context.get('request')
+        srcset = {}
+        for fmt, names in formats.items():
+            entries = []
+            for width, name in sorted(names.items(), key=lambda item: int(item[0])):
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                entries.append(f'{url} {width}w')
+            srcset[fmt] = ', '.join(entries)
+        return srcset
@@ -0,0 +1,224 @@
+# backend/apps/storage.py
+
+"""
+Content-addressed media storage.
+
+Uploaded files are stored under their SHA-256 digest
+(blobs/ab/cd/abcd....jpg), so identical uploads share one file. Every
+blob has a MediaBlob row whose refcount is maintained by model hooks
+(track()); unreferenced blobs are removed by the gc_media_blobs command.
+
+Uploads are read once: validate_image_file hashes them while validating
+(value.content_hash), and that digest names the blob; other files are
+hashed while they are copied to disk. An upload of an existing blob is
+not written at all.
+
+Storing a blob and collecting it both hold the MediaBlob row lock
+(select_for_update): a store refreshes linked_at under the lock, so the
+collector, which only deletes blobs unlinked for its grace period, either
+deletes row and file before the store (which then writes them again) or
+sees the fresh link and keeps them.
+"""
+
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, InvalidStorageError, storages
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+HASH_ALGORITHM = 'sha256'
+BLOB_PREFIX = 'blobs'
+
+
+def new_hasher():
+    return hashlib.new(HASH_ALGORITHM)
+
+
+def get_media_storage():
+    """Storage of uploaded images (STORAGES['media'], default storage otherwise)"""
+    try:
+        return storages['media']
+    except InvalidStorageError:
+        return storages['default']
+
+
+def _blob_model():
+    return apps.get_model('main', 'MediaBlob')
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{BLOB_PREFIX}/')
+
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content digest"""
+
+    def blob_name(self, digest, extension):
+        return posixpath.join(
+            BLOB_PREFIX, digest[:2], digest[2:4], f'{digest}{extension}'
+        )
+
+    def get_available_name(self, name, max_length=None):
+        # Same name means same content: never rename
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        digest = getattr(content, 'content_hash', None)
+        temp_path = None
+        if not digest:
+            # Not hashed by the validator: hash while copying
+            temp_path, digest = self._copy_to_temp(content, extension, hash_content=True)
+
+        final = self.blob_name(digest, extension)
+        try:
+            with transaction.atomic():
+                blob, _ = _blob_model().objects.select_for_update().get_or_create(name=final)
+                if not self.exists(final):
+                    if temp_path is None:
+                        temp_path, _ = self._copy_to_temp(content, extension)
+                    self._move_into_place(temp_path, final)
+                    temp_path = None
+                _blob_model().objects.filter(pk=blob.pk).update(
+                    size=self.size(final), linked_at=timezone.now()
+                )
+        finally:
+            if temp_path is not None and os.path.exists(temp_path):
+                # Duplicate upload
+                os.unlink(temp_path)
+        return final
+
+    def _copy_to_temp(self, content, extension, hash_content=False):
+        """
+        Copy to a temp file under blobs/tmp, hashing it if asked.
+
+        Returns:
+            tuple: (temp file path, hex digest or None)
+        """
+        temp_dir = self.path(posixpath.join(BLOB_PREFIX, 'tmp'))
+        os.makedirs(temp_dir, exist_ok=True)
+        hasher = new_hasher() if hash_content else None
+
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix=extension)
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    output.write(chunk)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return temp_path, hasher.hexdigest() if hasher is not None else None
+
+    def _move_into_place(self, temp_path, name):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Atomic; a concurrent identical upload writes the same bytes
+        os.replace(temp_path, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+
+# ============================================================================
+# REFERENCE COUNTING
+# ============================================================================
+
+_tracked = []
+
+
+def tracked_fields():
+    """(model, field name) pairs whose files are reference counted"""
+    return list(_tracked)
+
+
+def _adjust(name, delta):
+    if not is_blob(name):
+        return
+    blobs = _blob_model().objects.filter(name=name)
+    if delta < 0:
+        blobs = blobs.filter(refcount__gte=-delta)
+        blobs.update(refcount=F('refcount') + delta)
+    else:
+        # A new reference to an existing blob is a link too (see module doc)
+        blobs.update(refcount=F('refcount') + delta, linked_at=timezone.now())
+
+
+def _stored_name(instance, field):
+    # Name recorded by the last save: the FieldFile kept as a model's
+    # saved baseline (_loaded_values) may have been renamed in place since
+    saved = instance.__dict__.get('_blob_saved', {})
+    if field in saved:
+        return saved[field]
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and field in loaded:
+        return getattr(loaded[field], 'name', loaded[field]) or ''
+    return type(instance)._default_manager.filter(
+        pk=instance.pk
+    ).values_list(field, flat=True).first() or ''
+
+
+def track(model, field):
+    """Keep MediaBlob.refcount in sync with a FileField of `model`"""
+    def before_save(sender, instance, raw=False, **kwargs):
+        stored = instance.__dict__.setdefault('_blob_before', {})
+        if raw or instance._state.adding:
+            stored[field] = ''
+        else:
+            stored[field] = _stored_name(instance, field)
+
+    def after_save(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        before = instance._blob_before.get(field, '')
+        current = getattr(instance, field).name or ''
+        instance.__dict__.setdefault('_blob_saved', {})[field] = current
+        if before != current:
+            _adjust(current, 1)
+            _adjust(before, -1)
+
+    def after_delete(sender, instance, **kwargs):
+        _adjust(getattr(instance, field).name or '', -1)
+
+    uid = f'media-blobs:{model._meta.label}.{field}'
+    pre_save.connect(before_save, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(after_save, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(after_delete, sender=model, weak=False, dispatch_uid=uid)
+    if (model, field) not in _tracked:
+        _tracked.append((model, field))
+
+
+def recount():
+    """
+    Recompute every refcount from the tracked fields.
+
+    Returns:
+        int: Blobs whose refcount changed
+    """
+    counts = {}
+    for model, field in tracked_fields():
+        rows = model._default_manager.filter(
+            **{f'{field}__startswith': f'{BLOB_PREFIX}/'}
+        ).values_list(field, flat=True)
+        for name in rows.iterator():
+            counts[name] = counts.get(name, 0) + 1
+
+    changed = 0
+    for blob in _blob_model().objects.only('pk', 'name', 'refcount').iterator():
+        expected = counts.get(blob.name, 0)
+        if blob.refcount != expected:
+            _blob_model().objects.filter(pk=blob.pk).update(refcount=expected)
+            changed += 1
+    return changed
@@ -0,0 +1,26 @@
+# apps/tasks/admin.py
+
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_at', 'updated_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedupe_key']
+    readonly_fields = ['created_at', 'updated_at', 'locked_by', 'locked_at', 'last_error']
+    actions = ['retry_tasks']
+
+    @admin.action(description='Retry selected tasks')
+    def retry_tasks(self, request, queryset):
+        updated = queryset.exclude(status=Task.RUNNING).update(
+            status=Task.PENDING,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_by='',
+            locked_at=None
+        )
+        self.message_user(request, f'{updated} tasks queued again.')
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.tasks'
+
+    def ready(self):
+        # Register @task functions declared in <app>/tasks.py modules
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tasks')
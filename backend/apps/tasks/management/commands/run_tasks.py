@@ -0,0 +1,79 @@
+# apps/tasks/management/commands/run_tasks.py
+
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.tasks import queue
+
+
+def _init_process():
+    """Child process initializer (spawn start method needs its own setup)"""
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Tasks run concurrently (default: 4)'
+        )
+        parser.add_argument(
+            '--executor',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Pool type: threads for I/O-bound work, processes for CPU-bound (default: thread)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no task is due instead of polling'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds between polls when the queue is empty (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        worker = queue.worker_id()
+
+        if options['executor'] == 'process':
+            # Forked children must not share the parent's DB connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tasks')
+
+        totals = Counter()
+        try:
+            with pool:
+                while True:
+                    queue.release_abandoned()
+                    claimed = queue.claim(workers * 2, worker)
+                    if not claimed:
+                        if options['once']:
+                            break
+                        time.sleep(options['sleep'])
+                        continue
+
+                    for status in pool.map(queue.execute, claimed):
+                        totals[status] += 1
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{totals["done"]} tasks done, {totals["pending"]} to retry, '
+            f'{totals["failed"]} failed.'
+        ))
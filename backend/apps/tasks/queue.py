@@ -0,0 +1,249 @@
+# apps/tasks/queue.py
+
+"""
+Database-backed background tasks.
+
+    from apps.tasks.queue import task
+
+    @task(max_attempts=5)
+    def reindex(activity_id):
+        ...
+
+    reindex.enqueue(activity.pk, dedupe_key=f'reindex:{activity.pk}')
+
+enqueue() inserts a Task row in the caller's transaction, so the job exists
+exactly when the data it refers to is committed. A worker
+(`manage.py run_tasks`) claims due rows with a conditional UPDATE (safe
+with several workers, no SELECT ... FOR UPDATE needed) and runs them on a
+thread or process pool. Failures are retried with exponential backoff up
+to max_attempts.
+
+dedupe_key is enforced by a unique column (Task.queued_key) that holds the
+key until the task is claimed, so of two concurrent enqueue() calls with
+the same key only one inserts.
+
+With settings.TASKS['EAGER'] the task runs in-process right after commit
+instead (development, tests, deployments without a worker).
+"""
+
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'EAGER': False,
+    'MAX_ATTEMPTS': 3,
+    # Seconds; doubled after every failed attempt
+    'RETRY_DELAY': 10,
+    # Running tasks locked longer than this are considered abandoned
+    'LOCK_TIMEOUT': 600,
+}
+
+_registry = {}
+
+
+def get_setting(name):
+    return getattr(settings, 'TASKS', {}).get(name, DEFAULTS[name])
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class TaskFunction:
+    """A registered task: call it directly or enqueue() it"""
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, dedupe_key='', delay=None, **kwargs):
+        return enqueue(
+            self.name, args, kwargs,
+            dedupe_key=dedupe_key,
+            delay=delay,
+            max_attempts=self.max_attempts
+        )
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Register a function as a task (arguments must be JSON-serializable)"""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        registered = TaskFunction(
+            func,
+            task_name,
+            max_attempts or get_setting('MAX_ATTEMPTS')
+        )
+        _registry[task_name] = registered
+        return registered
+
+    return decorator(func) if func is not None else decorator
+
+
+def get_task(name):
+    return _registry[name]
+
+
+# ============================================================================
+# ENQUEUEING
+# ============================================================================
+
+def enqueue(name, args=(), kwargs=None, dedupe_key='', delay=None, max_attempts=None):
+    """
+    Queue a task.
+
+    Args:
+        dedupe_key: If a pending task with this key exists, nothing is queued
+        delay: Seconds or timedelta before the task becomes due
+
+    Returns:
+        Task or None (deduplicated, or run eagerly)
+    """
+    if name not in _registry:
+        raise KeyError(f'Unknown task "{name}"')
+    kwargs = kwargs or {}
+
+    if get_setting('EAGER'):
+        transaction.on_commit(lambda: _run_eagerly(name, list(args), kwargs))
+        return None
+
+    if dedupe_key and Task.objects.filter(
+        dedupe_key=dedupe_key,
+        status=Task.PENDING
+    ).exists():
+        return None
+
+    if isinstance(delay, (int, float)):
+        delay = timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name,
+                args=list(args),
+                kwargs=kwargs,
+                dedupe_key=dedupe_key,
+                queued_key=dedupe_key or None,
+                run_at=timezone.now() + (delay or timedelta()),
+                max_attempts=max_attempts or _registry[name].max_attempts
+            )
+    except IntegrityError:
+        if not dedupe_key:
+            raise
+        # A concurrent enqueue() queued the same key first
+        return None
+
+
+def _run_eagerly(name, args, kwargs):
+    try:
+        _registry[name](*args, **kwargs)
+    except Exception:
+        logger.exception('Task %s failed', name)
+
+
+# ============================================================================
+# WORKER SIDE
+# ============================================================================
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def release_abandoned():
+    """Requeue running tasks whose worker died"""
+    cutoff = timezone.now() - timedelta(seconds=get_setting('LOCK_TIMEOUT'))
+    return Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=cutoff
+    ).update(status=Task.PENDING, locked_by='', locked_at=None)
+
+
+def claim(limit, worker):
+    """
+    Claim up to `limit` due tasks for a worker.
+
+    Returns:
+        list: Claimed task ids
+    """
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.PENDING,
+        run_at__lte=now
+    ).order_by('run_at', 'id').values_list('pk', flat=True)[:limit * 2]
+
+    claimed = []
+    for pk in candidates:
+        # Only one worker can move a row out of "pending"
+        if Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            # Retries no longer hold the key: the key can be queued again
+            queued_key=None
+        ):
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+
+def execute(task_id):
+    """
+    Run a claimed task and record the outcome (retry or final state).
+    Safe to call in a thread or a child process.
+
+    Returns:
+        str: Final status of this attempt
+    """
+    close_old_connections()
+    try:
+        job = Task.objects.get(pk=task_id)
+        job.attempts += 1
+        try:
+            get_task(job.name)(*job.args, **job.kwargs)
+        except Exception:
+            job.last_error = traceback.format_exc()
+            if job.attempts < job.max_attempts:
+                backoff = get_setting('RETRY_DELAY') * 2 ** (job.attempts - 1)
+                job.status = Task.PENDING
+                job.run_at = timezone.now() + timedelta(seconds=backoff)
+            else:
+                job.status = Task.FAILED
+                logger.error('Task %s #%s failed permanently', job.name, job.pk)
+        else:
+            job.status = Task.DONE
+            job.last_error = ''
+
+        job.locked_by = ''
+        job.locked_at = None
+        job.save(update_fields=[
+            'attempts', 'status', 'run_at', 'last_error',
+            'locked_by', 'locked_at', 'updated_at'
+        ])
+        return job.status
+    finally:
+        close_old_connections()
+
+
+def purge(older_than_days=7):
+    """Delete finished tasks"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Task.objects.filter(
+        status=Task.DONE,
+        updated_at__lt=cutoff
+    ).delete()[0]
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Task
+from .queue import claim, enqueue, execute, release_abandoned, task
+
+calls = []
+
+
+@task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+@override_settings(TASKS={'EAGER': False, 'RETRY_DELAY': 10, 'LOCK_TIMEOUT': 600})
+class QueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        # execute() closes old connections, which would end the test transaction
+        patcher = mock.patch('apps.tasks.queue.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_claim(self):
+        due = record.enqueue(1)
+        record.enqueue(2, delay=60)
+        self.assertEqual(claim(10, 'worker-a'), [due.pk])
+        # Claimed rows are no longer pending
+        self.assertEqual(claim(10, 'worker-b'), [])
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.locked_by), (Task.RUNNING, 'worker-a'))
+
+    def test_execute(self):
+        job = record.enqueue('hello')
+        claim(1, 'worker')
+        self.assertEqual(execute(job.pk), Task.DONE)
+        self.assertEqual(calls, ['hello'])
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.locked_by, job.locked_at), (1, '', None))
+
+    def test_retry_with_backoff(self):
+        job = fail.enqueue()
+        claim(1, 'worker')
+        before = timezone.now()
+        self.assertEqual(execute(job.pk), Task.PENDING)
+        job.refresh_from_db()
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        # Not due yet
+        self.assertEqual(claim(1, 'worker'), [])
+
+        Task.objects.update(run_at=timezone.now())
+        claim(1, 'worker')
+        self.assertEqual(execute(job.pk), Task.FAILED)
+
+    def test_release_abandoned(self):
+        job = record.enqueue(1)
+        claim(1, 'worker')
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(release_abandoned(), 1)
+        self.assertEqual(claim(1, 'other'), [job.pk])
+
+    def test_dedupe(self):
+        first = record.enqueue(1, dedupe_key='key')
+        self.assertIsNone(record.enqueue(2, dedupe_key='key'))
+        self.assertIsNotNone(record.enqueue(3))
+        self.assertIsNotNone(record.enqueue(4, dedupe_key='other'))
+
+        # Once claimed, the key can be queued again
+        claim(10, 'worker')
+        self.assertIsNotNone(record.enqueue(5, dedupe_key='key'))
+        self.assertEqual(Task.objects.filter(dedupe_key='key').count(), 2)
+        first.refresh_from_db()
+        self.assertIsNone(first.queued_key)
+
+    def test_concurrent_dedupe(self):
+        record.enqueue(1, dedupe_key='key')
+        # The other caller's check ran before this row was inserted
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            self.assertIsNone(record.enqueue(2, dedupe_key='key'))
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_eager(self):
+        with self.settings(TASKS={'EAGER': True}):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertIsNone(enqueue('tests.record', [1]))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
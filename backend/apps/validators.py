@@ -2,11 +2,37 @@
 
 from rest_framework import serializers
 
+from .storage import new_hasher
+
+
+# Сигнатуры форматов (первые байты файла)
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def detect_image_type(header):
+    """MIME type from the first bytes of a file (None if unknown)"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
 
 def validate_image_file(value, max_size_mb=5):
     """
     Универсальный валидатор для изображений
     
+    Reads the upload once in chunks: the first chunk is checked against
+    known image signatures (the client-sent content_type is not trusted)
+    and every chunk feeds the content hash stored as `value.content_hash`
+    for the content-addressed storage.
+    
     Args:
         value: Загружаемый файл
         max_size_mb: Максимальный размер в МБ (по умолчанию 5)
@@ -25,20 +51,6 @@ def validate_image_file(value, max_size_mb=5):
             f"Current size: {value.size / (1024*1024):.2f}MB"
         )
     
-    # Проверка MIME типа
-    allowed_types = [
-        'image/jpeg',
-        'image/jpg', 
-        'image/png',
-        'image/gif',
-        'image/webp'
-    ]
-    if value.content_type not in allowed_types:
-        raise serializers.ValidationError(
-            f"Unsupported file type: {value.content_type}. "
-            "Allowed types: JPEG, PNG, GIF, WEBP"
-        )
-    
     # Проверка расширения (дополнительная защита)
     allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
     filename = value.name.lower()
@@ -48,4 +60,23 @@ def validate_image_file(value, max_size_mb=5):
             f"Allowed: {', '.join(allowed_extensions)}"
         )
     
-    return value
\ No newline at end of file
+    # Проверка сигнатуры и хеш за один проход
+    hasher = new_hasher()
+    detected_type = None
+    value.seek(0)
+    for index, chunk in enumerate(value.chunks()):
+        if index == 0:
+            detected_type = detect_image_type(chunk[:16])
+            if detected_type is None:
+                raise serializers.ValidationError(
+                    "Unsupported file type: content is not a JPEG, PNG, GIF or WEBP image."
+                )
+        hasher.update(chunk)
+    value.seek(0)
+    
+    if detected_type is None:
+        raise serializers.ValidationError("The submitted file is empty.")
+    
+    value.content_type = detected_type
+    value.content_hash = hasher.hexdigest()
+    return value
@@ -0,0 +1,25 @@
+# config/asgi_urls.py
+
+"""
+Root URLconf of the ASGI deployment (config.asgi): config.urls with the
+activity API served by apps.main.async_urls.
+"""
+
+from django.urls import URLResolver
+
+import apps.main.urls
+from config import urls
+
+urlpatterns = [
+    # Same prefix, application and instance namespace as in config.urls
+    URLResolver(
+        entry.pattern,
+        'apps.main.async_urls',
+        entry.default_kwargs,
+        entry.app_name,
+        entry.namespace,
+    )
+    if getattr(entry, 'urlconf_name', None) is apps.main.urls
+    else entry
+    for entry in urls.urlpatterns
+]
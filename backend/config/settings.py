@@ -1,6 +1,8 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -17,6 +19,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.gis',
 ]
 
 THIRD_PARTY_APPS = [
@@ -30,17 +33,23 @@ THIRD_PARTY_APPS = [
 LOCAL_APPS = [
     'apps.accounts',
     'apps.main',
+    'apps.tasks',
+    'apps.observability',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'apps.observability.metrics.MetricsMiddleware',
+    'apps.observability.tracing.TracingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'apps.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.observability.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,20 +75,35 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database Configuration
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': config('DB_NAME', default='whatsnew_db'),
-        'USER': config('DB_USER', default='root'),
-        'PASSWORD': config('DB_PASSWORD', default=''),
-        'HOST': config('DB_HOST', default='localhost'),
-        'PORT': config('DB_PORT', default='3306'),
-        'OPTIONS': {
-            'charset': 'utf8mb4',
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+# DB_ENGINE=mysql (production) or DB_ENGINE=spatialite (local development)
+DB_ENGINE = config('DB_ENGINE', default='mysql')
+
+if DB_ENGINE == 'spatialite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.contrib.gis.db.backends.spatialite',
+            'NAME': BASE_DIR / config('DB_NAME', default='whatsnew.sqlite3'),
+        }
+    }
+    SPATIALITE_LIBRARY_PATH = config('SPATIALITE_LIBRARY_PATH', default='mod_spatialite')
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.contrib.gis.db.backends.mysql',
+            'NAME': config('DB_NAME', default='whatsnew_db'),
+            'USER': config('DB_USER', default='root'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='3306'),
+            # Seconds a connection is reused (the ASGI thread pool keeps
+            # one per thread, see ASYNC_VIEWS)
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+            'OPTIONS': {
+                'charset': 'utf8mb4',
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+            },
+        }
     }
-}
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -111,6 +135,19 @@ STATIC_ROOT = BASE_DIR / config('STATIC_ROOT', default='staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / config('MEDIA_ROOT', default='media')
 
+# Uploaded images are stored by content hash (apps/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'media': {
+        'BACKEND': 'apps.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -118,9 +155,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'accounts.User'
 
 # REST Framework Configuration
+MSGPACK_INSTALLED = find_spec('msgpack') is not None
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication with decode/user-load tracing spans
+        'apps.observability.tracing.TracedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -132,17 +172,147 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # orjson-backed JSON (apps/renderers.py); MessagePack is negotiated with
+    # Accept/Content-Type: application/msgpack when msgpack is installed
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.renderers.ORJSONRenderer',
+        *(['apps.renderers.MessagePackRenderer'] if MSGPACK_INSTALLED else []),
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'apps.parsers.ORJSONParser',
+        *(['apps.parsers.MessagePackParser'] if MSGPACK_INSTALLED else []),
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
 }
 
 
+# Caches
+# The "api" alias stores anonymous read responses and the generation counter
+# that invalidates them (apps/main/cache.py). Every worker must share it, or
+# a write handled by one worker leaves the others serving stale responses:
+# the default is a file cache shared by the workers of this host; use Redis
+# (django.core.cache.backends.redis.RedisCache) when several hosts serve the
+# API. Local memory is only valid with a single worker (WEB_CONCURRENCY=1).
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': config(
+            'API_CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': config('API_CACHE_LOCATION', default=str(BASE_DIR / 'var' / 'api_cache')),
+        'TIMEOUT': config('API_CACHE_TIMEOUT', default=300, cast=int),
+    },
+}
+API_CACHE_ALIAS = 'api'
+if WEB_CONCURRENCY > 1 and CACHES[API_CACHE_ALIAS]['BACKEND'].endswith('.LocMemCache'):
+    raise ImproperlyConfigured(
+        'API_CACHE_BACKEND is per-process local memory but WEB_CONCURRENCY is '
+        f'{WEB_CONCURRENCY}: use a backend shared by the workers.'
+    )
+
+# Buffered view counting (apps/main/view_counter.py)
+VIEW_COUNTER = {
+    'PATH': BASE_DIR / 'var' / 'view_counts.sqlite3',
+    'FLUSH_INTERVAL': config('VIEW_COUNTER_FLUSH_INTERVAL', default=30, cast=int),
+    'BATCH_SIZE': 500,
+}
+
+# Activity import over the API (apps/main/importer.py); it runs in the
+# request, so larger files go through `manage.py import_activities`
+ACTIVITY_IMPORT = {
+    'MAX_ROWS': 5000,
+    'MAX_UPLOAD_SIZE': 5 * 1024 * 1024,
+}
+
+# Resized image renditions (apps/renditions.py)
+IMAGE_RENDITIONS = {
+    'WIDTHS': (320, 640, 1280),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+}
+
+# Background tasks (apps/tasks/queue.py); run workers with `manage.py run_tasks`
+TASKS = {
+    # Run tasks in-process after commit instead of queueing them
+    'EAGER': config('TASKS_EAGER', default=DEBUG, cast=bool),
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 10,
+    'LOCK_TIMEOUT': 600,
+}
+
+# Per-view SQL query budgets (apps/query_budget.py)
+QUERY_BUDGET = {
+    'ENABLED': config('QUERY_BUDGET_ENABLED', default=DEBUG, cast=bool),
+    # 'log' warns about requests over budget, 'raise' fails them
+    'MODE': config('QUERY_BUDGET_MODE', default='log'),
+    # Budget of views that declare none (None: unlimited)
+    'DEFAULT': None,
+}
+
+# Per-route request metrics on /metrics (apps/observability/metrics.py)
+METRICS = {
+    'ENABLED': config('METRICS_ENABLED', default=True, cast=bool),
+    # Workers share their metrics through files here (clear it on deploy);
+    # empty keeps metrics per process
+    'DIRECTORY': config('METRICS_DIR', default=str(BASE_DIR / 'var' / 'metrics')),
+    'FLUSH_INTERVAL': 5,
+    # Clients allowed to scrape /metrics
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+# Request profiling (apps/observability/profiling.py): staff send
+# X-Profile: 1 (or cprofile), or ?_profile=1; downloads under /api/v1/profiles/
+PROFILING = {
+    'ENABLED': config('PROFILING_ENABLED', default=True, cast=bool),
+    # Also profile 1 in N requests (0: only on demand)
+    'SAMPLE_RATE': config('PROFILING_SAMPLE_RATE', default=0, cast=int),
+    'MODE': 'sample',
+    'INTERVAL': 0.005,
+    'DIRECTORY': str(BASE_DIR / 'var' / 'profiles'),
+    'MAX_PROFILES': 200,
+}
+
+# Slow-query log with EXPLAIN (apps/observability/slow_queries.py);
+# `manage.py slow_queries` lists the worst fingerprints of all workers
+SLOW_QUERIES = {
+    'ENABLED': config('SLOW_QUERIES_ENABLED', default=True, cast=bool),
+    'THRESHOLD_MS': config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=int),
+    'EXPLAIN': True,
+    # Seconds before the same fingerprint is explained again
+    'EXPLAIN_INTERVAL': 300,
+    'LOG_PARAMS': config('SLOW_QUERIES_LOG_PARAMS', default=False, cast=bool),
+    'TOP_N': 50,
+    'WINDOW': 24 * 3600,
+    'DIRECTORY': str(BASE_DIR / 'var' / 'slow_queries'),
+}
+
+# Request tracing (apps/observability/tracing.py): spans for auth,
+# permissions, SQL, serialization and rendering, appended to DIRECTORY
+TRACING = {
+    'ENABLED': config('TRACING_ENABLED', default=True, cast=bool),
+    # Fraction of requests traced (0.0 to 1.0); a sampled W3C traceparent
+    # header always traces its request
+    'SAMPLE_RATE': config('TRACING_SAMPLE_RATE', default=0.0, cast=float),
+    'HONOR_TRACEPARENT': True,
+    # 'otlp' (OTLP/JSON lines) or 'chrome' (Perfetto / chrome://tracing)
+    'FORMAT': config('TRACING_FORMAT', default='otlp'),
+    'DIRECTORY': str(BASE_DIR / 'var' / 'traces'),
+    'MAX_FILE_BYTES': 50 * 1024 * 1024,
+    'MAX_SPANS': 1000,
+    'SERVICE_NAME': 'whatsnew-api',
+}
+
+# Async read views under ASGI (apps/main/async_views.py, config/asgi.py)
+ASYNC_VIEWS = {
+    # Threads running the sync DRF views; each holds a database connection
+    'THREADS': config('ASYNC_VIEW_THREADS', default=8, cast=int),
+}
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",  # Укажите порт, на котором работает ваш Vue.js
@@ -214,6 +384,16 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'apps.query_budget': {
+            'handlers': ['file', 'console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'apps.observability': {
+            'handlers': ['file', 'console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
         'apps.comments': {
             'handlers': ['file', 'console'],
             'level': 'INFO',
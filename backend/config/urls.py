@@ -6,6 +6,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from apps.observability.metrics import metrics_view
+
 urlpatterns = [
     # Admin
     path('admin/', admin.site.urls),
@@ -13,6 +15,10 @@ urlpatterns = [
     # API endpoints
     path('api/v1/auth/', include('apps.accounts.urls')),  # Ваше существующее приложение
     path('api/v1/', include('apps.main.urls')),  # Activities API
+    path('api/v1/', include('apps.observability.urls')),  # Request profiles (staff)
+
+    # Prometheus metrics (local clients only, see settings.METRICS)
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development
@@ -49,6 +55,9 @@ ORGANIZERS:
 ACTIVITIES:
 - GET    /api/v1/activities/                            - List activities (with filters)
 - POST   /api/v1/activities/                            - Create activity
+- GET    /api/v1/activities/clusters/?bbox=&zoom=       - Map clusters for viewport
+- POST   /api/v1/activities/import/                     - Bulk import (CSV, JSON/NDJSON, iCalendar)
+- GET    /api/v1/activities/export/?export_format=   - Streaming export (ndjson, csv, ics)
 - GET    /api/v1/activities/{slug}/                     - Get activity detail
 - PUT    /api/v1/activities/{slug}/                     - Update activity
 - PATCH  /api/v1/activities/{slug}/                     - Partial update activity
@@ -66,14 +75,31 @@ NESTED ROUTES (если используете drf-nested-routers):
 - PUT    /api/v1/activities/{slug}/comments/{id}/       - Update comment
 - DELETE /api/v1/activities/{slug}/comments/{id}/       - Delete comment
 
+PROFILES (staff only, see settings.PROFILING):
+- GET    /api/v1/profiles/                      - Saved request profiles
+- GET    /api/v1/profiles/{id}/                 - Profile with SQL timeline
+- GET    /api/v1/profiles/{id}/stacks.folded    - Flame graph input (sampled profiles)
+- GET    /api/v1/profiles/{id}/stats.prof       - cProfile dump (cprofile profiles)
+Profile a request with the header X-Profile: 1 (or cprofile) or ?_profile=1;
+the response's X-Profile-Id names the saved profile.
+
+ASGI (config.asgi): the category, organizer and activity lists, activity
+detail and comment reads are async views (apps/main/async_urls.py);
+compare with WSGI using `manage.py run_concurrency_benchmark`.
+
 FILTERS & SEARCH:
 Activities поддерживают фильтрацию:
 - ?category=slug          - Filter by category
 - ?organizer=slug         - Filter by organizer
 - ?status=published       - Filter by status
 - ?search=keyword         - Search in name/summary/description
+- ?near=lng,lat&radius_km=5 - Activities within radius, nearest first
 - ?ordering=-date         - Order by date (add '-' for descending)
 - ?ordering=views_count   - Order by views
+- ?pagination=cursor      - Keyset pagination (no COUNT), follow `next`/`previous`
+                            (also on comment lists; not with ?search=/?near= order)
+- ?fields=id,name,organizer.name - Only these fields (dotted paths for nested objects)
+- ?expand=category        - Expand only these relations, others as ids
 
 Примеры:
 /api/v1/activities/?category=music&status=published